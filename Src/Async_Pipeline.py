@@ -0,0 +1,202 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import Parse_Cache
+import Output_Writer
+import Sample_Index
+import Timing_Trace
+import Dir_Inventory
+import Thermal_History
+import Sheet_Fingerprint
+import Main_Auto_Processor
+
+# --- 1. SETTINGS ---
+# asyncio pipeline for Main_Auto_Processor --batch --async-io. The stages overlap:
+#   list   --> directories are scanned concurrently on the I/O threads; every file found is
+#              scheduled right away, so listing a slow tree (orfeo/LTS) overlaps the reads and parsing
+#   read   --> every file is read ahead on the I/O threads, so the worker that parses it
+#              opens a file already in the (client) page cache instead of waiting on the disk / network
+#   parse  --> detection + extraction run in a process pool; the JSON documents are serialised
+#              there but returned to the event loop (Output_Writer.deferred_writes)
+#   write  --> the JSON files are written on the I/O threads
+# io_threads bounds the concurrent listings / reads / writes, the window bounds the files in flight.
+
+DEFAULT_IO_THREADS = 8
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+# --- 2. BLOCKING STAGES (run on the I/O threads or in the workers) ---
+
+def scan_directory(dir_path):
+    """Returns the (sorted) sub-directory names and CSV file names of one directory (through the directory inventory)."""
+    return Dir_Inventory.list_directory(dir_path)
+
+
+def read_ahead(file_path):
+    """Reads a whole file and discards it (it stays in the page cache). Returns the number of bytes read."""
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            size += len(chunk)
+    return size
+
+
+def process_deferred(input_path, output_dir):
+    """
+    Worker side of the parse stage: process_single_path with the JSON writes deferred.
+    Returns (results, [(json_path, payload), ...]).
+    """
+    with Output_Writer.deferred_writes() as writes:
+        results = Main_Auto_Processor.process_single_path(input_path, output_dir)
+    return results, writes
+
+
+def write_outputs(writes, results):
+    """Writes the JSON documents of one file and refreshes their sample index entries."""
+    for json_path, payload in writes:
+        Output_Writer.write_payload(json_path, payload)
+        if results and any(file_info.get('samples') for file_info in results):
+            Sample_Index.mark_written(os.path.dirname(json_path), os.path.basename(json_path))
+
+
+# --- 3. THE PIPELINE ---
+
+async def discover_csv_paths(input_dir, io_pool, io_slots, found):
+    """
+    Scans the directories under input_dir concurrently and puts (walk key, path) on the asyncio.Queue
+    found as soon as each directory is listed, then None once the whole tree is scanned. Sorting on the
+    walk key gives the order of Main_Auto_Processor.iter_csv_paths (files of a directory first, then
+    its sub-directories, both sorted).
+    """
+    loop = asyncio.get_running_loop()
+
+    async def scan(dir_path, key):
+        async with io_slots:
+            sub_dirs, csv_files = await loop.run_in_executor(io_pool, scan_directory, dir_path)
+        for name in csv_files:
+            found.put_nowait((key + ((0, name),), os.path.join(dir_path, name)))
+        await asyncio.gather(*(scan(os.path.join(dir_path, name), key + ((1, name),)) for name in sub_dirs))
+
+    try:
+        await scan(input_dir, ())
+        Dir_Inventory.flush()
+    finally:
+        found.put_nowait(None)
+
+
+async def list_csv_paths(input_dir, io_pool, io_slots):
+    """Lists the CSV files under input_dir (see discover_csv_paths), in walk order."""
+    found = asyncio.Queue()
+    await discover_csv_paths(input_dir, io_pool, io_slots, found)
+    items = []
+    while (item := found.get_nowait()) is not None:
+        items.append(item)
+    items.sort(key=lambda item: item[0])
+    return [path for _, path in items]
+
+
+async def _iter_listed(paths):
+    """(walk key, path) of an already listed walk."""
+    for index, path in enumerate(paths):
+        yield (index,), path
+
+
+async def _iter_discovered(found):
+    """(walk key, path) of the files put on the queue by discover_csv_paths, as they are found."""
+    while (item := await found.get()) is not None:
+        yield item
+
+
+async def run_pipeline(input_dir, output_dir, workers=1, io_threads=DEFAULT_IO_THREADS, window=None, link_redundant=False):
+    """
+    Processes every CSV under input_dir and returns (results, linked): the results in walk order
+    (one entry per path, None for skipped/failed files), like Main_Auto_Processor.process_paths,
+    and the set of redundant sample sheets linked instead of extracted (link_redundant, see Sheet_Fingerprint).
+
+    Files are read and parsed while the tree is still being listed. With link_redundant the whole
+    tree is listed first (the sheets are compared with each other before any is extracted).
+    Files whose JSON output name was already scheduled are processed afterwards, sequentially and
+    in walk order, so the last one in walk order writes the output, as in a sequential run.
+    """
+    loop = asyncio.get_running_loop()
+    workers = max(1, workers)
+    window = window or (workers + io_threads) * 2
+    io_slots = asyncio.Semaphore(io_threads)
+    in_flight = asyncio.Semaphore(window)
+
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='lage-io') as io_pool:
+        linked = set()
+        discovery = None
+        if link_redundant:
+            paths = await list_csv_paths(input_dir, io_pool, io_slots)
+            linked = Sheet_Fingerprint.link_redundant_sheets(paths, output_dir)
+            items = _iter_listed([path for path in paths if path not in linked])
+        else:
+            found = asyncio.Queue()
+            discovery = asyncio.create_task(discover_csv_paths(input_dir, io_pool, io_slots, found))
+            items = _iter_discovered(found)
+
+        tasks = {}
+        scheduled_outputs = {}  # output name --> walk key of the file processed in the pool
+        deferred = []
+        # Workers inherit the parse cache, output, trace and history settings (and the extractor imports) of this process
+        Main_Auto_Processor.load_all_extractors()
+        with ProcessPoolExecutor(max_workers=workers, initializer=Main_Auto_Processor.init_worker,
+                                 initargs=(Parse_Cache.get_settings(), Output_Writer.get_settings(),
+                                           Timing_Trace.get_settings(), Thermal_History.get_settings())) as cpu_pool:
+
+            async def process(path):
+                try:
+                    async with io_slots:
+                        try:
+                            await loop.run_in_executor(io_pool, read_ahead, path)
+                        except OSError:
+                            pass  # Unreadable files are reported by the worker
+                    results, writes = await loop.run_in_executor(cpu_pool, process_deferred, path, output_dir)
+                    async with io_slots:
+                        await loop.run_in_executor(io_pool, write_outputs, writes, results)
+                    return results
+                finally:
+                    in_flight.release()
+
+            paths = {}
+            try:
+                async for key, path in items:
+                    paths[key] = path
+                    output_name = os.path.splitext(os.path.basename(path))[0]
+                    if output_name in scheduled_outputs:
+                        deferred.append(key)
+                        continue
+                    scheduled_outputs[output_name] = key
+
+                    await in_flight.acquire()
+                    tasks[key] = asyncio.create_task(process(path))
+
+                if discovery is not None:
+                    await discovery  # Raises the listing errors, if any
+            finally:
+                # Also when the listing failed: the files already scheduled are finished (and written)
+                # before the error goes up, not abandoned with the pools shutting down under them
+                outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            results = dict(zip(tasks, outcomes))
+
+    # Same-named files, in walk order. The one processed in the pool comes first in discovery order,
+    # not necessarily in walk order: it is processed again if another file preceded it.
+    for key in sorted(deferred):
+        output_name = os.path.splitext(os.path.basename(paths[key]))[0]
+        first_key = scheduled_outputs.pop(output_name, None)
+        if first_key is not None and first_key > key:
+            deferred.append(first_key)
+    for key in sorted(deferred):
+        results[key] = Main_Auto_Processor.process_single_path(paths[key], output_dir)
+
+    return [results[key] for key in sorted(results)], linked
+
+
+def process_directory(input_dir, output_dir, workers=1, io_threads=DEFAULT_IO_THREADS, link_redundant=False):
+    """Synchronous entry point of the pipeline (see run_pipeline)."""
+    return asyncio.run(run_pipeline(input_dir, output_dir, workers=workers, io_threads=io_threads,
+                                    link_redundant=link_redundant))
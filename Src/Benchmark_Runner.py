@@ -0,0 +1,299 @@
+import argparse
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import resource
+import subprocess
+import multiprocessing
+from datetime import datetime
+
+import Synthetic_Data_Generator
+
+# --- 1. SCENARIOS ---
+# Every scenario runs in a fresh (spawned) process, so its peak RSS is its own and no module
+# state (parse cache connection, imported pandas, ...) leaks from one measurement to the next.
+# The parse cache and the directory inventory are disabled: we measure parsing, not cache hits
+# (except crawl_inventory, which measures the inventory itself, in a temporary cache directory).
+#
+#   crawl                   --> Main_Auto_Processor.iter_csv_paths, every directory listed
+#   crawl_inventory         --> the same, served from a warm directory inventory
+#   detect                  --> File_Type_Detector.detect_file_type on every CSV
+#   extractor:<module>      --> <module>.one_single_file on the files of that type
+#   auto_processor          --> Main_Auto_Processor.process_paths over the whole tree
+#   auto_processor_workers  --> the same with --workers (only when workers > 1)
+#   auto_processor_async    --> Async_Pipeline.process_directory with --workers
+#   orid_recursive          --> Extractor_Orid_Recursively.process_recursive_by_orid for the first ORID
+
+EXTRACTOR_MODULES = [
+    'Extractor_BeadStudio',
+    'Extractor_IlluminaSampleSheet',
+    'Extractor_Thermal_Report',
+    'Extractor_FMGeneration',
+    'Extractor_FMAutoTilt'
+]
+
+
+def list_scenarios(workers=1):
+    """Returns the names of the scenarios run by default."""
+    scenarios = ['crawl', 'crawl_inventory', 'detect'] + [f"extractor:{name}" for name in EXTRACTOR_MODULES] + ['auto_processor']
+    if workers > 1:
+        scenarios.append('auto_processor_workers')
+    scenarios.append('auto_processor_async')
+    scenarios.append('orid_recursive')
+    return scenarios
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process and of its finished children, in MB (Linux reports KB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _run_scenario(scenario, dataset_dir, output_dir, workers):
+    """Runs one scenario in the current process. Returns (input paths, elapsed seconds)."""
+    import Parse_Cache
+    import Dir_Inventory
+    Parse_Cache.configure(enabled=False, cache_dir=os.path.join(output_dir, 'cache'))
+    Dir_Inventory.configure(enabled=scenario == 'crawl_inventory')
+
+    manifest = Synthetic_Data_Generator.load_manifest(dataset_dir)
+    all_paths = [os.path.join(dataset_dir, p) for name in EXTRACTOR_MODULES for p in manifest['files'][name]]
+
+    if scenario in ('crawl', 'crawl_inventory'):
+        import Main_Auto_Processor
+        if scenario == 'crawl_inventory':
+            list(Main_Auto_Processor.iter_csv_paths(dataset_dir))  # Warm-up crawl fills the inventory
+        start = time.perf_counter()
+        paths = list(Main_Auto_Processor.iter_csv_paths(dataset_dir))
+        return paths, time.perf_counter() - start
+
+    if scenario == 'detect':
+        import File_Type_Detector
+        start = time.perf_counter()
+        for path in all_paths:
+            File_Type_Detector.detect_file_type(path)
+        return all_paths, time.perf_counter() - start
+
+    if scenario.startswith('extractor:'):
+        module_name = scenario.split(':', 1)[1]
+        module = __import__(module_name)
+        paths = [os.path.join(dataset_dir, p) for p in manifest['files'][module_name]]
+        start = time.perf_counter()
+        for path in paths:
+            module.one_single_file(os.path.dirname(path), output_dir, os.path.basename(path))
+        return paths, time.perf_counter() - start
+
+    if scenario in ('auto_processor', 'auto_processor_workers'):
+        import Main_Auto_Processor
+        start = time.perf_counter()
+        paths = list(Main_Auto_Processor.iter_csv_paths(dataset_dir))
+        Main_Auto_Processor.process_paths(paths, output_dir, workers=workers if scenario == 'auto_processor_workers' else 1)
+        return paths, time.perf_counter() - start
+
+    if scenario == 'auto_processor_async':
+        import Async_Pipeline
+        import Main_Auto_Processor
+        start = time.perf_counter()
+        Async_Pipeline.process_directory(dataset_dir, output_dir, workers=workers)
+        elapsed = time.perf_counter() - start
+        return list(Main_Auto_Processor.iter_csv_paths(dataset_dir)), elapsed
+
+    if scenario == 'orid_recursive':
+        import Extractor_Orid_Recursively
+        target_orid = manifest['orids'][0]
+        start = time.perf_counter()
+        Extractor_Orid_Recursively.process_recursive_by_orid(dataset_dir, target_orid, output_dir)
+        elapsed = time.perf_counter() - start
+        paths = [os.path.join(d, f) for d, f in Extractor_Orid_Recursively.iter_orid_csv_files(dataset_dir, target_orid)]
+        return paths, elapsed
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def _scenario_process(scenario, dataset_dir, workers, queue):
+    """Entry point of the spawned process: runs the scenario quietly and reports its measurements."""
+    output_dir = tempfile.mkdtemp(prefix='lage_bench_')
+    try:
+        # Silence the extractors at the file descriptor level, so pool workers inherit it
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        paths, elapsed = _run_scenario(scenario, dataset_dir, output_dir, workers)
+        total_bytes = sum(os.path.getsize(p) for p in paths)
+        queue.put({
+            'scenario': scenario,
+            'files': len(paths),
+            'bytes': total_bytes,
+            'seconds': round(elapsed, 4),
+            'files_per_sec': round(len(paths) / elapsed, 2) if elapsed else None,
+            'mb_per_sec': round(total_bytes / 1e6 / elapsed, 3) if elapsed else None,
+            'peak_rss_mb': round(_peak_rss_mb(), 1)
+        })
+    except Exception as e:
+        queue.put({'scenario': scenario, 'error': f"{type(e).__name__}: {e}"})
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_scenario(scenario, dataset_dir, workers=1):
+    """Runs one scenario in a fresh process and returns its result dictionary."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_scenario_process, args=(scenario, dataset_dir, workers, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+# --- 2. RESULTS ---
+
+def _git_commit():
+    """Returns the current git commit of the repository, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(dataset_dir, scenarios, workers=1, repeat=1):
+    """
+    Runs every scenario repeat times (keeping the fastest run) and returns the results document:
+        {'git_commit', 'timestamp', 'python', 'platform', 'cpu_count', 'dataset', 'results': [...]}
+    """
+    manifest = Synthetic_Data_Generator.load_manifest(dataset_dir)
+    results = []
+    for scenario in scenarios:
+        runs = [run_scenario(scenario, dataset_dir, workers) for _ in range(repeat)]
+        ok_runs = [r for r in runs if 'error' not in r]
+        best = min(ok_runs, key=lambda r: r['seconds']) if ok_runs else runs[0]
+        results.append(best)
+
+        if 'error' in best:
+            print(f"   ❌ {scenario:<40} {best['error']}")
+        else:
+            print(f"   {scenario:<40} {best['files']:>7} files {best['seconds']:>9.3f} s "
+                  f"{best['files_per_sec'] or 0:>9.1f} files/s {best['mb_per_sec'] or 0:>8.2f} MB/s "
+                  f"{best['peak_rss_mb']:>8.1f} MB RSS")
+
+    return {
+        'git_commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': workers,
+        'dataset': {
+            'path': os.path.abspath(dataset_dir),
+            'seed': manifest['seed'],
+            'files': {name: len(paths) for name, paths in manifest['files'].items()},
+            'total_bytes': manifest['total_bytes']
+        },
+        'results': results
+    }
+
+
+def compare_results(previous, current):
+    """Prints the files/sec and peak RSS of every scenario next to a previous results document."""
+    previous_by_scenario = {r['scenario']: r for r in previous.get('results', []) if 'error' not in r}
+    print(f"\nComparison with {previous.get('git_commit') or 'previous run'}:")
+    for result in current['results']:
+        before = previous_by_scenario.get(result['scenario'])
+        if 'error' in result or before is None or not before.get('files_per_sec'):
+            continue
+        speedup = result['files_per_sec'] / before['files_per_sec']
+        print(f"   {result['scenario']:<40} {before['files_per_sec']:>9.1f} --> {result['files_per_sec']:>9.1f} files/s "
+              f"(x{speedup:.2f})   RSS {before['peak_rss_mb']:.1f} --> {result['peak_rss_mb']:.1f} MB")
+
+
+# --- 3. STARTUP CHECK ---
+# The command-line tools are invoked thousands of times from workflow engines: importing them must
+# not import pandas / numpy / pyarrow (the extractors are loaded once a file of their type is detected).
+
+STARTUP_MODULES = [
+    'Main_Auto_Processor',
+    'Extractor_Orid_Recursively',
+    'Sample_History_Extractor',
+    'Catalog',
+    'Watcher',
+    'Async_Pipeline'
+]
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow']
+
+_STARTUP_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'heavy_imports': [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def check_startup(modules=STARTUP_MODULES):
+    """
+    Imports every module in a fresh interpreter and returns one result per module:
+        {'module', 'seconds' (import time), 'heavy_imports' (heavy modules loaded by the import)}
+    """
+    results = []
+    for module in modules:
+        completed = subprocess.run([sys.executable, '-c', _STARTUP_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        if completed.returncode != 0:
+            results.append({'module': module, 'seconds': None, 'heavy_imports': [], 'error': completed.stderr.strip().splitlines()[-1]})
+            continue
+        results.append({'module': module, **json.loads(completed.stdout)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extractors and entry points on a synthetic dataset")
+    parser.add_argument("dataset_dir", nargs='?', help="Dataset directory (created with Synthetic_Data_Generator.py if it has no manifest)")
+    parser.add_argument("results_file", nargs='?', help="JSON file receiving the results")
+    parser.add_argument("--scenario", action="append", dest="scenarios", help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the auto_processor_workers scenario")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the fastest is kept")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--check-startup", action="store_true",
+                        help="Only check that the command-line tools import without pandas / numpy / pyarrow (exit status 1 otherwise)")
+
+    args = parser.parse_args()
+
+    if args.check_startup:
+        failed = False
+        for result in check_startup():
+            if 'error' in result:
+                print(f"   ❌ {result['module']:<30} {result['error']}")
+                failed = True
+            elif result['heavy_imports']:
+                print(f"   ❌ {result['module']:<30} {result['seconds']:.3f} s, imports {', '.join(result['heavy_imports'])}")
+                failed = True
+            else:
+                print(f"   ✅ {result['module']:<30} {result['seconds']:.3f} s")
+        sys.exit(1 if failed else 0)
+
+    if not args.dataset_dir or not args.results_file:
+        parser.error("dataset_dir and results_file are required (unless --check-startup)")
+
+    if not os.path.exists(os.path.join(args.dataset_dir, Synthetic_Data_Generator.MANIFEST_FILE_NAME)):
+        print(f"No manifest in {args.dataset_dir}: generating the default dataset")
+        Synthetic_Data_Generator.generate_dataset(args.dataset_dir)
+
+    scenarios = args.scenarios or list_scenarios(args.workers)
+    print(f"Benchmarking {len(scenarios)} scenario(s) on {args.dataset_dir}")
+    document = run_benchmarks(args.dataset_dir, scenarios, workers=args.workers, repeat=args.repeat)
+
+    with open(args.results_file, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults saved to: {args.results_file}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(json.load(f), document)
+
+
+if __name__ == "__main__":
+    main()
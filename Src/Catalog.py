@@ -0,0 +1,193 @@
+import argparse
+import os
+import csv
+import json
+import time
+import sqlite3
+import importlib
+import tempfile
+import File_Type_Detector
+import Parse_Cache
+import Output_Writer
+
+# --- 1. SETTINGS ---
+# One catalog per output directory, across every file type:
+#   <output_dir>/metadata_catalog.sqlite --> one row per input file (file path primary key) with its
+#       size, mtime, content hash, file type, JSON record name and summary row (the columns of the
+#       type's create_summary_table)
+#   <output_dir>/metadata_catalog.csv    --> export of the whole catalog, replaced atomically
+# A file whose size, mtime (or content hash) and extractor version are unchanged keeps its row as is,
+# so the complete archive summary is regenerated from the catalog, not by re-extracting every file.
+
+CATALOG_DB_NAME = 'metadata_catalog.sqlite'
+CATALOG_CSV_NAME = 'metadata_catalog.csv'
+BASE_COLUMNS = ['File path', 'File type', 'Content hash', 'JSON file', 'Updated']
+
+MODULES_BY_FILE_TYPE = {signature['file_type']: signature['module_name'] for signature in File_Type_Detector.SIGNATURES}
+
+
+def add_catalog_arguments(parser):
+    """Adds the --no-catalog option to an argparse parser."""
+    parser.add_argument("--no-catalog", action="store_true",
+                        help=f"Do not update {CATALOG_DB_NAME} / {CATALOG_CSV_NAME} in the output directory")
+
+
+# --- 2. STORAGE ---
+
+def open_catalog(output_dir):
+    """Opens (and creates if needed) the catalog of an output directory."""
+    os.makedirs(output_dir, exist_ok=True)
+    db = sqlite3.connect(os.path.join(output_dir, CATALOG_DB_NAME), timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS files (
+                      file_path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT,
+                      file_type TEXT, extractor_version TEXT, json_file TEXT, summary TEXT, updated_at TEXT)""")
+    db.commit()
+    return db
+
+
+def extractor_of(file_info):
+    """Returns the extractor module of an extraction result (from its 'file_type'), or None."""
+    module_name = MODULES_BY_FILE_TYPE.get(file_info.get('file_type'))
+    return importlib.import_module(module_name) if module_name else None
+
+
+def summary_row(file_info, module):
+    """
+    Returns the summary row of one extraction result, built by the create_summary_table of its
+    extractor module (the same columns as the per-type summary CSVs).
+    """
+    if module is None:
+        return {'File name': file_info.get('file_name')}
+    try:
+        return module.create_summary_table([file_info]).to_dict(orient='records')[0]
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        print(f"Could not summarise {file_info.get('file_name')} for the catalog: {e}")
+        return {'File name': file_info.get('file_name')}
+
+
+def update_catalog(output_dir, file_infos):
+    """
+    Upserts the rows of the given extraction results (each needs 'file_path' and 'file_type').
+    Only rows whose file content, type or extractor version changed are rewritten.
+    Returns a dictionary of counts: {'added', 'updated', 'unchanged', 'missing'}.
+    """
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'missing': 0}
+    db = open_catalog(output_dir)
+    try:
+        with db:
+            for file_info in file_infos:
+                file_path = os.path.abspath(file_info['file_path'])
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    counts['missing'] += 1
+                    continue
+
+                module = extractor_of(file_info)
+                extractor_version = str(getattr(module, 'EXTRACTOR_VERSION', '')) if module else None
+                row = db.execute("SELECT size, mtime_ns, content_hash, file_type, extractor_version FROM files WHERE file_path = ?",
+                                 (file_path,)).fetchone()
+                same_extraction = row is not None and row[3] == file_info.get('file_type') and row[4] == extractor_version
+
+                # Unchanged file: not even re-hashed
+                if same_extraction and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                    counts['unchanged'] += 1
+                    continue
+
+                # Usually hashed by the extraction just before: served from the parse cache file stats
+                try:
+                    content_hash = Parse_Cache.get_content_hash(file_path)
+                except sqlite3.Error:
+                    content_hash = Parse_Cache.hash_file(file_path)
+                if same_extraction and row[2] == content_hash:
+                    # Touched (copied, re-synced) but identical: only the stat changes
+                    db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE file_path = ?",
+                               (stat.st_size, stat.st_mtime_ns, file_path))
+                    counts['unchanged'] += 1
+                    continue
+
+                summary = summary_row(file_info, module)
+                db.execute("""INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                              ON CONFLICT(file_path) DO UPDATE SET
+                                  size = excluded.size, mtime_ns = excluded.mtime_ns, content_hash = excluded.content_hash,
+                                  file_type = excluded.file_type, extractor_version = excluded.extractor_version,
+                                  json_file = excluded.json_file, summary = excluded.summary, updated_at = excluded.updated_at""",
+                           (file_path, stat.st_size, stat.st_mtime_ns, content_hash, file_info.get('file_type'),
+                            extractor_version, Output_Writer.json_file_name(os.path.basename(file_path)),
+                            json.dumps(summary, default=str), time.strftime('%Y-%m-%dT%H:%M:%S')))
+                counts['added' if row is None else 'updated'] += 1
+    finally:
+        db.close()
+    return counts
+
+
+def prune_catalog(output_dir):
+    """Deletes the rows of input files that no longer exist. Returns the number of deleted rows."""
+    db = open_catalog(output_dir)
+    try:
+        with db:
+            missing = [path for (path,) in db.execute("SELECT file_path FROM files") if not os.path.exists(path)]
+            db.executemany("DELETE FROM files WHERE file_path = ?", [(path,) for path in missing])
+    finally:
+        db.close()
+    return len(missing)
+
+
+# --- 3. CSV EXPORT ---
+
+def export_csv(output_dir):
+    """
+    Writes the whole catalog to <output_dir>/metadata_catalog.csv, sorted by file path:
+    the base columns, then the union of the per-type summary columns (empty where not applicable).
+    The file is written to a temporary file and renamed, so readers never see a partial catalog.
+    Returns (csv path, number of rows).
+    """
+    db = open_catalog(output_dir)
+    try:
+        rows = db.execute("""SELECT file_path, file_type, content_hash, json_file, updated_at, summary
+                             FROM files ORDER BY file_path""").fetchall()
+    finally:
+        db.close()
+
+    records = []
+    summary_columns = {}
+    for file_path, file_type, content_hash, json_file, updated_at, summary in rows:
+        summary = json.loads(summary)
+        summary_columns.update(dict.fromkeys(summary))
+        records.append({'File path': file_path, 'File type': file_type, 'Content hash': content_hash,
+                        'JSON file': json_file, 'Updated': updated_at, **summary})
+
+    csv_path = os.path.join(output_dir, CATALOG_CSV_NAME)
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.metadata_catalog.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=BASE_COLUMNS + [c for c in summary_columns if c not in BASE_COLUMNS])
+            writer.writeheader()
+            writer.writerows(records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, csv_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return csv_path, len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the consolidated metadata catalog CSV without re-extracting")
+    parser.add_argument("output_dir", help="Output directory holding metadata_catalog.sqlite")
+    parser.add_argument("--prune", action="store_true", help="Drop the rows of input files that no longer exist")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.output_dir, CATALOG_DB_NAME)):
+        print(f"❌ Error: no {CATALOG_DB_NAME} in {args.output_dir}")
+        return
+    if args.prune:
+        print(f"Pruned {prune_catalog(args.output_dir)} row(s) of deleted files")
+    csv_path, row_count = export_csv(args.output_dir)
+    print(f"Saved catalog of {row_count} file(s) to: {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
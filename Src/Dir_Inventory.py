@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import threading
+import Parse_Cache
+
+# --- 1. SETTINGS ---
+# Persistent inventory of the crawled directories, so repeated crawls of the LTS archive do not list
+# every directory again: <cache dir>/dir_inventory.sqlite keeps, per directory, its mtime and its
+# (sorted) sub-directory and CSV file names.
+# A directory's mtime changes whenever an entry is added, removed or renamed in it, so a crawl costs
+# one stat per directory and only the directories whose mtime changed are listed again (closed years
+# such as NovaSeq6000/2023 are served from the inventory).
+# File contents are not tracked here: the parse cache and the catalog check the files themselves.
+# A listing taken less than RACY_SECONDS after the last change of its directory is not trusted
+# (another change within the mtime granularity would go unnoticed) and is taken again next time.
+# Names are stored joined with '/', the one character a file name cannot contain.
+
+INVENTORY_FILE_NAME = 'dir_inventory.sqlite'
+RACY_SECONDS = 2
+COMMIT_EVERY = 500
+
+_settings = {'enabled': True, 'refresh': False}
+
+_connection = {'pid': None, 'db': None, 'path': None, 'pending': 0}
+_lock = threading.Lock()
+
+# Counts of the current process: directories served from the inventory / listed again
+_stats = {'reused': 0, 'listed': 0}
+
+
+def configure(enabled=True, refresh=False):
+    """Sets the inventory behaviour: enabled=False lists every directory, refresh=True re-lists them and updates the inventory."""
+    _settings['enabled'] = enabled
+    _settings['refresh'] = refresh
+
+
+def add_inventory_arguments(parser):
+    """Adds the --no-inventory / --refresh-inventory options to an argparse parser."""
+    parser.add_argument("--no-inventory", action="store_true",
+                        help=f"List every directory instead of using the directory inventory ({INVENTORY_FILE_NAME} in the cache directory)")
+    parser.add_argument("--refresh-inventory", action="store_true", help="List every directory again and refresh the directory inventory")
+
+
+def configure_from_args(args):
+    """Applies the options added by add_inventory_arguments()."""
+    configure(enabled=not args.no_inventory, refresh=args.refresh_inventory)
+
+
+def get_stats():
+    """Returns {'reused', 'listed'}: directories served from the inventory / listed since the process started."""
+    return dict(_stats)
+
+
+# --- 2. STORAGE ---
+
+def _get_db():
+    """Opens (once per process, next to the parse cache) the inventory database. Call with _lock held."""
+    path = os.path.join(Parse_Cache.get_settings()[2], INVENTORY_FILE_NAME)
+    if _connection['db'] is not None and _connection['pid'] == os.getpid() and _connection['path'] == path:
+        return _connection['db']
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Shared by the I/O threads of Async_Pipeline (every access holds _lock)
+    db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS directories (
+                      path TEXT PRIMARY KEY, mtime_ns INTEGER, listed_at REAL, sub_dirs TEXT, csv_files TEXT)""")
+    db.commit()
+
+    _connection.update(pid=os.getpid(), db=db, path=path, pending=0)
+    return db
+
+
+def flush():
+    """Commits the pending inventory updates of this process."""
+    with _lock:
+        if _connection['db'] is not None and _connection['pid'] == os.getpid() and _connection['pending']:
+            _connection['db'].commit()
+            _connection['pending'] = 0
+
+
+def _join(names):
+    """Stores a list of names as one string."""
+    return '/'.join(names)
+
+
+def _split(joined):
+    """Inverse of _join."""
+    return joined.split('/') if joined else []
+
+
+def _load_subtree(path):
+    """Returns {directory path: row} for path and every directory below it (one range query)."""
+    prefix = os.path.join(path, '')
+    with _lock:
+        rows = _get_db().execute("""SELECT path, mtime_ns, listed_at, sub_dirs, csv_files FROM directories
+                                    WHERE path = ? OR (path >= ? AND path < ?)""",
+                                 (path, prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+
+def _scan(dir_path):
+    """Lists one directory: (sorted sub-directory names, sorted CSV file names). Symlinked directories are not entered."""
+    sub_dirs, csv_files = [], []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_dirs.append(entry.name)
+            elif entry.name.lower().endswith('.csv') and not entry.is_dir():
+                csv_files.append(entry.name)
+    return sorted(sub_dirs), sorted(csv_files)
+
+
+# --- 3. LISTING ---
+
+def list_directory(dir_path, known=None):
+    """
+    Returns (sorted sub-directory names, sorted CSV file names) of dir_path, from the inventory
+    when the directory did not change since it was listed. Raises OSError if it cannot be listed.
+    known optionally holds the inventory rows preloaded by a crawl (see _load_subtree).
+    """
+    if not _settings['enabled']:
+        return _scan(dir_path)
+
+    path = os.path.abspath(dir_path)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        _forget(path)
+        raise
+
+    if known is not None:
+        row = known.get(path)
+    else:
+        with _lock:
+            row = _get_db().execute("SELECT mtime_ns, listed_at, sub_dirs, csv_files FROM directories WHERE path = ?",
+                                    (path,)).fetchone()
+    if row and not _settings['refresh'] and row[0] == mtime_ns and row[1] - mtime_ns / 1e9 >= RACY_SECONDS:
+        _stats['reused'] += 1
+        return _split(row[2]), _split(row[3])
+
+    listed_at = time.time()
+    try:
+        sub_dirs, csv_files = _scan(path)
+    except OSError:
+        _forget(path)
+        raise
+    _stats['listed'] += 1
+
+    with _lock:
+        db = _get_db()
+        db.execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?)",
+                   (path, mtime_ns, listed_at, _join(sub_dirs), _join(csv_files)))
+        # Sub-directories that disappeared: drop their (stale) subtree
+        for name in set(_split(row[2]) if row else []) - set(sub_dirs):
+            _delete_subtree(db, os.path.join(path, name))
+        _connection['pending'] += 1
+        if _connection['pending'] >= COMMIT_EVERY:
+            db.commit()
+            _connection['pending'] = 0
+    return sub_dirs, csv_files
+
+
+def _delete_subtree(db, path):
+    """Deletes the rows of a directory and of everything below it. Call with _lock held."""
+    db.execute("DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?",
+               (path, len(path) + 1, os.path.join(path, '')))
+
+
+def _forget(path):
+    """Drops a directory that can no longer be listed (and its subtree) from the inventory."""
+    with _lock:
+        db = _get_db()
+        _delete_subtree(db, path)
+        _connection['pending'] += 1
+
+
+def iter_csv_paths(input_dir):
+    """
+    Yields the full path of every CSV file under input_dir, in the order of a sorted os.walk
+    (files of a directory first, then its sub-directories, depth first). Directories that cannot
+    be listed are skipped, like os.walk does.
+    """
+    known = _load_subtree(os.path.abspath(input_dir)) if _settings['enabled'] else None
+    stack = [input_dir]
+    try:
+        while stack:
+            dir_path = stack.pop()
+            try:
+                sub_dirs, csv_files = list_directory(dir_path, known)
+            except OSError:
+                continue
+            for file_name in csv_files:
+                yield os.path.join(dir_path, file_name)
+            stack.extend(os.path.join(dir_path, name) for name in reversed(sub_dirs))
+    finally:
+        flush()
@@ -1,9 +1,17 @@
 import pandas as pd
-import io
 import os
-import json
 import argparse  
 import re
+import File_Type_Detector
+import Section_Index
+import Section_Parser
+import Parse_Cache
+import Timing_Trace
+import Sample_Index
+import Output_Writer
+
+# Bump whenever the JSON produced for a file changes (invalidates its Parse_Cache entries)
+EXTRACTOR_VERSION = "1.0"
 
 # File Validation Function
     # "file_Input_path" --> Full path to the input file    
@@ -13,53 +21,33 @@ def is_beadstudio_file(file_Input_path):
     the keyword BeadStudio in the [Header] section.
     """
     try:
-        # We only need to check the first ~20 lines to find the header
-        with open(file_Input_path, 'r') as f:
-            head = [next(f).lower() for _ in range(20)]
-        
-        content = "".join(head)
-        
-        # Check for 'beadstudio' anywhere in the top of the file
-        if 'beadstudio' in content:
-            return True
-        else:
-            return False
-            
+        # We only need the top of the file to find the header (one read)
+        head_lines = File_Type_Detector.read_file_head(file_Input_path)
     except Exception as e:
         print(f"Error reading file for validation: {e}")
         return False
+
+    # Check for 'beadstudio' anywhere in the top of the file
+    return File_Type_Detector.match_beadstudio(head_lines) is not None
     
-def get_csv_section(file_Input_path, section_name):
+def get_csv_section(file_Input_path, section_name, section_index=None):
     """
     Extracts a specific section from a semi-structured CSV.
     Returns a pandas DataFrame.
+    If a section_index (see Section_Index.build_section_index) is given, the file is not re-read.
     """
-    with open(file_Input_path, 'r') as f:
-        lines = f.readlines()
-    
-    # 1. Locate the starting line of the section
-    start_idx = -1
-    for i, line in enumerate(lines):
-        if line.startswith(section_name):
-            start_idx = i
-            break
-            
-    if start_idx == -1:
+    if section_index is None:
+        section_index = Section_Index.build_section_index(file_Input_path)
+
+    # Locate the section body (lines between its marker and the next '[' marker or end of file)
+    section_stream = Section_Index.get_section_stream(section_index, section_name)
+    if section_stream is None:
         raise ValueError(f"Section {section_name} not found in file.")
 
-    # 2. Find where the section ends (either the next '[' marker or end of file)
-    end_idx = len(lines)
-    for i in range(start_idx + 1, len(lines)):
-        if lines[i].startswith('['):
-            end_idx = i
-            break
-            
-    # 3. Join 0`    the relevant lines and read into pandas
-    section_content = "".join(lines[start_idx + 1 : end_idx])
-    return pd.read_csv(io.StringIO(section_content))
+    return pd.read_csv(section_stream)
 
 
-def extract_metadata(file_Input_path):
+def extract_metadata(file_Input_path, section_index=None):
     """
     Extract header-level metadata from a BeadStudio CSV file.
     Returns a dictionary with project name, experiment name, date, and other metadata.
@@ -67,12 +55,18 @@ def extract_metadata(file_Input_path):
     metadata = {}
     
     try:
-        header_df = get_csv_section(file_Input_path, '[Header]')
+        if section_index is None:
+            section_index = Section_Index.build_section_index(file_Input_path)
+
+        # Key/value block parsed with the csv module; pandas only for the layouts it does not cover
+        header_text = Section_Index.get_section_text(section_index, '[Header]')
+        pairs = Section_Parser.parse_header_pairs(header_text) if header_text is not None else None
+        if pairs is None:
+            header_df = get_csv_section(file_Input_path, '[Header]', section_index)
+            pairs = [(row.iloc[0], row.iloc[1]) for _, row in header_df.iterrows()]
         
         # Extract key metadata fields
-        for _, row in header_df.iterrows():
-            key = row.iloc[0]
-            value = row.iloc[1]
+        for key, value in pairs:
             if pd.notna(key) and pd.notna(value):
                 # Store metadata with lowercase keys
                 metadata[key.lower().replace(' ', '_')] = value
@@ -98,40 +92,38 @@ def extract_orid_from_filename(csv_file_name):
         return  match.group(1)
     return None
 
-def extract_manifest_info(file_Input_path):
+def extract_manifest_info(file_Input_path, section_index=None):
     """
     Extract manifest information from a BeadStudio CSV file.
     Returns the manifest ID string.
     """
     try:
-        with open(file_Input_path, 'r') as f:
-            lines = f.readlines()
-        
+        if section_index is None:
+            section_index = Section_Index.build_section_index(file_Input_path)
+
         # Find the Manifests section
-        for i, line in enumerate(lines):
-            if line.startswith('[Manifests]'):
-                # The next non-empty line should contain the manifest info
-                if i + 1 < len(lines):
-                    manifest_line = lines[i + 1].strip()
-                    if manifest_line:
-                        # Split by comma and get the second field
-                        parts = manifest_line.split(',')
-                        if len(parts) >= 2:
-                            return parts[1].strip()
-                break
+        manifest_content = Section_Index.get_section_text(section_index, '[Manifests]')
+        if manifest_content:
+            # The next non-empty line should contain the manifest info
+            manifest_line = manifest_content.split('\n', 1)[0].strip()
+            if manifest_line:
+                # Split by comma and get the second field
+                parts = manifest_line.split(',')
+                if len(parts) >= 2:
+                    return parts[1].strip()
     except Exception as e:
         print(f"Error extracting manifest from {file_Input_path}: {e}")
     
     return 'N/A'
 
 
-def count_samples(file_Input_path):
+def count_samples(file_Input_path, section_index=None):
     """
     Count the number of samples in the Data section.
     Returns the count (excluding header row).
     """
     try:
-        data_df = get_csv_section(file_Input_path, '[Data]')
+        data_df = get_csv_section(file_Input_path, '[Data]', section_index)
         return len(data_df)
     except Exception as e:
         print(f"Error counting samples from {file_Input_path}: {e}")
@@ -139,14 +131,14 @@ def count_samples(file_Input_path):
     
 
 
-def extract_sample_data(file_Input_path):
+def extract_sample_data(file_Input_path, section_index=None):
     """
     Extracts all rows from the [Data] section.
     Returns a list of dictionaries where each dictionary represents a sample.
     """
     try:
         #  Find the [Data] section
-        data_df = get_csv_section(file_Input_path, '[Data]')
+        data_df = get_csv_section(file_Input_path, '[Data]', section_index)
         
         # Converts the DataFrame into a list of dictionaries
         # orient='records' --> convert each row of the DataFrame into a dictionary: {"Column1": "Value1", "Column2": "Value2", ...}
@@ -180,40 +172,12 @@ def process_all_csv_files(input_dir_path, output_dir_path):
             print(f" BeadStudio file validation failed : {csv_file_name} does not appear to be a BeadStudio file.")
             continue # This skips the rest of the loop for THIS file
             
-        print(f"BeadStudio file validated successfully. Extracting data from: {csv_file_name}")
-        
-        # Extract metadata
-        metadata = extract_metadata(file_Input_path)
-        Orid_id = extract_orid_from_filename(csv_file_name)
-        if Orid_id:
-            metadata["proposal_id"] = Orid_id
-        manifest_id = extract_manifest_info(file_Input_path)
-        num_samples = count_samples(file_Input_path)
-        sample_details = extract_sample_data(file_Input_path)
-        
-
-        # Combine all information
-
-        file_info = {
-            'file_type': 'BeadStudio',
-            'file_name': csv_file_name,
-            'file_path': file_Input_path,
-            'metadata': metadata,
-            'manifest_id': manifest_id,
-            'number_of_samples': len(sample_details), # Count is now derived from the list length
-            'samples': sample_details  # This adds the key-value pairs for every sample
-        }
+        # Extraction and JSON output (served from the parse cache when the file is unchanged)
+        file_results = one_single_file(input_dir_path, output_dir_path, csv_file_name)
         processed_count += 1
         print(f" Processing completed for: {csv_file_name}")
 
-        # Replace .csv with .json for the filename
-        json_filename = os.path.splitext(csv_file_name)[0] + '.json'
-        json_path = os.path.join(output_dir_path, json_filename)
-        
-        with open(json_path, 'w') as f:
-            json.dump(file_info, f, indent=2)
-            
-        results.append(file_info)
+        results.extend(file_results)
         # Final Summary Print
     print("-" * 30)
     print(f"Batch Summary:")
@@ -225,6 +189,22 @@ def process_all_csv_files(input_dir_path, output_dir_path):
     return results
 
 
+def save_outputs(file_info, output_dir_path, csv_file_name):
+    """
+    Writes the output files of one extraction (JSON, plus Parquet tables in --format parquet)
+    and indexes its samples for Sample_History_Extractor.
+    Also used by Parse_Cache to re-create the outputs of a cached extraction.
+    Returns the path of the JSON file.
+    """
+    json_path = Output_Writer.write_record(file_info, output_dir_path, csv_file_name)
+
+    # Make the samples searchable by Sample_History_Extractor
+    Sample_Index.index_file_info(output_dir_path, os.path.basename(json_path), file_info)
+    return json_path
+
+
+@Timing_Trace.traced_extractor
+@Parse_Cache.cached_extractor
 def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     """
     Process one CSV file in a directory and extract metadata.
@@ -248,13 +228,18 @@ def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     results = []
     os.makedirs(output_dir_path, exist_ok=True)
 
-    metadata = extract_metadata(file_Input_path)
+    # Read the file once and index its [Section] markers
+    section_index = Section_Index.build_section_index(file_Input_path)
+
+    with Timing_Trace.span('parse', section='[Header]'):
+        metadata = extract_metadata(file_Input_path, section_index)
     Orid_id = extract_orid_from_filename(csv_file_name)
     if Orid_id:
             metadata["proposal_id"] = Orid_id
-    manifest_id = extract_manifest_info(file_Input_path)
-    num_samples = count_samples(file_Input_path)
-    sample_details = extract_sample_data(file_Input_path)
+    with Timing_Trace.span('parse', section='[Manifests]'):
+        manifest_id = extract_manifest_info(file_Input_path, section_index)
+    with Timing_Trace.span('parse', section='[Data]'):
+        sample_details = extract_sample_data(file_Input_path, section_index)
 
     # 3. Combine all information    
     file_info = {
@@ -268,12 +253,7 @@ def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
         }
 
     # 4. Save JSON
-    
-    json_filename = os.path.splitext(csv_file_name)[0] + '.json'
-    json_path = os.path.join(output_dir_path, json_filename)
-        
-    with open(json_path, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    json_path = save_outputs(file_info, output_dir_path, csv_file_name)
             
     results.append(file_info)
     print(f"Saved Json output file to: {json_path}")
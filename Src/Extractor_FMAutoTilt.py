@@ -1,9 +1,17 @@
 import pandas as pd
-import io
+import numpy as np
 import os
-import json
 import argparse
 import re
+import File_Type_Detector
+import Section_Index
+import Section_Parser
+import Parse_Cache
+import Timing_Trace
+import Output_Writer
+
+# Bump whenever the JSON produced for a file changes (invalidates its Parse_Cache entries)
+EXTRACTOR_VERSION = "1.2"
 
 # --- 1. FILE VALIDATION & FILENAME PARSING ---
 
@@ -13,11 +21,10 @@ def is_fm_autotilt_report(file_path):
     Checks if the first line starts with '[FTM Through-Focus Stack'.
     """
     try:
-        with open(file_path, 'r') as f:
-            first_line = f.readline()
-        return first_line.startswith('[FTM Through-Focus Stack')
+        head_lines = File_Type_Detector.read_file_head(file_path)
     except Exception:
         return False
+    return File_Type_Detector.match_fm_autotilt_report(head_lines) is not None
 
 def parse_filename_metadata(csv_file_name):
     """
@@ -42,50 +49,192 @@ def parse_filename_metadata(csv_file_name):
 
 # --- 2. MULTI-SECTION EXTRACTION LOGIC ---
 
-def extract_all_sections(file_Input_path):
+def extract_all_sections(file_Input_path, section_index=None):
     """
     Dynamically captures every bracketed section in the AutoTilt report.
     Distinguishes between 2-column summaries and multi-column data tables.
     """
-    with open(file_Input_path, 'r') as f:
-        all_lines = f.readlines()
+    if section_index is None:
+        section_index = Section_Index.build_section_index(file_Input_path)
 
     all_data = {}
     
-    # Identify all section start positions
-    section_indices = [i for i, line in enumerate(all_lines) if line.startswith('[')]
-    
-    for idx, start_pos in enumerate(section_indices):
+    # Walk every section (marker line + body) recorded by the section index
+    for section in section_index['sections']:
+        marker = section['marker']
         # Keep the header name but remove brackets
-        section_header = all_lines[start_pos].strip().strip('[]')
-        
-        # Determine the end of the section
-        end_pos = section_indices[idx + 1] if idx + 1 < len(section_indices) else len(all_lines)
-        section_content = "".join(all_lines[start_pos + 1 : end_pos])
+        section_header = marker.strip('[]')
         
         try:
-            # Read without header first to check shape
-            df_check = pd.read_csv(io.StringIO(section_content), header=None)
-            
-            if not df_check.empty:
-                # Use clean key names (lowercase, no spaces)
-                clean_key = section_header.lower().replace(' ', '_').replace('=', '').replace(',', '')
+            with Timing_Trace.span('parse', section=marker):
+                # Summaries are parsed with the csv module, pandas only reads the wide tables
+                layout, content = Section_Parser.parse_section(section_index, section)
                 
-                if df_check.shape[1] == 2:
-                    # Summary Style: [{Label: Value}, ...]
-                    all_data[clean_key] = [{str(row[0]).strip(): row[1]} for _, row in df_check.iterrows()]
-                else:
-                    # Table Style: List of row dictionaries
-                    df_data = pd.read_csv(io.StringIO(section_content))
-                    all_data[clean_key] = df_data.to_dict(orient='records')
+                if layout != 'empty':
+                    # Use clean key names (lowercase, no spaces)
+                    clean_key = section_header.lower().replace(' ', '_').replace('=', '').replace(',', '')
+                    
+                    if layout == 'summary':
+                        # Summary Style: [{Label: Value}, ...]
+                        all_data[clean_key] = [{label: value} for label, value in content]
+                    else:
+                        # Table Style: List of row dictionaries
+                        all_data[clean_key] = content
         except Exception as e:
             # Some sections might be empty or decorative
             continue
 
     return all_data
 
-# --- 3. CORE PROCESSING ---
+# --- 3. THROUGH-FOCUS ANALYSIS ---
+# Focus metric of a stack row: mean of the left and right spot intensities (0 for invalid rows).
+# Per stack position:
+#   Best Focus Z --> metric-weighted centroid of the half-maximum region around the peak
+#                    (stays centred when the intensities saturate into a plateau)
+#   Peak Metric  --> maximum of the metric
+#   FWHM         --> width of the half-maximum region, interpolated between Z steps
+# All stacks of a report are padded into one array and analysed together.
+# Stacks are identified by their position and the settings they were taken with (the section title
+# ends with e.g. 'using settings for Dry Flow Cell'): dry and wet stacks at one position are two rows.
+
+THROUGH_FOCUS_KEY = 'through_focus_analysis'
+STACK_KEY_PATTERN = re.compile(r'^ftm_through-focus_stack_at_x_+([-\d.]+)mm_y_+([-\d.]+)mm(?:_using_settings_for_(.+))?')
+
+
+def _stack_rows(rows, record_dir):
+    """Rows of a stack section: the list itself, or the Parquet table it references (--format parquet records)."""
+    if isinstance(rows, dict) and 'parquet_file' in rows and record_dir is not None:
+        return pd.read_parquet(os.path.join(record_dir, rows['parquet_file'])).to_dict('records')
+    return rows if isinstance(rows, list) else None
+
+
+def load_stacks(sections, record_dir=None):
+    """
+    Loads the through-focus stacks of extracted sections (extract_all_sections, or a JSON record;
+    the Parquet tables of a --format parquet record are read from record_dir, its directory).
+    Returns (positions [(x_mm, y_mm, settings), ...], z, metric): z and metric are (stacks x points)
+    arrays padded with NaN; settings is e.g. 'dry flow cell', or None when the title has none.
+    """
+    positions, stacks = [], []
+    for key, rows in sections.items():
+        match = STACK_KEY_PATTERN.match(key)
+        if not match:
+            continue
+        rows = _stack_rows(rows, record_dir)
+        if not rows:
+            continue
+        try:
+            z = [float(row['Z Position[um]']) for row in rows]
+            valid = [str(row['Valid']).strip() == 'True' for row in rows]
+            intensity = [(float(row['Left Avg Intensity']) + float(row['Right Avg Intensity'])) / 2 for row in rows]
+        except (KeyError, TypeError, ValueError):
+            continue  # Not a through-focus table
+        settings = match.group(3).replace('_', ' ') if match.group(3) else None
+        positions.append((float(match.group(1)), float(match.group(2)), settings))
+        stacks.append((z, np.where(valid, intensity, 0.0)))
+
+    n_points = max((len(z) for z, _ in stacks), default=0)
+    z_array = np.full((len(stacks), n_points), np.nan)
+    metric_array = np.full((len(stacks), n_points), np.nan)
+    for i, (z, metric) in enumerate(stacks):
+        z_array[i, :len(z)] = z
+        metric_array[i, :len(metric)] = metric
+    return positions, z_array, metric_array
 
+
+def _half_max_crossing(z, metric, half, outside, inside):
+    """Z where the metric crosses half maximum between the points outside and inside the region (per stack)."""
+    rows = np.arange(len(z))
+    n_points = z.shape[1]
+    at_edge = (outside < 0) | (outside >= n_points)
+    outside = np.clip(outside, 0, n_points - 1)
+    z_in, metric_in = z[rows, inside], metric[rows, inside]
+    z_out, metric_out = z[rows, outside], metric[rows, outside]
+    # Region reaching the end of the stack (or its padding): the crossing is not measured, use the last point
+    at_edge |= np.isnan(metric_out)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        crossing = z_out + (half - metric_out) * (z_in - z_out) / (metric_in - metric_out)
+    return np.where(at_edge, z_in, crossing)
+
+
+def analyse_stacks(z, metric):
+    """
+    Analyses padded (stacks x points) through-focus stacks at once.
+    Returns a dictionary of per-stack arrays: peak_z, peak_metric, best_focus_z, fwhm, valid_points
+    (NaN positions / width for stacks without signal).
+    """
+    n_stacks, n_points = metric.shape
+    rows = np.arange(n_stacks)
+    index = np.arange(n_points)
+    filled = np.where(np.isnan(metric), -np.inf, metric)
+
+    peak_index = np.argmax(filled, axis=1)
+    peak_metric = metric[rows, peak_index]
+    half = peak_metric / 2
+
+    # Half-maximum region: the contiguous points around the peak with metric >= half maximum
+    below = ~(filled >= half[:, None])
+    left = np.max(np.where(below & (index < peak_index[:, None]), index, -1), axis=1)
+    right = np.min(np.where(below & (index > peak_index[:, None]), index, n_points), axis=1)
+    in_region = (index > left[:, None]) & (index < right[:, None])
+
+    weights = np.where(in_region, filled, 0.0)
+    has_signal = peak_metric > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        best_focus_z = (weights * np.where(in_region, z, 0.0)).sum(axis=1) / weights.sum(axis=1)
+    fwhm = np.abs(_half_max_crossing(z, metric, half, right, right - 1) - _half_max_crossing(z, metric, half, left, left + 1))
+
+    return {
+        'peak_z': np.where(has_signal, z[rows, peak_index], np.nan),
+        'peak_metric': peak_metric,
+        'best_focus_z': np.where(has_signal, best_focus_z, np.nan),
+        'fwhm': np.where(has_signal, fwhm, np.nan),
+        'valid_points': (filled > 0).sum(axis=1),
+    }
+
+
+def through_focus_table(sections, record_dir=None):
+    """
+    Returns the compact per-position table of the through-focus analysis
+    (one row dictionary per stack), or an empty list when the report has no stacks.
+    sections may be an existing JSON record (record_dir: its directory, see load_stacks).
+    """
+    positions, z, metric = load_stacks(sections, record_dir)
+    if not positions:
+        return []
+    analysis = {key: np.round(values, 3).tolist() for key, values in analyse_stacks(z, metric).items()}
+    return [
+        {
+            'X [mm]': x,
+            'Y [mm]': y,
+            'Settings': settings,
+            'Best Focus Z [um]': analysis['best_focus_z'][i],
+            'Peak Z [um]': analysis['peak_z'][i],
+            'Peak Metric': analysis['peak_metric'][i],
+            'FWHM [um]': analysis['fwhm'][i],
+            'Valid Points': int(analysis['valid_points'][i]),
+        }
+        for i, (x, y, settings) in enumerate(positions)
+    ]
+
+
+def through_focus_from_record(json_path):
+    """Re-analyses the stacks of an FM-AutoTilt JSON record (json or parquet format) without the source CSV."""
+    return through_focus_table(Output_Writer.read_json(json_path), os.path.dirname(os.path.abspath(json_path)))
+
+# --- 4. CORE PROCESSING ---
+
+def save_outputs(file_info, output_dir_path, csv_file_name):
+    """
+    Writes the output files of one extraction (JSON, plus Parquet tables in --format parquet).
+    Also used by Parse_Cache to re-create the outputs of a cached extraction.
+    Returns the path of the JSON file.
+    """
+    return Output_Writer.write_record(file_info, output_dir_path, csv_file_name)
+
+
+@Timing_Trace.traced_extractor
+@Parse_Cache.cached_extractor
 def one_single_file(input_dir_path, output_dir_path, csv_file_name):
     """
     Processes a single AutoTilt report into an enriched JSON.
@@ -106,6 +255,10 @@ def one_single_file(input_dir_path, output_dir_path, csv_file_name):
     #  Extract all bracketed sections (Results, Stacks, Tilt Positions, etc.)
     sections = extract_all_sections(full_input_path)
 
+    #  Best focus, peak and width of every through-focus stack
+    with Timing_Trace.span('analyse'):
+        through_focus = through_focus_table(sections)
+
     # 3. BCombine all information and Build JSON file
     file_info = {
         'file_type': 'FM-AutoTilt Report',
@@ -114,12 +267,11 @@ def one_single_file(input_dir_path, output_dir_path, csv_file_name):
         'metadata': file_metadata,
         **sections  # Merges all dynamically found sections
     }
+    if through_focus:
+        file_info[THROUGH_FOCUS_KEY] = through_focus
 
     # Save JSON
-    os.makedirs(output_dir_path, exist_ok=True)
-    json_path = os.path.join(output_dir_path, csv_file_name.replace('.csv', '.json'))
-    with open(json_path, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    json_path = save_outputs(file_info, output_dir_path, csv_file_name)
 
     results.append(file_info)
     print(f"Saved Json output file to: {json_path}")
@@ -147,7 +299,7 @@ def process_all_csv_files(input_dir_path, output_dir_path):
             
     return results
 
-# --- 4. SUMMARY & REPORTING ---
+# --- 5. SUMMARY & REPORTING ---
 
 def create_summary_table(results):
     """Creates a summary DataFrame for the master CSV report."""
@@ -155,7 +307,7 @@ def create_summary_table(results):
     for result in results:
         meta = result.get('metadata', {})
         # List which sections were found (excluding standard file keys)
-        sections = [k for k in result.keys() if k not in ['file_name', 'file_type', 'file_path', 'metadata']]
+        sections = [k for k in result.keys() if k not in ['file_name', 'file_type', 'file_path', 'metadata', THROUGH_FOCUS_KEY]]
         
         summary_data.append({
             'File Name': result['file_name'],
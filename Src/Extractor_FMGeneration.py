@@ -1,9 +1,17 @@
 import pandas as pd
 import io
 import os
-import json
 import argparse
 import re
+import File_Type_Detector
+import Section_Index
+import Section_Parser
+import Parse_Cache
+import Timing_Trace
+import Output_Writer
+
+# Bump whenever the JSON produced for a file changes (invalidates its Parse_Cache entries)
+EXTRACTOR_VERSION = "1.0"
 
 # --- 1. FILE VALIDATION ---
 
@@ -12,11 +20,10 @@ def is_fm_generation_report(file_path):
     Validates if the file is an FM-Generation Report.
     """
     try:
-        with open(file_path, 'r') as f:
-            first_line = f.readline()
-        return "Instrument Name" in first_line
+        head_lines = File_Type_Detector.read_file_head(file_path)
     except Exception:
         return False
+    return File_Type_Detector.match_fm_generation_report(head_lines) is not None
     
 
 def extract_orid_from_filename(csv_file_name):
@@ -40,56 +47,47 @@ def extract_orid_from_filename(csv_file_name):
 
 # --- 2. MULTI-PART EXTRACTION LOGIC ---
 
-def extract_all_sections(file_Input_path):
+def extract_all_sections(file_Input_path, section_index=None):
     """
     Extracts  top-level metadata and specific part from the CSV.
     Returns a dictionary with all extracted parts.
     1. Top-level metadata (before first '[')
     2. Each [Section] as a separate key in the dictionary
     """
-    with open(file_Input_path, 'r') as f:
-        all_lines = f.readlines()
+    if section_index is None:
+        section_index = Section_Index.build_section_index(file_Input_path)
 
     all_data = {}
     
     # 1.  Extracting Top Metadata (lines before the first '[')
-    header_lines = []
-    for line in all_lines:
-        if line.startswith('['): break
-        if line.strip(): header_lines.append(line)
+    header_lines = [line for line in Section_Index.get_preamble_text(section_index).splitlines(keepends=True) if line.strip()]
     
     if header_lines:
-        header_df = pd.read_csv(io.StringIO("".join(header_lines)), header=None, names=['Key', 'Value'])
-        all_data['metadata'] = {str(row['Key']).lower().replace(' ', '_'): row['Value'] for _, row in header_df.iterrows()}
+        with Timing_Trace.span('parse', section='preamble'):
+            # Key/value block parsed with the csv module; pandas only for the layouts it does not cover
+            pairs = Section_Parser.parse_header_pairs("".join(header_lines), names=['Key', 'Value'])
+            if pairs is None:
+                header_df = pd.read_csv(io.StringIO("".join(header_lines)), header=None, names=['Key', 'Value'])
+                pairs = [(row['Key'], row['Value']) for _, row in header_df.iterrows()]
+            all_data['metadata'] = {str(key).lower().replace(' ', '_'): value for key, value in pairs}
 
     # 2. Section extraction
-    section_indices = [i for i, line in enumerate(all_lines) if line.startswith('[')]
-    
-    for idx, start_pos in enumerate(section_indices):
-        section_header = all_lines[start_pos].strip().strip('[]').lower().replace(' ', '_')
-        
-        end_pos = section_indices[idx + 1] if idx + 1 < len(section_indices) else len(all_lines)
-        section_content = "".join(all_lines[start_pos + 1 : end_pos])
+    for section in section_index['sections']:
+        marker = section['marker']
+        section_header = marker.strip('[]').lower().replace(' ', '_')
         
         try:
-            # Use header=None for summary sections to prevent values becoming keys
-            df = pd.read_csv(io.StringIO(section_content), header=None)
-            
-            if not df.empty:
-                # CHECK: Is this a 2-column summary section (like focusmodel_red or overall)?
-                if df.shape[1] == 2:
-                    # Convert 2-column table to a list of single {Label: Value} dicts
-                    summary_list = []
-                    for _, row in df.iterrows():
-                        key = str(row[0]).strip()
-                        val = row[1]
-                        summary_list.append({key: val})
-                    all_data[section_header] = summary_list
-                else:
+            with Timing_Trace.span('parse', section=marker):
+                # 2-column summaries are parsed with the csv module (header=None: values must not become keys),
+                # the data tables by pandas with their header row
+                layout, content = Section_Parser.parse_section(section_index, section)
+                
+                if layout == 'summary':
+                    # Convert 2-column table (like focusmodel_red or overall) to a list of single {Label: Value} dicts
+                    all_data[section_header] = [{key: val} for key, val in content]
+                elif layout == 'table':
                     # It's a standard data table (like FocusModel Input Green)
-                    # Re-read with proper header
-                    df_data = pd.read_csv(io.StringIO(section_content))
-                    all_data[section_header] = df_data.to_dict(orient='records')
+                    all_data[section_header] = content
                     
         except Exception as e:
             print(f"Warning: Could not parse section [{section_header}]: {e}")
@@ -98,6 +96,17 @@ def extract_all_sections(file_Input_path):
 
 # --- 3. PROCESSING FUNCTIONS ---
 
+def save_outputs(file_info, output_dir_path, csv_file_name):
+    """
+    Writes the output files of one extraction (JSON, plus Parquet tables in --format parquet).
+    Also used by Parse_Cache to re-create the outputs of a cached extraction.
+    Returns the path of the JSON file.
+    """
+    return Output_Writer.write_record(file_info, output_dir_path, csv_file_name)
+
+
+@Timing_Trace.traced_extractor
+@Parse_Cache.cached_extractor
 def one_single_file(input_dir_path, output_dir_path, csv_file_name):
     """
     Processes a single FM-Generation Report and captures all sub-parts.
@@ -134,12 +143,7 @@ def one_single_file(input_dir_path, output_dir_path, csv_file_name):
     }
 
     # Save JSON
-    os.makedirs(output_dir_path, exist_ok=True)    
-    json_filename = os.path.splitext(csv_file_name)[0] + '.json'
-    json_path = os.path.join(output_dir_path, json_filename)
-        
-    with open(json_path, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    json_path = save_outputs(file_info, output_dir_path, csv_file_name)
             
     results.append(file_info)
     print(f"Saved Json output file to: {json_path}")
@@ -173,29 +177,10 @@ def process_all_csv_files(input_dir_path, output_dir_path):
         if not is_fm_generation_report(file_Input_path):
             print(f"FM-Generation Report file validation failed : {csv_file_name} is not a valid FM-Generation Report.")
             continue
-        print(f"FM-Generation Report file validated successfully. Extracting data from: {csv_file_name}")    
-
         try:
-            # Extract metadata
-            orid_id = extract_orid_from_filename(csv_file_name)
-            all_extracted_parts = extract_all_sections(file_Input_path)
-
-            file_info = {
-                "file_type": "FM-Generation Report",
-                "orid": orid_id,
-                "file_name": csv_file_name,
-                "file_path": file_Input_path,
-                **all_extracted_parts
-            }
-
-            # Write JSON, Replace .csv with .json for the filename
-            json_filename = os.path.splitext(csv_file_name)[0] + ".json"
-            json_path = os.path.join(output_dir_path, json_filename)
-
-            with open(json_path, "w") as f:
-                json.dump(file_info, f, indent=2)
-
-            results.append(file_info)
+            # Extraction and JSON output (served from the parse cache when the file is unchanged)
+            file_results = one_single_file(input_dir_path, output_dir_path, csv_file_name)
+            results.extend(file_results)
             processed_count += 1
 
             print(f"Processing completed for: {csv_file_name}")
@@ -225,10 +210,10 @@ def create_summary_table(results):
     for result in results:
         meta = result.get('metadata', {})
         # Identify found sections for the summary
-        sections = [k for k in result.keys() if k not in ['file_name', 'file_type', 'metadata', 'orid', 'file_path']]
+        sections = [k for k in result.keys() if k not in ['file_name', 'file_type', 'metadata', 'orid', 'ORID', 'file_path']]
         
         summary_data.append({
-            'ORID': result.get('orid'),
+            'ORID': result.get('ORID', result.get('orid')),
             'File Name': result['file_name'],
             'Instrument ID': meta.get('instrument_name', 'N/A'),
             'Date': meta.get('date', 'N/A'),
@@ -1,9 +1,17 @@
 import pandas as pd
-import io
 import os
-import json
 import argparse
 import re
+import File_Type_Detector
+import Section_Index
+import Section_Parser
+import Parse_Cache
+import Timing_Trace
+import Sample_Index
+import Output_Writer
+
+# Bump whenever the JSON produced for a file changes (invalidates its Parse_Cache entries)
+EXTRACTOR_VERSION = "1.0"
 
 # --- 1. FILE VALIDATION ---
 
@@ -13,16 +21,14 @@ def is_illumina_samplesheet(file_Input_path):
     the keyword [Header] and IEMFileVersion in the top lines.
     """
     try:
-        with open(file_Input_path, 'r') as f:
-            head = [next(f).lower() for _ in range(10)]
-        content = "".join(head)
-        return '[header]' in content and 'iemfileversion' in content
+        head_lines = File_Type_Detector.read_file_head(file_Input_path)
     except Exception:
         return False
+    return File_Type_Detector.match_illumina_samplesheet(head_lines) is not None
 
 # --- 2. EXTRACTION HELPERS ---
 
-def extract_metadata(file_Input_path):
+def extract_metadata(file_Input_path, section_index=None):
     """
     Extract header-level metadata from a BeadStudio CSV file.
     Returns a dictionary with project name, experiment name, date, and other metadata.
@@ -30,12 +36,11 @@ def extract_metadata(file_Input_path):
     metadata = {}
     
     try:
-        header_df = get_csv_section(file_Input_path, '[Header]')
-        
+        if section_index is None:
+            section_index = Section_Index.build_section_index(file_Input_path)
+
         # Extract key metadata fields
-        for _, row in header_df.iterrows():
-            key = row.iloc[0]
-            value = row.iloc[1]
+        for key, value in header_pairs(file_Input_path, section_index):
             if pd.notna(key) and pd.notna(value):
                 # Store metadata with lowercase keys
                 metadata[key.lower().replace(' ', '_')] = value
@@ -45,38 +50,55 @@ def extract_metadata(file_Input_path):
     return metadata
 
 
+def header_pairs(file_Input_path, section_index):
+    """
+    Returns the (key, value) pairs of the [Header] block. Key/value block parsed with the csv module;
+    pandas only for the layouts it does not cover.
+    """
+    header_text = Section_Index.get_section_text(section_index, '[Header]')
+    pairs = Section_Parser.parse_header_pairs(header_text, skipinitialspace=True, drop_empty_columns=True) if header_text is not None else None
+    if pairs is None:
+        header_df = get_csv_section(file_Input_path, '[Header]', section_index)
+        pairs = [(row.iloc[0], row.iloc[1]) for _, row in header_df.iterrows()]
+    return pairs
+
+
 def extract_orid_from_filename(csv_file_name):
     """Extracts the ORID ID from the filename using the standard regex."""
     pattern = r"(ORID\d{4})"
     match = re.search(pattern, csv_file_name)
     return match.group(1) if match else None
 
-def get_csv_section(file_Input_path, section_name):
+def get_csv_section(file_Input_path, section_name, section_index=None):
     """Extracts a specific section (e.g., [Header], [Data]) into a DataFrame."""
-    with open(file_Input_path, 'r') as f:
-        lines = f.readlines()
-    
-    start_idx = -1
-    for i, line in enumerate(lines):
-        if line.startswith(section_name):
-            start_idx = i
-            break
-            
-    if start_idx == -1:
+    if section_index is None:
+        section_index = Section_Index.build_section_index(file_Input_path)
+
+    section_stream = Section_Index.get_section_stream(section_index, section_name)
+    if section_stream is None:
         return pd.DataFrame()
 
-    end_idx = len(lines)
-    for i in range(start_idx + 1, len(lines)):
-        if lines[i].startswith('['):
-            end_idx = i
-            break
-            
-    section_content = "".join(lines[start_idx + 1 : end_idx])
     # Use skipinitialspace to handle potential trailing commas in CSV headers
-    return pd.read_csv(io.StringIO(section_content), skipinitialspace=True).dropna(axis=1, how='all')
+    return pd.read_csv(section_stream, skipinitialspace=True).dropna(axis=1, how='all')
 
 # --- 3. PROCESSING LOGIC ---
 
+def save_outputs(file_info, output_dir_path, csv_file_name):
+    """
+    Writes the output files of one extraction (JSON, plus Parquet tables in --format parquet)
+    and indexes its samples for Sample_History_Extractor.
+    Also used by Parse_Cache to re-create the outputs of a cached extraction.
+    Returns the path of the JSON file.
+    """
+    json_path = Output_Writer.write_record(file_info, output_dir_path, csv_file_name)
+
+    # Make the samples searchable by Sample_History_Extractor
+    Sample_Index.index_file_info(output_dir_path, os.path.basename(json_path), file_info)
+    return json_path
+
+
+@Timing_Trace.traced_extractor
+@Parse_Cache.cached_extractor
 def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     """Processes a single Illumina Sample Sheet and generates an enriched JSON."""
      # Full path to the input file    
@@ -90,22 +112,24 @@ def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     # 2. Extraction
     os.makedirs(output_dir_path, exist_ok=True)
     results = []
+    # Read the file once and index its [Section] markers
+    section_index = Section_Index.build_section_index(file_Input_path)
+
     # Metadata from [Header]
-    header_df = get_csv_section(file_Input_path, '[Header]')
-    metadata = {}
-    if not header_df.empty:
-        for _, row in header_df.iterrows():
-            if pd.notna(row.iloc[0]):
-                key = str(row.iloc[0]).lower().replace(' ', '_')
-                metadata[key] = row.iloc[1]
+    with Timing_Trace.span('parse', section='[Header]'):
+        metadata = {}
+        for key, value in header_pairs(file_Input_path, section_index):
+            if pd.notna(key):
+                metadata[str(key).lower().replace(' ', '_')] = value
 
     #  ORID and File Info
     orid = extract_orid_from_filename(csv_file_name)
     if orid: metadata["proposal_id"] = orid
 
     #  Detailed Sample Data from [Data]
-    data_df = get_csv_section(file_Input_path, '[Data]')
-    sample_details = data_df.to_dict(orient='records') if not data_df.empty else []
+    with Timing_Trace.span('parse', section='[Data]'):
+        data_df = get_csv_section(file_Input_path, '[Data]', section_index)
+        sample_details = data_df.to_dict(orient='records') if not data_df.empty else []
 
     # 3. Combine all information  and Build JSON file
     file_info = {
@@ -118,10 +142,7 @@ def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     }
 
     # 4. Save JSON
-    os.makedirs(output_dir_path, exist_ok=True)
-    json_path = os.path.join(output_dir_path, csv_file_name.replace('.csv', '.json'))
-    with open(json_path, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    json_path = save_outputs(file_info, output_dir_path, csv_file_name)
     results.append(file_info)
     print(f"Saved Json output file to: {json_path}")
     return results
@@ -2,6 +2,11 @@ import os
 import argparse
 import re
 import Main_Auto_Processor  # Leverages your established auto-detection logic
+import Parse_Cache
+import Output_Writer
+import Timing_Trace
+import Dir_Inventory
+import Ro_Crate
 
 # --- 1. UTILITIES ---
 
@@ -13,10 +18,54 @@ def get_orid_from_filename(filename):
 
 # --- 2. RECURSIVE CRAWLER LOGIC ---
 
+def iter_orid_csv_files(root_input_dir, target_orid):
+    """
+    Walks root_input_dir with os.scandir and yields (dirpath, file_name) for every CSV of target_orid.
+
+    The LTS layout encodes the ORID in directory names (post_run/ORID0036,
+    iScan/20250219_ORID0036_NEUROMED_EPIC, NANOPORE/2024/20240619_ORID0077_RUN1):
+    - subtrees whose directory name carries a DIFFERENT ORID are never entered;
+    - a CSV matches when its own filename carries the target ORID or, if its filename has
+      no ORID, when it lies somewhere below a directory named after the target ORID.
+    Directories and files are visited in sorted order; unchanged directories are served from
+    the directory inventory (see Dir_Inventory).
+    """
+    target = target_orid.upper()
+    root_orid = get_orid_from_filename(os.path.basename(os.path.normpath(root_input_dir)))
+    stack = [(root_input_dir, target if root_orid and root_orid.upper() == target else None)]
+
+    try:
+        while stack:
+            dirpath, inherited_orid = stack.pop()
+            try:
+                dir_names, csv_names = Dir_Inventory.list_directory(dirpath)
+            except OSError as e:
+                print(f"   ⚠️  Cannot list {dirpath}: {e}")
+                continue
+
+            for name in csv_names:
+                file_orid = get_orid_from_filename(name)
+                effective_orid = file_orid.upper() if file_orid else inherited_orid
+                if effective_orid == target:
+                    yield dirpath, name
+
+            subdirs = []
+            for name in dir_names:
+                dir_orid = get_orid_from_filename(name)
+                if dir_orid and dir_orid.upper() != target:
+                    continue  # Another project: prune the whole subtree
+                subdirs.append((os.path.join(dirpath, name), dir_orid.upper() if dir_orid else inherited_orid))
+
+            # Depth-first, in sorted order
+            stack.extend(reversed(subdirs))
+    finally:
+        Dir_Inventory.flush()
+
+
 def process_recursive_by_orid(root_input_dir, target_orid, output_dir):
     """
-    Dives into all subdirectories of root_input_dir and processes 
-    any CSV matching the target ORID using the Auto-Processor registry.
+    Dives into the subdirectories of root_input_dir that can belong to the target ORID
+    (see iter_orid_csv_files) and processes every matching CSV using the Auto-Processor registry.
     """
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
@@ -33,31 +82,22 @@ def process_recursive_by_orid(root_input_dir, target_orid, output_dir):
     successful_count = 0
     total_found_matching = 0
 
-    # os.walk generates the file names in a directory tree
-    # It handles 'infinite' nesting by visiting every branch
-    for dirpath, dirnames, filenames in os.walk(root_input_dir):
-        # Filter for CSV files in the current folder
-        csv_files = [f for f in filenames if f.lower().endswith('.csv')]
+    # The crawler only enters subtrees that can hold files of this ORID
+    for dirpath, file_name in iter_orid_csv_files(root_input_dir, target_orid):
+        total_found_matching += 1
+        full_path = os.path.join(dirpath, file_name)
         
-        for file_name in csv_files:
-            file_orid = get_orid_from_filename(file_name)
-            
-            # Check if this file matches our target ORID
-            if file_orid and file_orid.upper() == target_orid.upper():
-                total_found_matching += 1
-                full_path = os.path.join(dirpath, file_name)
-                
-                print(f"\n🔍 FILE FOUND: {file_name}")
-                print(f"   LOCATION: {dirpath}")
-                
-                # 3. Use your Auto-Detector to identify and process the file
-                try:
-                    # process_single_path returns a list of results on success
-                    result = Main_Auto_Processor.process_single_path(full_path, output_dir)
-                    if result:
-                        successful_count += 1
-                except Exception as e:
-                    print(f"   ❌ ERROR processing {file_name}: {e}")
+        print(f"\n🔍 FILE FOUND: {file_name}")
+        print(f"   LOCATION: {dirpath}")
+        
+        # 3. Use your Auto-Detector to identify and process the file
+        try:
+            # process_single_path returns a list of results on success
+            result = Main_Auto_Processor.process_single_path(full_path, output_dir)
+            if result:
+                successful_count += 1
+        except Exception as e:
+            print(f"   ❌ ERROR processing {file_name}: {e}")
 
     # --- 3. FINAL SUMMARY ---
     print("\n" + "=" * width)
@@ -76,13 +116,27 @@ def main():
     parser.add_argument("root_dir", help="The general top-level folder to start the search")
     parser.add_argument("target_orid", help="The ORID to filter for (e.g., ORID0036)")
     parser.add_argument("output_dir", help="Where to save all generated JSON files")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
+    Dir_Inventory.add_inventory_arguments(parser)
+    Ro_Crate.add_crate_arguments(parser)
 
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
+    Dir_Inventory.configure_from_args(args)
     
     # Normalize ORID input
     target_orid = args.target_orid.strip()
     
     process_recursive_by_orid(args.root_dir, target_orid, args.output_dir)
 
+    if args.ro_crate:
+        metadata_path, counts = Ro_Crate.write_crate(args.output_dir, orid=target_orid, threads=args.crate_threads)
+        print(f"📦 RO-Crate: {counts['files']} file(s), {counts['sources']} source CSV(s) in {metadata_path} "
+              f"({counts['hashed']} checksum(s) computed, {counts['reused']} reused)")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,22 @@
 import pandas as pd
+import numpy as np
 import os
-import json
 import re
+import File_Type_Detector
+import Parse_Cache
+import Timing_Trace
+import Output_Writer
+import Thermal_History
 import argparse  
 
+# Bump whenever the JSON produced for a file changes (invalidates its Parse_Cache entries)
+EXTRACTOR_VERSION = "1.1"
+
+# Number of data rows held in memory at once by the streaming statistics pass
+STATS_CHUNK_ROWS = 10000
+# Bucket reduction of the downsampled time series (recorded in the series and the JSON record)
+DOWNSAMPLE_METHOD = 'minmax'
+
 
 def is_thermal_report(full_file_input_path):
     """
@@ -11,12 +24,10 @@ def is_thermal_report(full_file_input_path):
     Checks for 'Side' on Line 1 and 'Time,Current Cycle' on Line 3.
     """
     try:
-        with open(full_file_input_path, 'r') as f:
-            lines = [f.readline().strip() for _ in range(3)]
-        
-        return lines[0].startswith('Side') and "Time,Current Cycle" in lines[2]
+        head_lines = File_Type_Detector.read_file_head(full_file_input_path)
     except Exception:
         return False
+    return File_Type_Detector.match_thermal_report(head_lines) is not None
     
 def extract_columns_data(full_file_input_path):
     """
@@ -30,6 +41,188 @@ def extract_columns_data(full_file_input_path):
         print(f"Error extracting column data from {full_file_input_path}: {e}")
         return {}
 
+def sensor_values(chunk):
+    """Sensor columns of a chunk of data rows (all but the Time column), non-numeric values as NaN."""
+    values = chunk.iloc[:, 1:]
+    text_columns = [column for column, dtype in values.dtypes.items() if not pd.api.types.is_numeric_dtype(dtype)]
+    if text_columns:
+        # Only the columns pandas could not parse as numbers need converting
+        values = values.copy()
+        values[text_columns] = values[text_columns].apply(pd.to_numeric, errors='coerce')
+    return values
+
+
+def numeric_chunk(chunk):
+    """A chunk of data rows with its sensor columns as numbers (see sensor_values), the Time column unchanged."""
+    return pd.concat([chunk.iloc[:, :1], sensor_values(chunk)], axis=1)
+
+
+def extract_streaming_statistics(full_file_input_path, chunk_rows=STATS_CHUNK_ROWS):
+    """
+    Reads the data rows in chunks of chunk_rows (one sequential pass, peak memory independent
+    of the file length) and merges the per-chunk statistics.
+
+    Returns a dictionary:
+        'number_of_data_points' --> number of data rows
+        'first_timestamp'       --> first value of the Time column
+        'last_timestamp'        --> last value of the Time column
+        'column_statistics'     --> {column name: {'count', 'min', 'max', 'mean', 'stddev'}}
+                                    for every sensor column (stddev is the sample standard deviation)
+    """
+    row_count = 0
+    first_timestamp = None
+    last_timestamp = None
+    columns = None
+
+    # Running statistics per sensor column, merged chunk by chunk (Chan et al. parallel variance)
+    n = mean = m2 = col_min = col_max = None
+
+    for chunk in pd.read_csv(full_file_input_path, skiprows=2, chunksize=chunk_rows):
+        if chunk.empty:
+            continue
+        row_count += len(chunk)
+
+        # The first column holds the timestamps, the others the sensor values
+        timestamps = chunk.iloc[:, 0]
+        if first_timestamp is None:
+            first_timestamp = str(timestamps.iloc[0])
+        last_timestamp = str(timestamps.iloc[-1])
+
+        values = sensor_values(chunk)
+        chunk_n = values.count().to_numpy(dtype=float)
+        chunk_mean = values.mean().to_numpy(dtype=float)
+        chunk_m2 = (values.var(ddof=0).to_numpy(dtype=float)) * chunk_n
+        chunk_min = values.min().to_numpy(dtype=float)
+        chunk_max = values.max().to_numpy(dtype=float)
+
+        if columns is None:
+            columns = list(values.columns)
+            n, mean, m2, col_min, col_max = chunk_n, chunk_mean, chunk_m2, chunk_min, chunk_max
+            continue
+
+        total_n = n + chunk_n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = np.nan_to_num(chunk_mean) - np.nan_to_num(mean)
+            weight = np.where(total_n > 0, chunk_n / total_n, 0.0)
+            mean = np.where(total_n > 0, np.nan_to_num(mean) + delta * weight, np.nan)
+            m2 = np.nan_to_num(m2) + np.nan_to_num(chunk_m2) + delta ** 2 * n * weight
+        n = total_n
+        col_min = np.fmin(col_min, chunk_min)
+        col_max = np.fmax(col_max, chunk_max)
+
+    column_statistics = {}
+    for i, column in enumerate(columns or []):
+        count = int(n[i])
+        column_statistics[column] = {
+            'count': count,
+            'min': float(col_min[i]) if count else None,
+            'max': float(col_max[i]) if count else None,
+            'mean': float(mean[i]) if count else None,
+            'stddev': float(np.sqrt(m2[i] / (count - 1))) if count > 1 else None
+        }
+
+    return {
+        'number_of_data_points': row_count,
+        'first_timestamp': first_timestamp,
+        'last_timestamp': last_timestamp,
+        'column_statistics': column_statistics
+    }
+
+
+def downsample_time_series(full_file_input_path, row_count, points, chunk_rows=STATS_CHUNK_ROWS):
+    """
+    Min/max buckets for dashboards: the row_count data rows are split into (at most) points buckets
+    of consecutive rows, and every sensor column keeps the minimum, maximum and mean of each bucket,
+    so short excursions survive (their extreme is the bucket min or max).
+    The file is streamed in chunks of chunk_rows; every chunk is reduced for all columns at once.
+
+    Returns a column-oriented dictionary:
+        'method', 'source_rows', 'points'
+        'time_start', 'time_end' --> first / last timestamp of every bucket
+        'rows'                   --> number of data rows of every bucket
+        'columns'                --> {column name: {'min': [...], 'max': [...], 'mean': [...]}}
+    """
+    points = max(1, min(points, row_count))
+    # First row of every bucket (equal row counts: the sampling interval of the reports is regular)
+    bucket_starts = np.arange(points) * row_count // points
+
+    columns = None
+    bucket_min = bucket_max = bucket_sum = bucket_count = None
+    time_start = [None] * points
+    time_end = [None] * points
+    position = 0
+
+    for chunk in pd.read_csv(full_file_input_path, skiprows=2, chunksize=chunk_rows):
+        if chunk.empty:
+            continue
+        values = sensor_values(chunk).to_numpy(dtype=float)
+        if columns is None:
+            columns = list(chunk.columns[1:])
+            bucket_min = np.full((points, len(columns)), np.nan)
+            bucket_max = np.full((points, len(columns)), np.nan)
+            bucket_sum = np.zeros((points, len(columns)))
+            bucket_count = np.zeros((points, len(columns)))
+
+        # Runs of consecutive rows of the chunk falling in the same bucket (a bucket may span two chunks)
+        bucket = np.searchsorted(bucket_starts, np.arange(position, position + len(chunk)), side='right') - 1
+        run_starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+        run_ends = np.append(run_starts[1:], len(chunk)) - 1
+        ids = bucket[run_starts]
+
+        present = ~np.isnan(values)
+        bucket_min[ids] = np.fmin(bucket_min[ids], np.fmin.reduceat(values, run_starts, axis=0))
+        bucket_max[ids] = np.fmax(bucket_max[ids], np.fmax.reduceat(values, run_starts, axis=0))
+        bucket_sum[ids] += np.add.reduceat(np.where(present, values, 0.0), run_starts, axis=0)
+        bucket_count[ids] += np.add.reduceat(present, run_starts, axis=0)
+
+        timestamps = chunk.iloc[:, 0].astype(str).to_numpy()
+        for bucket_id, start, end in zip(ids, run_starts, run_ends):
+            if time_start[bucket_id] is None:
+                time_start[bucket_id] = timestamps[start]
+            time_end[bucket_id] = timestamps[end]
+        position += len(chunk)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bucket_mean = np.round(bucket_sum / bucket_count, 4)
+
+    return {
+        'method': DOWNSAMPLE_METHOD,
+        'source_rows': position,
+        'points': points,
+        'time_start': time_start,
+        'time_end': time_end,
+        'rows': np.diff(np.append(bucket_starts, max(row_count, position))).tolist(),
+        'columns': {
+            column: {'min': bucket_min[:, i].tolist(), 'max': bucket_max[:, i].tolist(), 'mean': bucket_mean[:, i].tolist()}
+            for i, column in enumerate(columns or [])
+        }
+    }
+
+
+def write_downsampled_series(series, downsampled_path):
+    """Writes a downsampled time series: column-oriented JSON, or one row per bucket in Parquet."""
+    if downsampled_path.endswith('.parquet'):
+        table = {'Time start': series['time_start'], 'Time end': series['time_end'], 'Rows': series['rows']}
+        for column, statistics in series['columns'].items():
+            for statistic, values in statistics.items():
+                table[f"{column} {statistic}"] = values
+        pd.DataFrame(table).to_parquet(downsampled_path, index=False)
+    else:
+        Output_Writer.write_json(series, downsampled_path)
+
+
+def downsampled_shape(downsampled_path):
+    """
+    (points, source rows) of an existing downsampled time series (see write_downsampled_series).
+    Raises OSError / ValueError / KeyError for a missing or broken file.
+    """
+    if downsampled_path.endswith('.parquet'):
+        rows = pd.read_parquet(downsampled_path, columns=['Rows'])['Rows']
+        return len(rows), int(rows.sum())
+    series = Output_Writer.read_json(downsampled_path)
+    return series['points'], series['source_rows']
+
+
 def extract_metadata_from_filename(csv_file_name):
     """
     Parses Instrument, Side, and Date from a Thermal Report filename.
@@ -68,6 +261,67 @@ def extract_orid_from_filename(csv_file_name):
     return None
 
 
+def save_outputs(file_info, output_dir_path, csv_file_name):
+    """
+    Writes the output files of one extraction and returns the path of its JSON file.
+    In --format parquet the full time series is also converted (chunk by chunk) to
+    <name>.time_series.parquet, referenced from the JSON record.
+    With --downsample, the downsampled time series is written to <name>.downsampled.json
+    (or .parquet), also referenced from the JSON record.
+    With --thermal-history, the time series is appended to the history store (once per report).
+    Also used by Parse_Cache to re-create the outputs of a cached extraction: side files written
+    after the last change of the report, with its number of rows (and the requested number of
+    points), are kept, so a cache hit does not read the CSV again.
+    """
+    os.makedirs(output_dir_path, exist_ok=True)
+    extra_fields = {}
+    source_path = file_info['file_path']
+    data_points = file_info.get('number_of_data_points')
+
+    if Output_Writer.is_parquet():
+        parquet_name = Output_Writer.table_file_name(csv_file_name, 'time_series')
+        parquet_path = os.path.join(output_dir_path, parquet_name)
+        row_count = None
+        if Output_Writer.is_up_to_date(parquet_path, source_path):
+            try:
+                row_count = Output_Writer.parquet_row_count(parquet_path)
+            except (OSError, ValueError):
+                pass
+        if row_count is None or row_count != data_points:
+            with Timing_Trace.span('write', table='time_series'):
+                row_count = Output_Writer.write_csv_as_parquet(source_path, parquet_path,
+                                                               chunk_rows=STATS_CHUNK_ROWS, convert_chunk=numeric_chunk,
+                                                               skiprows=2)
+        extra_fields['time_series'] = {'parquet_file': parquet_name, 'rows': row_count}
+
+    if Output_Writer.downsample_points() and data_points:
+        downsampled_name = Output_Writer.downsampled_file_name(csv_file_name)
+        downsampled_path = os.path.join(output_dir_path, downsampled_name)
+        # Same bucket count as downsample_time_series
+        points = max(1, min(Output_Writer.downsample_points(), data_points))
+        existing_shape = None
+        if Output_Writer.is_up_to_date(downsampled_path, source_path):
+            try:
+                existing_shape = downsampled_shape(downsampled_path)
+            except (OSError, ValueError, KeyError):
+                pass
+        if existing_shape != (points, data_points):
+            with Timing_Trace.span('downsample'):
+                series = downsample_time_series(source_path, data_points,
+                                                Output_Writer.downsample_points())
+            with Timing_Trace.span('write', table='downsampled'):
+                write_downsampled_series(series, downsampled_path)
+        extra_fields['downsampled_series'] = {'file': downsampled_name, 'method': DOWNSAMPLE_METHOD, 'points': points}
+
+    if Thermal_History.store_dir():
+        with Timing_Trace.span('history'):
+            Thermal_History.ingest_report(file_info)
+
+    return Output_Writer.write_record(file_info, output_dir_path, csv_file_name, extra_fields or None)
+
+
+@Timing_Trace.traced_extractor
+@Parse_Cache.cached_extractor
 def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     """
     Processes a single Thermal Report. 
@@ -90,10 +344,12 @@ def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
     os.makedirs(output_dir_path, exist_ok=True)
     meta_from_name = extract_metadata_from_filename(csv_file_name)
     
-    # Load data (skip Side label and blank line)
-    df = pd.read_csv(full_file_input_path, skiprows=2)
-    row_count = len(df)
-    columns_details = extract_columns_data(full_file_input_path)
+    # Stream the data rows once (skip Side label and blank line): row count, time range and statistics
+    # (the chunked reader reads and parses together: its span covers both)
+    with Timing_Trace.span('parse', section='data'):
+        statistics = extract_streaming_statistics(full_file_input_path)
+    with Timing_Trace.span('parse', section='columns'):
+        columns_details = extract_columns_data(full_file_input_path)
 
     # Extract ORID ID for Thermal file name 
     Orid_id = extract_orid_from_filename(csv_file_name)
@@ -108,14 +364,15 @@ def one_single_file(input_file_dir_path, output_dir_path, csv_file_name):
         'instrument_id': meta_from_name.get('instrument', 'N/A'),
         'run_side': meta_from_name.get('side', 'N/A'),
         'run_date': meta_from_name.get('date', 'N/A'),
-        'number_of_data_points': row_count,
-        'columns_details': columns_details
+        'number_of_data_points': statistics['number_of_data_points'],
+        'first_timestamp': statistics['first_timestamp'],
+        'last_timestamp': statistics['last_timestamp'],
+        'columns_details': columns_details,
+        'column_statistics': statistics['column_statistics']
     }
 
     # 3. Save JSON
-    json_path = os.path.join(output_dir_path, csv_file_name.replace('.csv', '.json'))
-    with open(json_path, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    json_path = save_outputs(file_info, output_dir_path, csv_file_name)
 
     results.append(file_info)
     print(f"Saved Json output file to: {json_path}")
@@ -141,36 +398,10 @@ def process_all_csv_files(input_dir_path, output_dir_path):
         if not is_thermal_report(full_file_input_path): 
              print(f"Thermal file validation failed : {csv_file_name} does not appear to be a Thermal Report file .")
              continue # This skips the rest of the loop for THIS file
-        print(f"Thermal file validation completed successfully. Extracting data from {csv_file_name}")
-
-        # Extract data
-        meta_from_name = extract_metadata_from_filename(csv_file_name)
-        df = pd.read_csv(full_file_input_path, skiprows=2)
-        row_count = len(df)
-        columns_details = extract_columns_data(full_file_input_path)
-
-         # Extract ORID ID for Thermal file name 
-        Orid_id = extract_orid_from_filename(csv_file_name)
-
-        # Combine all information
-        file_info = {
-            'file_type': 'Thermal Report',
-            'ORID': Orid_id,
-            'file_name': csv_file_name,
-            'file_path': full_file_input_path,
-            'instrument_id': meta_from_name.get('instrument', 'N/A'),
-            'run_side': meta_from_name.get('side', 'N/A'),
-            'run_date': meta_from_name.get('date', 'N/A'),
-            'number_of_data_points': row_count,
-            'columns_details': columns_details
-        }
-
-        # Replace .csv with .json for the filename
-        json_path = os.path.join(output_dir_path, csv_file_name.replace('.csv', '.json'))
-        with open(json_path, 'w') as f:
-            json.dump(file_info, f, indent=2)
 
-        results.append(file_info)
+        # Extraction and JSON output (served from the parse cache when the file is unchanged)
+        file_results = one_single_file(input_dir_path, output_dir_path, csv_file_name)
+        results.extend(file_results)
 
         processed_count += 1
 
@@ -0,0 +1,111 @@
+# --- 1. ONE-READ FILE HEAD ---
+# Detection only ever looks at the top of a file. We read a fixed number of bytes in ONE call
+# and match every registered signature against those lines, instead of letting each
+# extractor re-open the file with its own validator.
+
+SIGNATURE_READ_BYTES = 8192
+
+def read_file_head(file_path, max_bytes=SIGNATURE_READ_BYTES):
+    """
+    Reads the first max_bytes of a file with a single read call.
+    Returns the content as a list of lines (the last line may be truncated).
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(max_bytes)
+    return head.decode('utf-8', errors='replace').splitlines()
+
+
+# --- 2. SIGNATURES ---
+# Each extractor module declares its signature with the @signature decorator: a function that
+# receives the head lines and returns (confidence, reason) on a match, None otherwise.
+# The signatures live here, not in the extractor modules, because every extractor imports pandas
+# and is only imported once a file of its type is detected (see Main_Auto_Processor).
+# The declaration order is the tie-breaker when two signatures report the same confidence.
+
+SIGNATURES = []
+
+
+def signature(module_name, file_type):
+    """Registers the decorated match function as the signature of an extractor module."""
+    def register(match):
+        SIGNATURES.append({'module_name': module_name, 'file_type': file_type, 'match': match})
+        return match
+    return register
+
+
+@signature('Extractor_BeadStudio', 'BeadStudio')
+def match_beadstudio(head_lines):
+    """BeadStudio Sample Sheet: the keyword 'BeadStudio' in the first 20 lines."""
+    top = [line.lower() for line in head_lines[:20]]
+    if not any('beadstudio' in line for line in top):
+        return None
+    if top[0].startswith('[header]'):
+        return 1.0, "'BeadStudio' keyword found in the [Header] section"
+    return 0.6, "'BeadStudio' keyword found in the first 20 lines, but the file does not start with [Header]"
+
+
+@signature('Extractor_Thermal_Report', 'Thermal Report')
+def match_thermal_report(head_lines):
+    """Thermal Report: 'Side' on line 1 and 'Time,Current Cycle' on line 3."""
+    if len(head_lines) < 3:
+        return None
+    if head_lines[0].strip().startswith('Side') and "Time,Current Cycle" in head_lines[2]:
+        return 1.0, "'Side' label on line 1 and 'Time,Current Cycle' columns on line 3"
+    return None
+
+
+@signature('Extractor_FMGeneration', 'FM-Generation Report')
+def match_fm_generation_report(head_lines):
+    """FM-Generation Report: 'Instrument Name' on the first line."""
+    if not head_lines or "Instrument Name" not in head_lines[0]:
+        return None
+    if head_lines[0].startswith("Instrument Name"):
+        return 1.0, "first line starts with 'Instrument Name'"
+    return 0.8, "'Instrument Name' found on the first line"
+
+
+@signature('Extractor_IlluminaSampleSheet', 'Illumina Sample Sheet')
+def match_illumina_samplesheet(head_lines):
+    """Illumina Sample Sheet: '[Header]' and 'IEMFileVersion' in the first 10 lines."""
+    content = "".join(line.lower() for line in head_lines[:10])
+    if '[header]' in content and 'iemfileversion' in content:
+        return 1.0, "[Header] section with an 'IEMFileVersion' entry"
+    return None
+
+
+@signature('Extractor_FMAutoTilt', 'FM-AutoTilt Report')
+def match_fm_autotilt_report(head_lines):
+    """FM-AutoTilt Report: the first line starts with '[FTM Through-Focus Stack'."""
+    if head_lines and head_lines[0].startswith('[FTM Through-Focus Stack'):
+        return 1.0, "first line starts with '[FTM Through-Focus Stack'"
+    return None
+
+
+# --- 3. THE DETECTION ENGINE ---
+
+def detect_file_type(file_path):
+    """
+    Reads the head of the file once and matches it against every registered signature.
+    Returns the best verdict as a dictionary:
+        {'module_name', 'file_type', 'confidence', 'reason'}
+    or None if the file cannot be read or no signature matches.
+    """
+    try:
+        head_lines = read_file_head(file_path)
+    except Exception:
+        return None
+
+    best_verdict = None
+    for signature in SIGNATURES:
+        match = signature['match'](head_lines)
+        if match is None:
+            continue
+        confidence, reason = match
+        if best_verdict is None or confidence > best_verdict['confidence']:
+            best_verdict = {
+                'module_name': signature['module_name'],
+                'file_type': signature['file_type'],
+                'confidence': confidence,
+                'reason': reason
+            }
+    return best_verdict
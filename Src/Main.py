@@ -1,6 +1,9 @@
 import Extractor_BeadStudio
 import Extractor_Thermal_Report
 import Extractor_FMGeneration
+import Parse_Cache
+import Output_Writer
+import Timing_Trace
 import argparse  
 
 
@@ -22,9 +25,15 @@ def main_Multi_file_BeadStudio():
     # 2. Add the component arguments
     parser.add_argument("input_dir_path", help="Path to the directory containing the BeadStudio CSV files")
     parser.add_argument("output_dir_path", help="Path to the folder where all results (JSONs and CSV) should be saved")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
 
     # 3. Parse the arguments from the terminal
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
 
     print("=" * 60)
     print(f"BEADSTUDIO BATCH PROCESS")
@@ -66,9 +75,15 @@ def main_Single_file_BeadStudio():
     parser.add_argument("input_file_dir_path", help="Path to the directory containing the CSV file")
     parser.add_argument("csv_file_name", help="The name of the CSV file (including .csv extension)")
     parser.add_argument("output_dir_path", help="Path to the folder where results should be saved")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
 
     # 3. Parse the arguments
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
     print("=" * 60)
     print(f"BEADSTUDIO FILE PROCESS")
     print(f"INPUT DIRECTORY:  {args.input_file_dir_path}")
@@ -109,9 +124,15 @@ def main_Single_file_Thermal():
     parser.add_argument("input_file_dir_path", help="Path to the directory containing the CSV file")
     parser.add_argument("csv_file_name", help="The name of the CSV file (including .csv extension)")
     parser.add_argument("output_dir_path", help="Path to the folder where results should be saved")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
 
     # 3. Parse the arguments
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
     print("=" * 60)
     print(f"BEADSTUDIO FILE PROCESS")
     print(f"INPUT DIRECTORY:  {args.input_file_dir_path}")
@@ -153,9 +174,15 @@ def main_Multi_file_Thermal():
     # 2. Add the component arguments
     parser.add_argument("input_dir_path", help="Path to the directory containing the Thermal CSV files")
     parser.add_argument("output_dir_path", help="Path to the folder where all results (JSONs and CSV) should be saved")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
 
     # 3. Parse the arguments from the terminal
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
 
     print("=" * 60)
     print(f"Thermal Batch Process")
@@ -205,9 +232,15 @@ def main_Multi_file_FMGeneration():
     # 2. Add the component arguments
     parser.add_argument("input_dir_path", help="Path to the directory containing the FM-Generation CSV files")
     parser.add_argument("output_dir_path", help="Path to the folder where all results (JSONs and CSV) should be saved")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
 
     # 3. Parse the arguments from the terminal
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
 
     print("=" * 60)
     print(f"FM-GENERATION BATCH PROCESS")
@@ -250,9 +283,15 @@ def main_Single_file_FMGeneration():
     parser.add_argument("input_file_dir_path", help="Path to the directory containing the CSV file")
     parser.add_argument("csv_file_name", help="The name of the CSV file (including .csv extension)")
     parser.add_argument("output_dir_path", help="Path to the folder where results should be saved")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
 
     # 3. Parse the arguments
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
     
     print("=" * 60)
     print(f"FM-GENERATION FILE PROCESS")
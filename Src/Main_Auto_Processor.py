@@ -1,76 +1,153 @@
 import argparse
 import os
-import json
-import pandas as pd
-import re
-
-# Import extractor modules
-import Extractor_BeadStudio
-import Extractor_Thermal_Report
-import Extractor_FMGeneration
-import Extractor_IlluminaSampleSheet
-import Extractor_FMAutoTilt
+import importlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import File_Type_Detector
+import Parse_Cache
+import Output_Writer
+import Timing_Trace
+import Catalog
+import Dir_Inventory
+import Sheet_Fingerprint
+import Run_Index
+import Thermal_History
+import Ro_Crate
 
 # --- 1. THE REGISTRY ---
-# We use a list here because order can matter for auto-detection
+# The extractors are the modules named by the declared signatures (File_Type_Detector.SIGNATURES),
+# whose order matters for auto-detection. Each extractor imports pandas, so a module is only
+# imported once a file of its type is detected: a run that detects nothing, or only one type,
+# does not pay for the others (see Benchmark_Runner --check-startup).
+
+EXTRACTOR_NAMES = [signature['module_name'] for signature in File_Type_Detector.SIGNATURES]
+
+
+def get_extractor(module_name):
+    """Imports (on first use) and returns a registered extractor module, or None for an unknown name."""
+    if module_name not in EXTRACTOR_NAMES:
+        return None
+    return importlib.import_module(module_name)
 
-EXTRACTORS = [
-    Extractor_BeadStudio,
-    Extractor_Thermal_Report,
-    Extractor_FMGeneration,
-    Extractor_IlluminaSampleSheet,
-    Extractor_FMAutoTilt
-]
+
+def load_all_extractors():
+    """Imports every extractor, e.g. once in the parent process before forking pool workers."""
+    return [get_extractor(module_name) for module_name in EXTRACTOR_NAMES]
 
 # --- 2. THE AUTO-DETECTOR ---
 
 def detect_file_type(file_path):
     """
-    Checks the file against every registered extractor's validation logic.     
+    Reads the head of the file once and matches it against the declared signatures
+    (see File_Type_Detector.SIGNATURES).
     Returns the module that successfully identifies the file.
 
     """
-    # Each module must have an 'is_beadstudio_file' style function
-    # We look for the validation function generically
-    valid_function_names = [
-        'is_beadstudio_file', 
-        'is_thermal_report', 
-        'is_fm_generation_report', 
-        'is_illumina_samplesheet', 
-        'is_fm_autotilt_report'
-    ]
-    
-    for module in EXTRACTORS:
-        for func_name in valid_function_names:
-            validator = getattr(module, func_name, None)
-            if validator and validator(file_path):
-                return module
-    return None
+    verdict = File_Type_Detector.detect_file_type(file_path)
+    if not verdict:
+        return None
+    return get_extractor(verdict['module_name'])
 
 # --- 3. UNIFIED PROCESSING LOGIC ---
 
 def process_single_path(input_path, output_dir):
     """
     Detects the type and processes a single file.
+    With --trace, the detection and extraction stages are recorded in one trace record (see Timing_Trace).
     """
-    module = detect_file_type(input_path)
-    
-    if not module:
-        print(f"\n⚠️  Unknown file type detected: {os.path.basename(input_path)}")
-        return None
+    with Timing_Trace.file_trace(input_path, 'Main_Auto_Processor'):
+        with Timing_Trace.span('detect'):
+            verdict = File_Type_Detector.detect_file_type(input_path)
+        module = get_extractor(verdict['module_name']) if verdict else None
+        
+        if not module:
+            Timing_Trace.annotate(outcome='unknown_type')
+            print(f"\n⚠️  Unknown file type detected: {os.path.basename(input_path)}")
+            return None
 
-    type_label = module.__name__.replace('Extractor_', '')
-    print(f"\n📄 File detected ({type_label}): {os.path.basename(input_path)}")
+        Timing_Trace.annotate(file_type=verdict['file_type'])
+        type_label = module.__name__.replace('Extractor_', '')
+        print(f"\n📄 File detected ({type_label}): {os.path.basename(input_path)}")
+        print(f"   Confidence {verdict['confidence']:.1f}: {verdict['reason']}")
+
+        # Standardized 'one_single_file' interface
+        input_dir = os.path.dirname(input_path) or "."
+        file_name = os.path.basename(input_path)
+        
+        try:
+            return module.one_single_file(input_dir, output_dir, file_name)
+        except Exception as e:
+            Timing_Trace.annotate(outcome='error', error=str(e))
+            print(f"❌ Error processing {file_name}: {e}")
+            return None
+
+# --- 4. BATCH WALKING & PARALLEL EXECUTION ---
+
+def iter_csv_paths(input_dir):
+    """
+    Walks input_dir recursively and yields the full path of every CSV file.
+    Directories and files are visited in sorted order so that every run sees the same sequence.
+    Directories that did not change since the last crawl are served from the directory inventory.
+    """
+    return Dir_Inventory.iter_csv_paths(input_dir)
+
+
+def init_worker(cache_settings, output_settings, trace_settings, history_settings):
+    """Applies the parent process settings in a pool worker."""
+    Parse_Cache.configure(*cache_settings)
+    Output_Writer.configure(*output_settings)
+    Timing_Trace.configure(*trace_settings)
+    Thermal_History.configure(*history_settings)
+
+
+def process_paths(paths, output_dir, workers=1, queue_size=None):
+    """
+    Runs process_single_path over every path and returns the results in input order
+    (one entry per path, None for skipped/failed files).
+
+    With workers > 1 the files are fanned out over a process pool. At most queue_size
+    files (default: 4 x workers) are in flight, so the directory walker never runs far
+    ahead of the workers. Files whose JSON output name was already scheduled (same file
+    name in two folders) are processed afterwards, in walk order, in this process:
+    the JSON left on disk is the same as in a sequential run.
+    """
+    if workers <= 1:
+        return [process_single_path(path, output_dir) for path in paths]
+
+    queue_size = queue_size or workers * 4
+    # Forked workers share the parent's imports instead of importing pandas each
+    load_all_extractors()
+    results = {}
+    scheduled_outputs = set()
+    deferred = []
+    pending = deque()
+
+    # Workers inherit the parse cache, output, trace and history settings of this process
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(Parse_Cache.get_settings(), Output_Writer.get_settings(),
+                                       Timing_Trace.get_settings(), Thermal_History.get_settings())) as pool:
+        for index, path in enumerate(paths):
+            output_name = os.path.splitext(os.path.basename(path))[0]
+            if output_name in scheduled_outputs:
+                deferred.append((index, path))
+                continue
+            scheduled_outputs.add(output_name)
+
+            pending.append((index, pool.submit(process_single_path, path, output_dir)))
+            # Bounded queue: wait for the oldest file before walking further
+            if len(pending) >= queue_size:
+                done_index, future = pending.popleft()
+                results[done_index] = future.result()
+
+        while pending:
+            done_index, future = pending.popleft()
+            results[done_index] = future.result()
+
+    for index, path in deferred:
+        results[index] = process_single_path(path, output_dir)
+
+    return [results[index] for index in sorted(results)]
 
-    # Standardized 'one_single_file' interface
-    input_dir = os.path.dirname(input_path) or "."
-    file_name = os.path.basename(input_path)
-    
-    try:
-        return module.one_single_file(input_dir, output_dir, file_name)
-    except Exception as e:
-        print(f"❌ Error processing {file_name}: {e}")
-        return None
 
 def main():
     # 1. Setup the Argument Parser
@@ -80,9 +157,28 @@ def main():
     parser.add_argument("input_path", help="Path to a CSV file or root directory")
     parser.add_argument("output_dir", help="Where to save results")
     parser.add_argument("--batch", action="store_true", help="Process all files recursively")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes used in --batch mode (default: 1)")
+    parser.add_argument("--async-io", action="store_true",
+                        help="In --batch mode, overlap directory listing, reads and JSON writes with parsing (see Async_Pipeline)")
+    parser.add_argument("--io-threads", type=int, default=8, help="Concurrent listings / reads / writes with --async-io (default: 8)")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
+    Catalog.add_catalog_arguments(parser)
+    Dir_Inventory.add_inventory_arguments(parser)
+    Sheet_Fingerprint.add_fingerprint_arguments(parser)
+    Run_Index.add_run_index_arguments(parser)
+    Thermal_History.add_history_arguments(parser)
+    Ro_Crate.add_crate_arguments(parser)
     
     # 3. Parse the arguments
     args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
+    Dir_Inventory.configure_from_args(args)
+    Thermal_History.configure_from_args(args)
+    Sheet_Fingerprint.configure_from_args(args)
 
     width = 90
     print("=" * width)
@@ -94,18 +190,32 @@ def main():
 
     all_results = []
     total_checked = 0
+    linked = set()
 
     if args.batch and os.path.isdir(args.input_path):
         # --- RECURSIVE LOGIC ---
-        # os.walk travels through every sub-folder automatically
-        for root, dirs, files in os.walk(args.input_path):
-            csv_files = [f for f in files if f.lower().endswith('.csv')]
-            for f in csv_files:
-                total_checked += 1
-                full_path = os.path.join(root, f)
-                res = process_single_path(full_path, args.output_dir)
-                if res:
-                    all_results.extend(res)
+        # Every sub-folder is visited; unchanged ones are served from the directory inventory
+        if args.async_io:
+            import Async_Pipeline
+            batch_results, linked = Async_Pipeline.process_directory(args.input_path, args.output_dir, workers=args.workers,
+                                                                     io_threads=args.io_threads,
+                                                                     link_redundant=args.link_redundant_sheets)
+        else:
+            paths = iter_csv_paths(args.input_path)
+            if args.link_redundant_sheets:
+                # Duplicate / merged sample sheets get a link record instead of a second copy of their samples
+                paths = list(paths)
+                linked = Sheet_Fingerprint.link_redundant_sheets(paths, args.output_dir)
+                paths = [path for path in paths if path not in linked]
+            batch_results = process_paths(paths, args.output_dir, workers=args.workers)
+        for res in batch_results:
+            total_checked += 1
+            if res:
+                all_results.extend(res)
+        total_checked += len(linked)
+        if not args.no_inventory:
+            inventory = Dir_Inventory.get_stats()
+            print(f"\n📂 Directory inventory: {inventory['reused']} unchanged, {inventory['listed']} listed")
     else:
         # Single file mode
         if os.path.isfile(args.input_path):
@@ -114,12 +224,32 @@ def main():
         else:
             print(f"❌ Error: {args.input_path} is not a valid file or directory.")
 
+    # Consolidated catalog: only the rows of new / changed files are rewritten
+    if all_results and not args.no_catalog:
+        counts = Catalog.update_catalog(args.output_dir, all_results)
+        catalog_path, catalog_rows = Catalog.export_csv(args.output_dir)
+        print(f"\n🗂️  Catalog: {counts['added']} added, {counts['updated']} updated, {counts['unchanged']} unchanged "
+              f"({catalog_rows} file(s) in {catalog_path})")
+
+    # Thermal / FM reports grouped into runs (only the new / modified JSON files are read)
+    if args.run_index and os.path.isdir(args.output_dir):
+        runs_path, run_count = Run_Index.update_run_index(args.output_dir, gap_minutes=args.gap_minutes)
+        print(f"\n🧬 Run index: {run_count} run(s) in {runs_path}")
+
+    # Packaged last, so the catalog and the run index are part of the crate
+    if args.ro_crate and os.path.isdir(args.output_dir):
+        metadata_path, counts = Ro_Crate.write_crate(args.output_dir, threads=args.crate_threads)
+        print(f"\n📦 RO-Crate: {counts['files']} file(s), {counts['sources']} source CSV(s) in {metadata_path} "
+              f"({counts['hashed']} checksum(s) computed, {counts['reused']} reused)")
+
     # Summary Report
     print("\n" + "=" * width)
     print("Processing Summary".center(width))
     print("=" * width)
     print(f"File(s) Successfully processed: {len(all_results)}")
-    print(f"File(s) Skipped / failed:       {total_checked - len(all_results)}")
+    if linked:
+        print(f"Redundant sample sheet(s) linked: {len(linked)}")
+    print(f"File(s) Skipped / failed:       {total_checked - len(all_results) - len(linked)}")
     print(f"Total CSVs found and checked:   {total_checked}")
     print(f"Results Directory:     {args.output_dir}")
     print("=" * width)
@@ -0,0 +1,338 @@
+import os
+import gzip
+import json
+import math
+import contextlib
+import Timing_Trace
+
+# Fast serialisers, used when installed (the stdlib json module otherwise).
+# NaN and infinite values (e.g. empty sample sheet cells) are written as null by every serialiser,
+# so the output does not depend on the installed packages and stays valid JSON (JSON.parse).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# --- 1. SETTINGS ---
+# 'json'    --> one JSON file per CSV (default)
+# 'parquet' --> typed columnar files for every table (sample lists, FocusModel / through-focus tables,
+#               full thermal time series) next to a slim JSON metadata record that points to them
+# The JSON files are written 'pretty' (indent=2, default) or 'compact' (no whitespace), and can be
+# compressed: <name>.json.gz (gzip) or <name>.json.zst (zstd, requires zstandard).
+# downsample_points > 0 also writes a downsampled copy of every thermal time series next to the JSON
+# record (<name>.downsampled.json / .parquet, see Extractor_Thermal_Report); 0 (default) disables it.
+
+OUTPUT_FORMATS = ('json', 'parquet')
+JSON_STYLES = ('pretty', 'compact')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+JSON_EXTENSIONS = {'none': '.json', 'gzip': '.json.gz', 'zstd': '.json.zst'}
+DOWNSAMPLED_SUFFIX = '.downsampled'
+
+_settings = {'output_format': 'json', 'json_style': 'pretty', 'compression': 'none', 'downsample_points': 0}
+
+# When not None, write_json() collects (json_path, payload) here instead of writing (see deferred_writes)
+_deferred = {'writes': None}
+
+
+def configure(output_format='json', json_style='pretty', compression='none', downsample_points=0):
+    """Sets the output format, JSON style, JSON compression and time series downsampling for this process."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    if json_style not in JSON_STYLES:
+        raise ValueError(f"Unknown JSON style: {json_style} (expected one of {', '.join(JSON_STYLES)})")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression} (expected one of {', '.join(COMPRESSIONS)})")
+    if downsample_points < 0:
+        raise ValueError(f"Invalid number of downsampled points: {downsample_points}")
+    if output_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("--format parquet requires pyarrow (pip install pyarrow)")
+    if compression == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise SystemExit("--compress zstd requires zstandard (pip install zstandard)")
+    _settings['output_format'] = output_format
+    _settings['json_style'] = json_style
+    _settings['compression'] = compression
+    _settings['downsample_points'] = downsample_points
+
+
+def get_settings():
+    """Returns the current settings as positional arguments for configure() (used to set up worker processes)."""
+    return (_settings['output_format'], _settings['json_style'], _settings['compression'], _settings['downsample_points'])
+
+
+def is_parquet():
+    """True when tables are written as Parquet files."""
+    return _settings['output_format'] == 'parquet'
+
+
+def downsample_points():
+    """Number of points of the downsampled time series (0: not written)."""
+    return _settings['downsample_points']
+
+
+def add_json_arguments(parser):
+    """Adds the --json-style and --compress options to an argparse parser (tools writing JSON files only)."""
+    parser.add_argument("--json-style", dest="json_style", choices=JSON_STYLES, default='pretty',
+                        help="JSON layout: indented, or compact without whitespace (default: pretty)")
+    parser.add_argument("--compress", dest="compression", choices=COMPRESSIONS, default='none',
+                        help="Compress the JSON files: .json.gz or .json.zst (default: none)")
+
+
+def add_output_arguments(parser):
+    """Adds the --format, --json-style, --compress and --downsample options to an argparse parser."""
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default='json',
+                        help="Output format: one JSON per file, or Parquet tables next to a slim JSON record (default: json)")
+    add_json_arguments(parser)
+    parser.add_argument("--downsample", dest="downsample_points", type=int, default=0, metavar="POINTS",
+                        help="Also write every thermal time series downsampled to POINTS min/max/mean buckets (default: off)")
+
+
+def configure_from_args(args):
+    """Applies the options added by add_output_arguments() (or only add_json_arguments())."""
+    configure(output_format=getattr(args, 'output_format', 'json'), json_style=args.json_style,
+              compression=args.compression, downsample_points=getattr(args, 'downsample_points', 0))
+
+
+# --- 2. TABLE DETECTION ---
+
+def is_table(value):
+    """
+    True for a list of row dictionaries sharing the same columns
+    (sample lists, FocusModel tables, through-focus stacks).
+    The 2-column summaries ([{Label: Value}, ...]) have a different key per row and are not tables.
+    """
+    if not isinstance(value, list) or not value or not all(isinstance(row, dict) for row in value):
+        return False
+    columns = list(value[0].keys())
+    return len(columns) > 1 and all(list(row.keys()) == columns for row in value)
+
+
+def _to_frame(rows):
+    """Builds a DataFrame from row dictionaries; object columns mixing types are stored as strings."""
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    for column in df.columns:
+        if df[column].dtype == object:
+            kinds = {type(v) for v in df[column].dropna()}
+            if len(kinds) > 1:
+                df[column] = df[column].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def table_file_name(csv_file_name, table_name):
+    """Name of the Parquet file holding one table of a CSV file."""
+    return f"{os.path.splitext(csv_file_name)[0]}.{table_name}.parquet"
+
+
+def json_file_name(csv_file_name):
+    """Name of the JSON record of a CSV file, with the extension of the configured compression."""
+    return os.path.splitext(csv_file_name)[0] + JSON_EXTENSIONS[_settings['compression']]
+
+
+def downsampled_file_name(csv_file_name):
+    """Name of the downsampled time series of a CSV file (JSON with the configured compression, or Parquet)."""
+    stem = os.path.splitext(csv_file_name)[0] + DOWNSAMPLED_SUFFIX
+    return stem + ('.parquet' if is_parquet() else JSON_EXTENSIONS[_settings['compression']])
+
+
+def is_json_file(file_name):
+    """True for a JSON output record, compressed or not (downsampled time series excluded)."""
+    for extension in JSON_EXTENSIONS.values():
+        if file_name.endswith(extension):
+            return not file_name[:-len(extension)].endswith(DOWNSAMPLED_SUFFIX)
+    return False
+
+
+# --- 3. SERIALISATION ---
+
+def without_nan(value):
+    """Copy of a JSON-like value (dicts, lists, tuples) with NaN and infinite floats replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: without_nan(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [without_nan(item) for item in value]
+    return value
+
+
+def dumps(data):
+    """Serialises data in the configured JSON style with the fastest available serialiser. Returns bytes."""
+    pretty = _settings['json_style'] == 'pretty'
+    if orjson is not None:
+        # orjson already writes NaN / infinity as null
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    data = without_nan(data)
+    if ujson is not None:
+        return ujson.dumps(data, indent=2 if pretty else 0, escape_forward_slashes=False).encode('utf-8')
+    if pretty:
+        return json.dumps(data, indent=2, allow_nan=False).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def compress(payload, json_path):
+    """Compresses a serialised document according to the extension of json_path."""
+    if json_path.endswith('.gz'):
+        # mtime=0: identical content gives identical bytes
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+    if json_path.endswith('.zst'):
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(payload)
+    return payload
+
+
+def decompress(payload, json_path):
+    """Inverse of compress(): the serialised document of a JSON output file read as bytes."""
+    if json_path.endswith('.gz'):
+        return gzip.decompress(payload)
+    if json_path.endswith('.zst'):
+        import zstandard
+        try:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(payload)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd data in {json_path}: {e}")
+    return payload
+
+
+def read_json(json_path):
+    """Reads a JSON output file, compressed (.json.gz, .json.zst) or not."""
+    with open(json_path, 'rb') as f:
+        payload = f.read()
+    # The stdlib parser also accepts the NaN values of files written by earlier versions
+    return json.loads(decompress(payload, json_path))
+
+
+# --- 4. WRITERS ---
+
+@contextlib.contextmanager
+def deferred_writes():
+    """
+    Inside the block, write_json() serialises as usual but does not touch the disk: the
+    (json_path, payload) pairs are collected in the yielded list, for the caller to write
+    elsewhere (Async_Pipeline writes them on its I/O threads, see write_payload).
+    """
+    pending = []
+    _deferred['writes'] = pending
+    try:
+        yield pending
+    finally:
+        _deferred['writes'] = None
+
+
+def write_payload(json_path, payload):
+    """Writes an already serialised (and compressed) JSON document."""
+    with open(json_path, 'wb') as f:
+        f.write(payload)
+
+
+def write_json(data, json_path):
+    """Writes one JSON document; the extension of json_path (.json, .json.gz, .json.zst) selects the compression."""
+    with Timing_Trace.span('serialize'):
+        payload = dumps(data)
+    if not json_path.endswith('.json'):
+        with Timing_Trace.span('compress'):
+            payload = compress(payload, json_path)
+    if _deferred['writes'] is not None:
+        _deferred['writes'].append((json_path, payload))
+        return
+    with Timing_Trace.span('write'):
+        write_payload(json_path, payload)
+
+
+def write_record(file_info, output_dir_path, csv_file_name, extra_fields=None):
+    """
+    Writes the output of one extraction and returns the path of its JSON file.
+    In parquet mode every table of file_info is written to its own Parquet file and replaced,
+    in the JSON record, by {'parquet_file': name, 'rows': count}. file_info itself is not modified.
+    extra_fields are added to the JSON record only (e.g. references to files written by the extractor).
+    """
+    os.makedirs(output_dir_path, exist_ok=True)
+    record = dict(file_info)
+
+    if is_parquet():
+        for key, value in file_info.items():
+            if is_table(value):
+                parquet_name = table_file_name(csv_file_name, key)
+                with Timing_Trace.span('write', table=key):
+                    _to_frame(value).to_parquet(os.path.join(output_dir_path, parquet_name), index=False)
+                record[key] = {'parquet_file': parquet_name, 'rows': len(value)}
+
+    if extra_fields:
+        record.update(extra_fields)
+
+    json_path = os.path.join(output_dir_path, json_file_name(csv_file_name))
+    write_json(record, json_path)
+
+    # A previous run with another --compress setting must not leave a second record of the same file
+    stem = os.path.splitext(csv_file_name)[0]
+    for extension in JSON_EXTENSIONS.values():
+        stale_path = os.path.join(output_dir_path, stem + extension)
+        if stale_path != json_path and os.path.exists(stale_path):
+            os.remove(stale_path)
+    return json_path
+
+
+def write_csv_as_parquet(csv_path, parquet_path, chunk_rows=10000, convert_chunk=None, **read_csv_kwargs):
+    """
+    Converts a (large) CSV table to Parquet chunk by chunk, so memory stays bounded by chunk_rows.
+    convert_chunk (optional) is applied to every DataFrame chunk before it is written, e.g. to
+    turn stray non-numeric cells into NaN. The schema is taken from the first chunk; later chunks
+    are cast to it. On failure the partial Parquet file is removed.
+    Returns the number of rows written.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    row_count = 0
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, **read_csv_kwargs):
+            if convert_chunk is not None:
+                chunk = convert_chunk(chunk)
+            if schema is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                # Numeric columns may only look like integers in the first chunk
+                schema = pa.schema([pa.field(f.name, pa.float64()) if pa.types.is_integer(f.type) else f for f in table.schema])
+                writer = pq.ParquetWriter(parquet_path, schema)
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+            row_count += len(chunk)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.remove(parquet_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    return row_count
+
+
+def is_up_to_date(output_path, source_path):
+    """True when output_path exists and was written after the last change of source_path."""
+    try:
+        return os.stat(output_path).st_mtime_ns > os.stat(source_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def parquet_row_count(parquet_path):
+    """Number of rows of a Parquet file, read from its footer. Raises OSError / ValueError for a missing or broken file."""
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(parquet_path).metadata.num_rows
@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import functools
+import Timing_Trace
+
+# --- 1. SETTINGS ---
+# The cache is shared by every entry point (Main.py, Main_Auto_Processor.py, Extractor_Orid_Recursively.py).
+# An extraction result is stored under the SHA-256 of the file content, the file name (ORID and
+# instrument metadata are parsed from it), the extractor module and its EXTRACTOR_VERSION.
+# A second table remembers (size, mtime) per path, so an unchanged file costs a stat, not a re-hash.
+
+DEFAULT_CACHE_DIR = os.environ.get('LAGE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'lage_metadata'))
+DEFAULT_MAX_SIZE_MB = 1024
+
+_settings = {
+    'enabled': True,
+    'rebuild': False,
+    'cache_dir': DEFAULT_CACHE_DIR,
+    'max_size_bytes': DEFAULT_MAX_SIZE_MB * 1024 * 1024
+}
+
+_connection = {'pid': None, 'db': None}
+
+
+def configure(enabled=True, rebuild=False, cache_dir=None, max_size_mb=DEFAULT_MAX_SIZE_MB):
+    """
+    Sets the cache behaviour for this process.
+    enabled=False bypasses the cache entirely, rebuild=True re-extracts every file and overwrites its entry.
+    """
+    _settings['enabled'] = enabled
+    _settings['rebuild'] = rebuild
+    _settings['cache_dir'] = cache_dir or DEFAULT_CACHE_DIR
+    _settings['max_size_bytes'] = int(max_size_mb * 1024 * 1024)
+    _connection['pid'] = None
+    _connection['db'] = None
+
+
+def get_settings():
+    """Returns the current settings as positional arguments for configure() (used to set up worker processes)."""
+    return (_settings['enabled'], _settings['rebuild'], _settings['cache_dir'], _settings['max_size_bytes'] / (1024 * 1024))
+
+
+def add_cache_arguments(parser):
+    """Adds the --no-cache / --rebuild-cache / --cache-dir / --cache-max-mb options to an argparse parser."""
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the parse cache")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Re-extract every file and refresh its cache entry")
+    parser.add_argument("--cache-dir", default=None, help=f"Parse cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_SIZE_MB, help="Maximum parse cache size in MB before eviction")
+
+
+def configure_from_args(args):
+    """Applies the options added by add_cache_arguments()."""
+    configure(enabled=not args.no_cache, rebuild=args.rebuild_cache, cache_dir=args.cache_dir, max_size_mb=args.cache_max_mb)
+
+
+# --- 2. STORAGE ---
+
+def _get_db():
+    """Opens (once per process) the SQLite cache database."""
+    if _connection['db'] is not None and _connection['pid'] == os.getpid():
+        return _connection['db']
+
+    os.makedirs(_settings['cache_dir'], exist_ok=True)
+    db = sqlite3.connect(os.path.join(_settings['cache_dir'], 'parse_cache.sqlite'), timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS file_stats (
+                      path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                      cache_key TEXT PRIMARY KEY, results TEXT, size INTEGER, last_used REAL)""")
+    db.commit()
+
+    _connection['pid'] = os.getpid()
+    _connection['db'] = db
+    return db
+
+
+def hash_file(file_path):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_content_hash(file_path):
+    """
+    Returns the content hash of a file, re-hashing it only when its size or mtime changed
+    since the last time it was seen. With the cache disabled the file is simply hashed.
+    """
+    if not _settings['enabled']:
+        return hash_file(file_path)
+    db = _get_db()
+    stat = os.stat(file_path)
+    path = os.path.abspath(file_path)
+
+    row = db.execute("SELECT size, mtime_ns, content_hash FROM file_stats WHERE path = ?", (path,)).fetchone()
+    if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+        return row[2]
+
+    content_hash = hash_file(file_path)
+    db.execute("INSERT OR REPLACE INTO file_stats VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns, content_hash))
+    db.commit()
+    return content_hash
+
+
+def iter_file_stats():
+    """Yields (path, size, mtime_ns, content hash) of every file hashed so far (see get_content_hash)."""
+    yield from _get_db().execute("SELECT path, size, mtime_ns, content_hash FROM file_stats")
+
+
+def make_key(content_hash, csv_file_name, module_name, extractor_version):
+    """Builds the cache key of one extraction."""
+    return f"{content_hash}|{csv_file_name}|{module_name}|{extractor_version}"
+
+
+def lookup(cache_key):
+    """Returns the cached results for a key (and marks them as recently used), or None."""
+    db = _get_db()
+    row = db.execute("SELECT results FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+    if row is None:
+        return None
+    db.execute("UPDATE entries SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key))
+    db.commit()
+    return json.loads(row[0])
+
+
+def store(cache_key, results):
+    """Stores the results of one extraction, then evicts least recently used entries above the size limit."""
+    db = _get_db()
+    payload = json.dumps(results)
+    db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (cache_key, payload, len(payload), time.time()))
+    db.commit()
+    evict()
+
+
+def evict():
+    """Deletes least recently used entries until the cache fits in max_size_bytes."""
+    db = _get_db()
+    total_size = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total_size <= _settings['max_size_bytes']:
+        return
+
+    for cache_key, size in db.execute("SELECT cache_key, size FROM entries ORDER BY last_used").fetchall():
+        if total_size <= _settings['max_size_bytes']:
+            break
+        db.execute("DELETE FROM entries WHERE cache_key = ?", (cache_key,))
+        total_size -= size
+    db.commit()
+
+
+# --- 3. EXTRACTOR INTEGRATION ---
+
+def cached_extractor(one_single_file):
+    """
+    Decorator for an extractor's one_single_file(input_dir_path, output_dir_path, csv_file_name).
+    On a cache hit the outputs are re-created from the stored results, through the module's
+    save_outputs(file_info, output_dir_path, csv_file_name), without parsing the CSV.
+    The extractor module must define EXTRACTOR_VERSION; bump it whenever the extraction output changes.
+    """
+    @functools.wraps(one_single_file)
+    def wrapper(input_dir_path, output_dir_path, csv_file_name):
+        if not _settings['enabled']:
+            return one_single_file(input_dir_path, output_dir_path, csv_file_name)
+
+        file_Input_path = os.path.join(input_dir_path, csv_file_name)
+        module = sys.modules[one_single_file.__module__]
+        try:
+            with Timing_Trace.span('cache_lookup'):
+                content_hash = get_content_hash(file_Input_path)
+                cache_key = make_key(content_hash, csv_file_name, one_single_file.__module__, module.EXTRACTOR_VERSION)
+                cached_results = None if _settings['rebuild'] else lookup(cache_key)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Parse cache unavailable ({e}), extracting {csv_file_name} without cache")
+            return one_single_file(input_dir_path, output_dir_path, csv_file_name)
+
+        Timing_Trace.annotate(cache='hit' if cached_results is not None else 'miss')
+        if cached_results is not None:
+            for file_info in cached_results:
+                # The same content may live under another directory
+                file_info['file_path'] = file_Input_path
+                json_path = module.save_outputs(file_info, output_dir_path, csv_file_name)
+                print(f"Cache hit for {csv_file_name}. Saved Json output file to: {json_path}")
+            return cached_results
+
+        results = one_single_file(input_dir_path, output_dir_path, csv_file_name)
+        try:
+            with Timing_Trace.span('cache_store'):
+                store(cache_key, results)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"Could not store {csv_file_name} in the parse cache: {e}")
+        return results
+
+    return wrapper
@@ -0,0 +1,350 @@
+import argparse
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import tempfile
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import Parse_Cache
+import Output_Writer
+import Catalog
+
+# --- 1. SETTINGS ---
+# Packages an output directory (or the outputs of one ORID) as an RO-Crate 1.1:
+#   <output_dir>/ro-crate-metadata.json --> the root Dataset, one File entity per output file (JSON
+#       records, Parquet tables, downsampled series, summaries) with its size, format and SHA-256,
+#       and one File entity per source CSV (file:// URI, outside the crate), linked from the records
+#       extracted from it ('isBasedOn').
+# Checksums are computed on a thread pool (hashlib releases the GIL) and reused when a file is
+# unchanged (same size and mtime): from <output_dir>/ro_crate_checksums.sqlite, else from the parse
+# cache (source CSVs) or the catalog. The metadata file is written entity by entity to a temporary
+# file and renamed, so the graph of a whole project is never held in memory as one document.
+
+CRATE_METADATA_NAME = 'ro-crate-metadata.json'
+CHECKSUM_DB_NAME = 'ro_crate_checksums.sqlite'
+RO_CRATE_CONTEXT = 'https://w3id.org/ro/crate/1.1/context'
+RO_CRATE_SPEC = 'https://w3id.org/ro/crate/1.1'
+DEFAULT_THREADS = 8
+COMMIT_EVERY = 500
+
+ENCODING_FORMATS = {'.json': 'application/json', '.gz': 'application/gzip', '.zst': 'application/zstd',
+                    '.parquet': 'application/vnd.apache.parquet', '.csv': 'text/csv'}
+ORID_PATTERN = re.compile(r'(ORID\d{4})', re.IGNORECASE)
+# The extractors write 'file_path' among the first keys of a record: found without parsing the whole document
+FILE_PATH_PATTERN = re.compile(rb'"file_path"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def add_crate_arguments(parser):
+    """Adds the --ro-crate / --crate-threads options to an argparse parser."""
+    parser.add_argument("--ro-crate", action="store_true",
+                        help=f"Package the outputs as an RO-Crate ({CRATE_METADATA_NAME} in the output directory)")
+    parser.add_argument("--crate-threads", type=int, default=DEFAULT_THREADS,
+                        help=f"Threads computing the RO-Crate checksums (default: {DEFAULT_THREADS})")
+
+
+# --- 2. CHECKSUMS ---
+
+def open_checksums(output_dir):
+    """Opens (and creates if needed) the checksum store of an output directory."""
+    os.makedirs(output_dir, exist_ok=True)
+    db = sqlite3.connect(os.path.join(output_dir, CHECKSUM_DB_NAME), timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS checksums (
+                      path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT, source_path TEXT)""")
+    db.commit()
+    return db
+
+
+def _known_hashes(output_dir):
+    """
+    Returns {absolute path: (size, mtime_ns, sha256)} of the hashes already computed elsewhere
+    (parse cache file_stats, then the catalog of output_dir), and {json file: source path} from the catalog.
+    """
+    known, sources = {}, {}
+    try:
+        known.update((path, (size, mtime_ns, content_hash)) for path, size, mtime_ns, content_hash
+                     in Parse_Cache.iter_file_stats())
+    except sqlite3.Error:
+        pass
+
+    if os.path.exists(os.path.join(output_dir, Catalog.CATALOG_DB_NAME)):
+        db = Catalog.open_catalog(output_dir)
+        try:
+            for file_path, size, mtime_ns, content_hash, json_file in db.execute(
+                    "SELECT file_path, size, mtime_ns, content_hash, json_file FROM files"):
+                known.setdefault(file_path, (size, mtime_ns, content_hash))
+                sources[json_file] = file_path
+        finally:
+            db.close()
+    return known, sources
+
+
+def _hash_entry(path, find_source):
+    """
+    Thread pool side: SHA-256 of a file and, with find_source, the source path named by the JSON
+    record ('' when it names none, e.g. a summary document).
+    """
+    if not find_source:
+        return Parse_Cache.hash_file(path), None
+
+    # One read for both: parsing every record would keep the threads waiting on the GIL
+    with open(path, 'rb') as f:
+        payload = f.read()
+    sha256 = hashlib.sha256(payload).hexdigest()
+    try:
+        document = Output_Writer.decompress(payload, path)
+        match = FILE_PATH_PATTERN.search(document)
+        source_path = json.loads(match.group(1)) if match else None
+    except (OSError, ValueError, EOFError):
+        source_path = None
+    return sha256, os.path.abspath(source_path) if source_path else ''
+
+
+def load_checksums(db):
+    """Returns {path: (size, mtime_ns, sha256, source_path)} of the stored checksums (one query)."""
+    return {row[0]: row[1:] for row in db.execute("SELECT path, size, mtime_ns, sha256, source_path FROM checksums")}
+
+
+def checksum_files(db, stored, entries, known, threads=DEFAULT_THREADS, counts=None):
+    """
+    Yields (path, stat, sha256, source_path) for every (path, is_record, source_path) of entries, in order
+    (source_path '' for records that name no source). Unchanged files reuse their stored (see
+    load_checksums) or known checksum; the others are hashed on threads, at most threads * 4 files
+    ahead of the consumer. New checksums are saved in batches. counts ({'hashed', 'reused'}) is updated if given.
+    """
+    counts = counts if counts is not None else {'hashed': 0, 'reused': 0}
+    pending = deque()
+    new_rows = []
+
+    def save(row):
+        new_rows.append(row)
+        if len(new_rows) >= COMMIT_EVERY:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?)", new_rows)
+            new_rows.clear()
+
+    def finish(path, stat, future, source_path):
+        sha256, record_source = future.result()
+        source_path = source_path or record_source
+        save((path, stat.st_size, stat.st_mtime_ns, sha256, source_path))
+        counts['hashed'] += 1
+        return path, stat, sha256, source_path
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='lage-crate') as pool:
+            for path, is_record, source_path in entries:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                row = stored.get(path)
+                reused = None
+                if row and row[:2] == (stat.st_size, stat.st_mtime_ns) and (row[3] is not None or source_path or not is_record):
+                    reused = row[2], (source_path or row[3])
+                elif path in known and known[path][:2] == (stat.st_size, stat.st_mtime_ns) and not is_record:
+                    reused = known[path][2], source_path
+                    save((path, stat.st_size, stat.st_mtime_ns, reused[0], source_path))
+
+                if reused is not None:
+                    counts['reused'] += 1
+                    pending.append((path, stat, None, reused))
+                else:
+                    # A record whose source is already known needs no parsing
+                    future = pool.submit(_hash_entry, path, is_record and not source_path)
+                    pending.append((path, stat, future, source_path))
+
+                # Keep the order; do not run far ahead of the writer
+                while pending and (pending[0][2] is None or len(pending) > max(1, threads) * 4):
+                    yield _next(pending, finish)
+
+            while pending:
+                yield _next(pending, finish)
+    finally:
+        with db:
+            db.executemany("INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?)", new_rows)
+
+
+def _next(pending, finish):
+    """Pops the oldest pending checksum (waiting for it if it is still being computed)."""
+    path, stat, future, payload = pending.popleft()
+    if future is None:
+        return path, stat, payload[0], payload[1]
+    return finish(path, stat, future, payload)
+
+
+# --- 3. CRATE CONTENT ---
+
+def orid_of(path):
+    """ORID of a file: from its name, else from the closest parent directory named after one. None if none."""
+    for part in reversed(os.path.normpath(path).split(os.sep)):
+        match = ORID_PATTERN.search(part)
+        if match:
+            return match.group(1).upper()
+    return None
+
+
+def list_outputs(output_dir):
+    """Sorted names of the files of output_dir that go into the crate (databases and temporary files excluded)."""
+    names = []
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if (entry.is_file() and not entry.name.startswith('.') and entry.name != CRATE_METADATA_NAME
+                    and '.sqlite' not in entry.name and not entry.name.endswith('.tmp')):
+                names.append(entry.name)
+    return sorted(names)
+
+
+def _record_stem(name):
+    """Stem shared by a JSON record and its side files (<stem>.<table>.parquet, <stem>.downsampled.json)."""
+    for extension in Output_Writer.JSON_EXTENSIONS.values():
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return None
+
+
+def _side_file_stem(name, stems):
+    """Record stem of a side file (<stem>.<table>.parquet, <stem>.downsampled.json), or None."""
+    for i, c in enumerate(name):
+        if c == '.' and name[:i] in stems:
+            return name[:i]
+    return None
+
+
+def _encoding_format(name):
+    return ENCODING_FORMATS.get(os.path.splitext(name)[1].lower(), 'application/octet-stream')
+
+
+def _iso(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9, tz=timezone.utc).isoformat(timespec='seconds')
+
+
+def _file_id(name):
+    """Crate-relative @id of an output file (URI-encoded)."""
+    return urllib.parse.quote(name)
+
+
+def file_entity(entity_id, name, stat, sha256, source_path=None, description=None):
+    """JSON-LD File entity of one output or source file."""
+    entity = {'@id': entity_id, '@type': 'File', 'name': name, 'contentSize': stat.st_size,
+              'dateModified': _iso(stat.st_mtime_ns), 'encodingFormat': _encoding_format(name), 'sha256': sha256}
+    if description:
+        entity['description'] = description
+    if source_path:
+        entity['isBasedOn'] = {'@id': _source_id(source_path)}
+    return entity
+
+
+def _source_id(source_path):
+    return 'file://' + urllib.parse.quote(os.path.abspath(source_path))
+
+
+# --- 4. PACKAGING ---
+
+def write_crate(output_dir, orid=None, threads=DEFAULT_THREADS, name=None):
+    """
+    Writes <output_dir>/ro-crate-metadata.json for the outputs of output_dir (only those of orid,
+    e.g. 'ORID0036', if given). Returns (metadata path, {'files', 'sources', 'hashed', 'reused'}).
+    """
+    known, catalog_sources = _known_hashes(output_dir)
+    names = list_outputs(output_dir)
+    counts = {'files': 0, 'sources': 0, 'hashed': 0, 'reused': 0}
+
+    db = open_checksums(output_dir)
+    try:
+        stored = load_checksums(db)
+        # Pass 1: checksums (and sources) of the JSON records, needed to select an ORID's outputs
+        records = {}
+        record_entries = [(os.path.join(output_dir, n), True, catalog_sources.get(n)) for n in names if Output_Writer.is_json_file(n)]
+        for path, stat, sha256, source_path in checksum_files(db, stored, record_entries, known, threads, counts):
+            records[os.path.basename(path)] = (stat, sha256, source_path)
+
+        if orid:
+            target = orid.upper()
+            stems = {_record_stem(n) for n, (_, _, source) in records.items()
+                     if orid_of(n) == target or (source and orid_of(source) == target)}
+            # The records of the ORID and their side files (<stem>.<table>.parquet, <stem>.downsampled.json)
+            names = [n for n in names if (_record_stem(n) if n in records else _side_file_stem(n, stems)) in stems]
+
+        # Pass 2: the other output files and the source CSVs
+        sources = sorted({records[n][2] for n in names if n in records and records[n][2]})
+        source_set = set(sources)
+        record_sources = {_record_stem(n): records[n][2] for n in names if n in records and records[n][2]}
+        other_entries = ([(os.path.join(output_dir, n), False, None) for n in names if n not in records]
+                         + [(path, False, None) for path in sources])
+
+        metadata_path = os.path.join(output_dir, CRATE_METADATA_NAME)
+        fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.ro-crate-metadata.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('{\n  "@context": %s,\n  "@graph": [\n' % json.dumps(RO_CRATE_CONTEXT))
+                _write_entity(f, {'@id': CRATE_METADATA_NAME, '@type': 'CreativeWork',
+                                  'conformsTo': {'@id': RO_CRATE_SPEC}, 'about': {'@id': './'}}, first=True)
+                _write_entity(f, {'@id': './', '@type': 'Dataset',
+                                  'name': name or (f"{orid.upper()} metadata extraction outputs" if orid
+                                                   else f"Metadata extraction outputs of {os.path.basename(os.path.abspath(output_dir))}"),
+                                  'description': 'JSON records and tables extracted from laboratory CSV files, with checksums of their sources',
+                                  'datePublished': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                                  'hasPart': [{'@id': _file_id(n)} for n in names]})
+
+                for n in names:
+                    if n in records:
+                        stat, sha256, source_path = records[n]
+                        _write_entity(f, file_entity(_file_id(n), n, stat, sha256, source_path))
+                        counts['files'] += 1
+
+                for path, stat, sha256, _ in checksum_files(db, stored, other_entries, known, threads, counts):
+                    if path in source_set:
+                        _write_entity(f, file_entity(_source_id(path), os.path.basename(path), stat, sha256,
+                                                     description='Source CSV file (not included in the crate)'))
+                        counts['sources'] += 1
+                    else:
+                        n = os.path.basename(path)
+                        _write_entity(f, file_entity(_file_id(n), n, stat, sha256,
+                                                     record_sources.get(_side_file_stem(n, record_sources))))
+                        counts['files'] += 1
+                f.write('\n  ]\n}\n')
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file private: the crate metadata is meant to be shared
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, metadata_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    finally:
+        db.close()
+    return metadata_path, counts
+
+
+def _write_entity(f, entity, first=False):
+    """Appends one entity to the @graph being written."""
+    if not first:
+        f.write(',\n')
+    f.write('    ' + json.dumps(entity, default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Package extraction outputs as an RO-Crate (ro-crate-metadata.json)")
+    parser.add_argument("output_dir", help="Output directory holding the JSON records")
+    parser.add_argument("--orid", help="Only package the outputs of this ORID (e.g. ORID0036)")
+    parser.add_argument("--name", help="Name of the crate (default: derived from the directory or the ORID)")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS,
+                        help=f"Threads computing the checksums (default: {DEFAULT_THREADS})")
+    Parse_Cache.add_cache_arguments(parser)
+    args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+
+    if not os.path.isdir(args.output_dir):
+        print(f"❌ Error: {args.output_dir} is not a directory.")
+        return
+    metadata_path, counts = write_crate(args.output_dir, orid=args.orid, threads=args.threads, name=args.name)
+    print(f"📦 RO-Crate: {counts['files']} file(s), {counts['sources']} source CSV(s) in {metadata_path} "
+          f"({counts['hashed']} checksum(s) computed, {counts['reused']} reused)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import argparse
+import os
+import re
+import csv
+import bisect
+import sqlite3
+from datetime import datetime, timedelta
+import Output_Writer
+
+# --- 1. SETTINGS ---
+# Groups the instrument reports of a JSON output directory into sequencing runs:
+#   Thermal Report      --> time window [first_timestamp, last_timestamp], on one side (SideA / SideB)
+#   FM-Generation /
+#   FM-AutoTilt Report  --> a single timestamp, no side (the calibrations serve both flow cells)
+# Per (instrument, side) the thermal windows are sorted and swept: windows that overlap, or start less
+# than GAP_MINUTES after the previous one ends (e.g. the post-run wash), form one run.
+# Each calibration report is then attached, by bisection, to every run of its instrument whose window
+# (widened by GAP_MINUTES on both sides) contains it; calibrations outside any run are swept into
+# runs of their own, side 'N/A'. Everything is O(n log n) in the number of reports.
+# The report windows are kept in <json_dir>/run_index.sqlite and only JSON files that are new or
+# modified since the last build are read again (like the sample index).
+
+INDEX_FILE_NAME = 'run_index.sqlite'
+RUNS_JSON_NAME = 'run_index.json'
+RUNS_CSV_NAME = 'run_index.csv'
+GAP_MINUTES = 30
+NO_SIDE = 'N/A'
+
+THERMAL_TYPE = 'Thermal Report'
+CALIBRATION_TYPES = ('FM-Generation Report', 'FM-AutoTilt Report')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d_%H-%M-%S'
+# Instrument reports are named <instrument>_[<side>_]<date>_<time>_..., which spares reading the other JSON files
+REPORT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9]+_(?:Side[^_]+_)?\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}_')
+TIMESTAMP_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})')
+
+
+def add_run_index_arguments(parser):
+    """Adds the --run-index / --gap-minutes options to an argparse parser."""
+    parser.add_argument("--run-index", action="store_true",
+                        help=f"Group the thermal and FM reports of the output directory into runs ({RUNS_JSON_NAME} / {RUNS_CSV_NAME})")
+    parser.add_argument("--gap-minutes", type=float, default=GAP_MINUTES,
+                        help=f"Reports less than this many minutes apart belong to the same run (default: {GAP_MINUTES})")
+
+
+# --- 2. REPORT WINDOWS ---
+
+def parse_timestamp(value):
+    """Parses a report timestamp ('2024-01-19_16-05-47'). Returns None if missing or unknown."""
+    try:
+        return datetime.strptime(str(value), TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def report_window(file_info):
+    """
+    Returns (instrument, side, start, end) of a thermal / FM report extraction result,
+    side None for the calibration reports, or None for any other file (or without timestamps).
+    The timestamps come from the record, else from the file name.
+    """
+    file_type = file_info.get('file_type')
+    metadata = file_info.get('metadata') or {}
+    file_name = str(file_info.get('file_name') or '')
+    name_match = TIMESTAMP_PATTERN.search(file_name)
+    name_timestamp = parse_timestamp('_'.join(name_match.groups())) if name_match else None
+    name_instrument = file_name.split('_', 1)[0] or None
+
+    if file_type == THERMAL_TYPE:
+        instrument = file_info.get('instrument_id') or name_instrument
+        side = file_info.get('run_side') or NO_SIDE
+        start = parse_timestamp(file_info.get('first_timestamp')) or name_timestamp
+        end = parse_timestamp(file_info.get('last_timestamp')) or start
+    elif file_type in CALIBRATION_TYPES:
+        instrument = metadata.get('instrument_id') or metadata.get('instrument_name') or name_instrument
+        side = None
+        if metadata.get('time'):
+            start = parse_timestamp(f"{metadata.get('date')}_{metadata['time']}") or name_timestamp
+        else:
+            start = parse_timestamp(metadata.get('date')) or name_timestamp
+        end = start
+    else:
+        return None
+
+    if not instrument or start is None:
+        return None
+    return str(instrument), side, start, max(start, end)
+
+
+def open_index(json_dir):
+    """Opens (and creates if needed) the run index of a JSON directory."""
+    os.makedirs(json_dir, exist_ok=True)
+    db = sqlite3.connect(os.path.join(json_dir, INDEX_FILE_NAME), timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS reports (
+                      json_file TEXT PRIMARY KEY, mtime_ns INTEGER, file_type TEXT, file_path TEXT,
+                      instrument TEXT, side TEXT, start TEXT, end TEXT)""")
+    db.commit()
+    return db
+
+
+def sync_index(db, json_dir):
+    """
+    Brings the report windows up to date with the JSON files on disk, using only their mtimes:
+    new or modified report JSON files are (re-)read, deleted ones are dropped.
+    Files that are not instrument reports are remembered with an empty window.
+    """
+    indexed = dict(db.execute("SELECT json_file, mtime_ns FROM reports").fetchall())
+    on_disk = {}
+    with os.scandir(json_dir) as entries:
+        for entry in entries:
+            if REPORT_NAME_PATTERN.match(entry.name) and Output_Writer.is_json_file(entry.name) and entry.is_file():
+                on_disk[entry.name] = entry.stat().st_mtime_ns
+
+    with db:
+        db.executemany("DELETE FROM reports WHERE json_file = ?", [(name,) for name in indexed.keys() - on_disk.keys()])
+
+        for json_filename, mtime_ns in sorted(on_disk.items()):
+            if indexed.get(json_filename) == mtime_ns:
+                continue
+            try:
+                file_info = Output_Writer.read_json(os.path.join(json_dir, json_filename))
+            except (OSError, ValueError, EOFError) as e:
+                print(f"Skipping {json_filename} while indexing runs: {e}")
+                continue
+            window = report_window(file_info) if isinstance(file_info, dict) else None
+            if window is None:
+                db.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, NULL, NULL, NULL, NULL, NULL, NULL)",
+                           (json_filename, mtime_ns))
+                continue
+            instrument, side, start, end = window
+            db.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (json_filename, mtime_ns, file_info.get('file_type'), file_info.get('file_path'), instrument,
+                        side, start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)))
+
+
+def load_reports(db):
+    """Returns the indexed reports: dictionaries {'json_file', 'file_type', 'file_path', 'instrument', 'side', 'start', 'end'}."""
+    rows = db.execute("""SELECT json_file, file_type, file_path, instrument, side, start, end
+                         FROM reports WHERE file_type IS NOT NULL""").fetchall()
+    return [{'json_file': json_file, 'file_type': file_type, 'file_path': file_path, 'instrument': instrument,
+             'side': side, 'start': parse_timestamp(start), 'end': parse_timestamp(end)}
+            for json_file, file_type, file_path, instrument, side, start, end in rows]
+
+
+# --- 3. RUN GROUPING ---
+
+def _sweep(reports, instrument, side, gap):
+    """Merges reports (sorted by start) whose windows overlap or are less than gap apart. Returns the runs."""
+    runs = []
+    for report in reports:
+        if runs and report['start'] <= runs[-1]['end'] + gap:
+            run = runs[-1]
+            run['end'] = max(run['end'], report['end'])
+            run['reports'].append(report)
+        else:
+            runs.append({'instrument': instrument, 'side': side, 'start': report['start'], 'end': report['end'],
+                         'reports': [report]})
+    return runs
+
+
+def group_runs(reports, gap_minutes=GAP_MINUTES):
+    """
+    Groups report windows (see load_reports) into runs, sorted by instrument, start and side:
+    {'run_id', 'instrument', 'side', 'start', 'end', 'reports' [sorted by start]}.
+    A calibration report may belong to the runs of both sides of its instrument.
+    """
+    gap = timedelta(minutes=gap_minutes)
+    order = lambda report: (report['start'], report['end'], report['json_file'])
+
+    thermal, calibrations = {}, {}
+    for report in reports:
+        if report['side'] is None:
+            calibrations.setdefault(report['instrument'], []).append(report)
+        else:
+            thermal.setdefault((report['instrument'], report['side']), []).append(report)
+
+    runs = []
+    runs_by_instrument = {}
+    for (instrument, side), side_reports in thermal.items():
+        side_runs = _sweep(sorted(side_reports, key=order), instrument, side, gap)
+        runs.extend(side_runs)
+        # The runs of one side are disjoint and sorted: their starts can be bisected
+        runs_by_instrument.setdefault(instrument, []).append(([run['start'] for run in side_runs], side_runs))
+
+    for instrument, instrument_reports in calibrations.items():
+        unattached = []
+        for report in sorted(instrument_reports, key=order):
+            attached = False
+            for starts, side_runs in runs_by_instrument.get(instrument, ()):
+                # Last run of this side starting before report + gap (a calibration precedes its run)
+                position = bisect.bisect_right(starts, report['start'] + gap) - 1
+                if position >= 0 and report['start'] <= side_runs[position]['end'] + gap:
+                    side_runs[position]['reports'].append(report)
+                    attached = True
+            if not attached:
+                unattached.append(report)
+        runs.extend(_sweep(unattached, instrument, NO_SIDE, gap))
+
+    for run in runs:
+        run['reports'].sort(key=order)
+        run['run_id'] = f"{run['instrument']}_{run['side']}_{run['start'].strftime(TIMESTAMP_FORMAT)}"
+    runs.sort(key=lambda run: (run['instrument'], run['start'], run['side']))
+    return runs
+
+
+def build_runs(json_dir, gap_minutes=GAP_MINUTES):
+    """Syncs the run index of json_dir and returns its runs (see group_runs)."""
+    db = open_index(json_dir)
+    try:
+        sync_index(db, json_dir)
+        reports = load_reports(db)
+    finally:
+        db.close()
+    return group_runs(reports, gap_minutes=gap_minutes)
+
+
+def _stem(file_name):
+    """File name without its CSV / JSON (compressed or not) extension."""
+    for extension in ('.csv',) + tuple(Output_Writer.JSON_EXTENSIONS.values()):
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)]
+    return file_name
+
+
+def find_runs(runs, report_name):
+    """Returns the runs holding a report, given its CSV or JSON file name."""
+    stem = _stem(os.path.basename(report_name))
+    return [run for run in runs if any(_stem(report['json_file']) == stem for report in run['reports'])]
+
+
+# --- 4. OUTPUTS ---
+
+def run_record(run):
+    """JSON-ready record of one run."""
+    return {
+        'run_id': run['run_id'],
+        'instrument_id': run['instrument'],
+        'run_side': run['side'],
+        'start': run['start'].strftime(TIMESTAMP_FORMAT),
+        'end': run['end'].strftime(TIMESTAMP_FORMAT),
+        'reports': [{'json_file': report['json_file'], 'file_type': report['file_type'],
+                     'file_path': report['file_path'], 'start': report['start'].strftime(TIMESTAMP_FORMAT),
+                     'end': report['end'].strftime(TIMESTAMP_FORMAT)} for report in run['reports']]
+    }
+
+
+def save_runs(runs, json_dir):
+    """Writes run_index.json (one record per run) and run_index.csv (one row per run). Returns the CSV path."""
+    Output_Writer.write_json([run_record(run) for run in runs], os.path.join(json_dir, RUNS_JSON_NAME))
+
+    csv_path = os.path.join(json_dir, RUNS_CSV_NAME)
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Run ID', 'Instrument ID', 'Run Side', 'Start', 'End', 'Thermal Reports',
+                         'Calibration Reports', 'JSON Files'])
+        for run in runs:
+            writer.writerow([run['run_id'], run['instrument'], run['side'], run['start'].strftime(TIMESTAMP_FORMAT),
+                             run['end'].strftime(TIMESTAMP_FORMAT),
+                             sum(report['file_type'] == THERMAL_TYPE for report in run['reports']),
+                             sum(report['file_type'] in CALIBRATION_TYPES for report in run['reports']),
+                             ';'.join(report['json_file'] for report in run['reports'])])
+    return csv_path
+
+
+def update_run_index(json_dir, gap_minutes=GAP_MINUTES):
+    """Rebuilds the runs of json_dir and saves them. Returns (csv path, number of runs)."""
+    runs = build_runs(json_dir, gap_minutes=gap_minutes)
+    return save_runs(runs, json_dir), len(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group the Thermal / FM-Generation / FM-AutoTilt reports of a JSON directory into runs")
+    parser.add_argument("json_dir", help="Directory holding the extracted JSON files")
+    parser.add_argument("--gap-minutes", type=float, default=GAP_MINUTES,
+                        help=f"Reports less than this many minutes apart belong to the same run (default: {GAP_MINUTES})")
+    parser.add_argument("--report", action="append", default=[],
+                        help="Show the run(s) holding this report (CSV or JSON file name); may be repeated")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.json_dir):
+        print(f"❌ Error: {args.json_dir} is not a directory.")
+        return
+
+    runs = build_runs(args.json_dir, gap_minutes=args.gap_minutes)
+    if not args.report:
+        print(f"Saved {len(runs)} run(s) to: {save_runs(runs, args.json_dir)}")
+        return
+
+    for report_name in args.report:
+        matches = find_runs(runs, report_name)
+        if not matches:
+            print(f"⚠️  {report_name}: not found in any run")
+        for run in matches:
+            print(f"🧬 {run['run_id']}  ({run['start'].strftime(TIMESTAMP_FORMAT)} --> {run['end'].strftime(TIMESTAMP_FORMAT)})")
+            for report in run['reports']:
+                print(f"   {report['start'].strftime(TIMESTAMP_FORMAT)}  {report['file_type']:<22} {report['json_file']}")
+
+
+if __name__ == "__main__":
+    main()
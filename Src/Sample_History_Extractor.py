@@ -1,29 +1,18 @@
 import os
-import json
 import argparse
-from datetime import datetime
-
-def parse_flexible_date(date_str):
-    if not date_str or date_str == 'N/A':
-        return datetime.min
-
-    for fmt in ('%Y-%m-%d', '%Y%m%d', '%m/%d/%Y', '%d/%m/%Y'):
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-
-    return datetime.min
+import Sample_Index
+import Output_Writer
 
 def get_sample_history(json_dir, target_sample_id, output_dir):
     """
-    Scans all JSON files in a directory to find every occurrence of a specific Sample ID.
+    Finds every occurrence of a specific sample in the JSON files of a directory.
+    The sample is matched on Sample_ID, Sample_Name or Sentrix barcode_position (e.g. 209673720136_R01C01)
+    through the sample index of the directory (see Sample_Index), which is refreshed first
+    for JSON files that were added or modified since the last lookup.
     Saves a consolidated history file for that sample.
     """
-    sample_history = []
-    
-    # 1. Gather all JSON files from the previous extractions
-    json_files = [f for f in os.listdir(json_dir) if f.endswith('.json')]
+    # 1. Gather all JSON files (compressed or not) from the previous extractions
+    json_files = [f for f in os.listdir(json_dir) if Output_Writer.is_json_file(f)]
     
     if not json_files:
         print(f"No JSON files found in {json_dir}")
@@ -32,48 +21,17 @@ def get_sample_history(json_dir, target_sample_id, output_dir):
     print("-" * 60)
     print(f"Searching for Sample ID: {target_sample_id} in {len(json_files)} JSON files")
 
-    for json_file in json_files:
-        file_path = os.path.join(json_dir, json_file)
-        
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            
-        # 2. Check the 'samples' list we enriched earlier
-        # Note: Depending on your CSV headers, this might be 'Sample_ID' or 'Sample_Name'
-        samples_list = data.get('samples', [])
-        metadata = data.get('metadata', {})
-
-        # Extract the date string (e.g., '2024-06-19')
-        date_str = metadata.get('date', 'N/A') # Default date if missing
-        
-        for sample_entry in samples_list:
-            # We check for a match (case-insensitive for safety)
-            # Use .get('Sample_ID') or .get('Sample_Name') based on your specific file headers
-            if str(sample_entry.get('Sample_ID')).lower() == str(target_sample_id).lower():
-                
-                # Create a record entry showing when/where this sample appeared
-                record = {
-                    "source_file": data.get('file_name'),
-                    "file_type": data.get('file_type'),
-                    "extraction_metadata": data.get('metadata'),
-                    "manifest_id": data.get('manifest_id'),
-                    "sample_details": sample_entry # All the key-value pairs for this specific run
-                }
-                sample_history.append(record)
-
-    # SORTING LOGIC: Organise from oldest (least recent) to newest (most recent)
-    # This tells Python: "For every entry 'x', look inside 'metadata' and get 'date' to sort by"
-    sample_history.sort(key=lambda x: parse_flexible_date(x['extraction_metadata'].get('date', 'N/A')))         
+    # 2. Indexed query, already sorted from oldest (least recent) to newest (most recent)
+    sample_history = Sample_Index.query_sample_history(json_dir, target_sample_id)
 
     # 3. Save the results if the sample was found
     if sample_history:
         os.makedirs(output_dir, exist_ok=True)
-        # Use the sample ID as the filename
-        output_filename = f"History_{target_sample_id}.json"
+        # Use the sample ID as the filename (extension of the configured compression)
+        output_filename = Output_Writer.json_file_name(f"History_{target_sample_id}.json")
         output_path = os.path.join(output_dir, output_filename)
         
-        with open(output_path, 'w') as f:
-            json.dump(sample_history, f, indent=2)
+        Output_Writer.write_json(sample_history, output_path)
             
         print(f"History file created with {len(sample_history)} entries for the sample {target_sample_id}.")
         print(f"History file saved to: {output_path}")
@@ -82,20 +40,84 @@ def get_sample_history(json_dir, target_sample_id, output_dir):
     print("-" * 60)
 
 
+def read_sample_ids_file(ids_file_path):
+    """
+    Reads sample IDs (or patterns) from a text file: one per line, or several separated by commas.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    sample_ids = []
+    with open(ids_file_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            sample_ids.extend(part.strip() for part in line.split(',') if part.strip())
+    return sample_ids
+
+
+def get_sample_histories(json_dir, target_sample_ids, output_dir):
+    """
+    Builds the history files of many samples (e.g. a whole plate) in a single pass:
+    the sample index is refreshed once, then one indexed query routes every matching record
+    to its sample (see Sample_Index.iter_sample_histories).
+    Targets can be exact Sample_ID / Sample_Name / Sentrix barcode_position values or
+    wildcard patterns ('P16*', '209673720136_R0?C01'); a pattern creates one history file per matched sample.
+    Returns {sample: number of history entries}.
+    """
+    json_files = [f for f in os.listdir(json_dir) if Output_Writer.is_json_file(f)]
+    if not json_files:
+        print(f"No JSON files found in {json_dir}")
+        return {}
+
+    print("-" * 60)
+    print(f"Searching for {len(target_sample_ids)} Sample ID(s) / pattern(s) in {len(json_files)} JSON files")
+
+    os.makedirs(output_dir, exist_ok=True)
+    found = {}
+    # Histories arrive one sample at a time and are written immediately
+    for sample_id, sample_history in Sample_Index.iter_sample_histories(json_dir, target_sample_ids):
+        output_path = os.path.join(output_dir, Output_Writer.json_file_name(f"History_{sample_id}.json"))
+        Output_Writer.write_json(sample_history, output_path)
+        found[sample_id] = len(sample_history)
+        print(f"History file created with {len(sample_history)} entries for the sample {sample_id}: {output_path}")
+
+    found_values = {Sample_Index.normalize_identity(s) for s in found}
+    missing = [t for t in target_sample_ids
+               if not Sample_Index.is_pattern(t) and Sample_Index.normalize_identity(t) not in found_values]
+    print(f"{len(found)} history file(s) saved to: {output_dir}")
+    if missing:
+        print(f"No records found for: {', '.join(missing)}")
+    print("-" * 60)
+    return found
+
+
 def main_Sample_History():
     
      # 1. Setup the Argument Parser
-    parser = argparse.ArgumentParser(description="Generate a history file for a specific Sample ID.")
+    parser = argparse.ArgumentParser(description="Generate history files for one or more Sample IDs.")
 
     # 2. Add the component arguments
     parser.add_argument("json_dir", help="Directory where the JSON files are stored")
-    parser.add_argument("sample_id", help="The specific Sample ID to track")
-    parser.add_argument("output_dir", help="Where to save the resulting history file")
+    parser.add_argument("sample_ids", nargs="*", help="The Sample ID(s) to track; wildcards allowed (e.g. 'P16*')")
+    parser.add_argument("output_dir", help="Where to save the resulting history file(s)")
+    parser.add_argument("--ids-file", help="Text file with more Sample IDs / patterns (one per line or comma-separated)")
+    Output_Writer.add_json_arguments(parser)
 
     # 3. Parse the arguments from the terminal
     args = parser.parse_args()
+    Output_Writer.configure_from_args(args)
+
+    sample_ids = list(args.sample_ids)
+    if args.ids_file:
+        sample_ids.extend(read_sample_ids_file(args.ids_file))
+    if not sample_ids:
+        parser.error("give at least one Sample ID, or --ids-file")
 
-    get_sample_history(args.json_dir, args.sample_id, args.output_dir)
+    # One sample keeps the original single-sample behaviour and messages
+    if len(sample_ids) == 1 and not Sample_Index.is_pattern(sample_ids[0]):
+        get_sample_history(args.json_dir, sample_ids[0], args.output_dir)
+    else:
+        get_sample_histories(args.json_dir, sample_ids, args.output_dir)
 
 if __name__ == "__main__":
     main_Sample_History()
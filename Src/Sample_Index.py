@@ -0,0 +1,297 @@
+import os
+import json
+import math
+import itertools
+import sqlite3
+from datetime import datetime
+import Timing_Trace
+import Output_Writer
+
+# --- 1. SETTINGS ---
+# The index lives next to the JSON outputs it describes (<json_dir>/sample_index.sqlite).
+# Every sample row of a BeadStudio / Illumina Sample Sheet JSON is stored once as a history record,
+# and linked to each of its normalised identities:
+#     'id:<sample_id>', 'name:<sample_name>', 'sentrix:<barcode>_<position>'
+
+INDEX_FILE_NAME = 'sample_index.sqlite'
+
+
+def parse_flexible_date(date_str):
+    """Parses the date formats found in the sheet headers. Returns datetime.min if unknown."""
+    if date_str is None or date_str == 'N/A':
+        return datetime.min
+    date_str = str(date_str)
+
+    for fmt in ('%Y-%m-%d', '%Y%m%d', '%m/%d/%Y', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+
+    return datetime.min
+
+
+def normalize_identity(value):
+    """Returns a lowercase, stripped identity string, or None for empty/NaN values."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            value = int(value)
+    value = str(value).strip().lower()
+    return value or None
+
+
+def sample_identities(sample_entry):
+    """Returns the set of normalised identities of one sample entry."""
+    identities = set()
+
+    sample_id = normalize_identity(sample_entry.get('Sample_ID'))
+    if sample_id:
+        identities.add(f"id:{sample_id}")
+
+    sample_name = normalize_identity(sample_entry.get('Sample_Name'))
+    if sample_name:
+        identities.add(f"name:{sample_name}")
+
+    # BeadStudio sheets use SentrixBarcode_A / SentrixPosition_A, others Sentrix_ID / Sentrix_Position
+    barcode = normalize_identity(sample_entry.get('SentrixBarcode_A', sample_entry.get('Sentrix_ID')))
+    position = normalize_identity(sample_entry.get('SentrixPosition_A', sample_entry.get('Sentrix_Position')))
+    if barcode and position:
+        identities.add(f"sentrix:{barcode}_{position}")
+
+    return identities
+
+
+# --- 2. STORAGE ---
+
+def open_index(json_dir):
+    """Opens (and creates if needed) the sample index of a JSON directory."""
+    os.makedirs(json_dir, exist_ok=True)
+    db = sqlite3.connect(os.path.join(json_dir, INDEX_FILE_NAME), timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS files (
+                      json_file TEXT PRIMARY KEY, mtime_ns INTEGER)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS records (
+                      record_id INTEGER PRIMARY KEY, json_file TEXT, date_key TEXT, record TEXT)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS identities (
+                      identity TEXT, record_id INTEGER)""")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_identity ON identities (identity)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_records_file ON records (json_file)")
+    db.commit()
+    return db
+
+
+def _remove_file(db, json_filename):
+    """Deletes every record (and identity link) coming from one JSON file."""
+    db.execute("DELETE FROM identities WHERE record_id IN (SELECT record_id FROM records WHERE json_file = ?)", (json_filename,))
+    db.execute("DELETE FROM records WHERE json_file = ?", (json_filename,))
+    db.execute("DELETE FROM files WHERE json_file = ?", (json_filename,))
+
+
+def sample_rows(json_dir, samples):
+    """
+    The sample entries of a record: its 'samples' list, or the rows of the Parquet table it
+    references ({'parquet_file', 'rows'}, written with --format parquet). [] for anything else.
+    """
+    if isinstance(samples, dict) and 'parquet_file' in samples:
+        import pandas as pd
+        # Empty cells as None, like in the JSON records
+        return Output_Writer.without_nan(pd.read_parquet(os.path.join(json_dir, samples['parquet_file'])).to_dict('records'))
+    if isinstance(samples, list):
+        return [entry for entry in samples if isinstance(entry, dict)]
+    return []
+
+
+def _insert_file_info(db, json_dir, json_filename, file_info):
+    """(Re-)indexes the samples of one extraction result."""
+    samples = sample_rows(json_dir, file_info.get('samples'))
+    _remove_file(db, json_filename)
+
+    metadata = file_info.get('metadata', {}) or {}
+    date_key = parse_flexible_date(metadata.get('date', 'N/A')).strftime('%Y-%m-%d')
+
+    for sample_entry in samples:
+        # Same record layout as the history files
+        record = {
+            "source_file": file_info.get('file_name'),
+            "file_type": file_info.get('file_type'),
+            "extraction_metadata": file_info.get('metadata'),
+            "manifest_id": file_info.get('manifest_id'),
+            "sample_details": sample_entry
+        }
+        cursor = db.execute("INSERT INTO records (json_file, date_key, record) VALUES (?, ?, ?)",
+                            (json_filename, date_key, json.dumps(record)))
+        db.executemany("INSERT INTO identities VALUES (?, ?)",
+                       [(identity, cursor.lastrowid) for identity in sample_identities(sample_entry)])
+
+    json_path = os.path.join(json_dir, json_filename)
+    mtime_ns = os.stat(json_path).st_mtime_ns if os.path.exists(json_path) else None
+    db.execute("INSERT INTO files VALUES (?, ?)", (json_filename, mtime_ns))
+
+
+def index_file_info(json_dir, json_filename, file_info):
+    """
+    Adds the samples of an extraction result to the index of json_dir.
+    Called by the extractors right after writing the JSON file; results without 'samples' are ignored.
+    """
+    if not file_info.get('samples'):
+        return
+    with Timing_Trace.span('index'):
+        db = open_index(json_dir)
+        try:
+            with db:
+                _insert_file_info(db, json_dir, json_filename, file_info)
+        finally:
+            db.close()
+
+
+def mark_written(json_dir, json_filename):
+    """
+    Records the current mtime of a JSON file indexed before it was written (deferred writes,
+    see Async_Pipeline), so that sync_index() does not read it again. No-op if it is not indexed.
+    """
+    if not os.path.exists(os.path.join(json_dir, INDEX_FILE_NAME)):
+        return
+    mtime_ns = os.stat(os.path.join(json_dir, json_filename)).st_mtime_ns
+    db = open_index(json_dir)
+    try:
+        with db:
+            db.execute("UPDATE files SET mtime_ns = ? WHERE json_file = ?", (mtime_ns, json_filename))
+    finally:
+        db.close()
+
+
+def sync_index(db, json_dir):
+    """
+    Brings the index up to date with the JSON files on disk (compressed or not), using only
+    their mtimes: new or modified JSON files are (re-)read, deleted ones are dropped.
+    """
+    indexed = dict(db.execute("SELECT json_file, mtime_ns FROM files").fetchall())
+    on_disk = {}
+    with os.scandir(json_dir) as entries:
+        for entry in entries:
+            if Output_Writer.is_json_file(entry.name) and entry.is_file():
+                on_disk[entry.name] = entry.stat().st_mtime_ns
+
+    with db:
+        for json_filename in indexed.keys() - on_disk.keys():
+            _remove_file(db, json_filename)
+
+        for json_filename, mtime_ns in sorted(on_disk.items()):
+            if indexed.get(json_filename) == mtime_ns:
+                continue
+            try:
+                file_info = Output_Writer.read_json(os.path.join(json_dir, json_filename))
+                if isinstance(file_info, dict):
+                    _insert_file_info(db, json_dir, json_filename, file_info)
+                else:
+                    # Not an extraction result (e.g. a History_*.json file): remember it as seen
+                    _remove_file(db, json_filename)
+                    db.execute("INSERT INTO files VALUES (?, ?)", (json_filename, mtime_ns))
+            except (OSError, ValueError, EOFError) as e:
+                # Unreadable record or Parquet table: tried again at the next sync
+                print(f"Skipping {json_filename} while indexing samples: {e}")
+
+
+# --- 3. QUERIES ---
+
+def query_sample_history(json_dir, target_sample_id):
+    """
+    Returns every history record whose Sample_ID, Sample_Name or Sentrix barcode_position
+    matches target_sample_id (case-insensitive), sorted from oldest to newest.
+    """
+    target = normalize_identity(target_sample_id)
+    if not target:
+        return []
+
+    db = open_index(json_dir)
+    try:
+        sync_index(db, json_dir)
+        rows = db.execute("""SELECT DISTINCT r.record_id, r.date_key, r.record
+                             FROM identities i JOIN records r ON r.record_id = i.record_id
+                             WHERE i.identity IN (?, ?, ?)
+                             ORDER BY r.date_key, r.record_id""",
+                          (f"id:{target}", f"name:{target}", f"sentrix:{target}")).fetchall()
+    finally:
+        db.close()
+
+    return [json.loads(row[2]) for row in rows]
+
+
+def is_pattern(target):
+    """True when a target uses shell-style wildcards (*, ?, [...]), e.g. 'P16*' or '209673720136_R0?C01'."""
+    return any(c in target for c in '*?[')
+
+
+def expand_patterns(db, patterns):
+    """
+    Returns the identity values (without their 'id:' / 'name:' / 'sentrix:' prefix) matching
+    any of the patterns, in sorted order. Matching is case-insensitive, like exact targets.
+    """
+    values = set()
+    for pattern in patterns:
+        pattern = str(pattern).strip().lower()
+        for prefix in ('id:', 'name:', 'sentrix:'):
+            rows = db.execute("SELECT DISTINCT identity FROM identities WHERE identity GLOB ?", (prefix + pattern,))
+            values.update(identity[len(prefix):] for (identity,) in rows)
+    return sorted(values)
+
+
+def _display_name(records, value):
+    """Returns value as written in the sheets (original case), from the first record carrying it."""
+    for record in records:
+        details = record.get('sample_details') or {}
+        candidates = [details.get('Sample_ID'), details.get('Sample_Name')]
+        barcode = details.get('SentrixBarcode_A', details.get('Sentrix_ID'))
+        position = details.get('SentrixPosition_A', details.get('Sentrix_Position'))
+        if normalize_identity(barcode) and normalize_identity(position):
+            candidates.append(f"{normalize_identity(barcode)}_{str(position).strip()}")
+        for candidate in candidates:
+            if normalize_identity(candidate) == value:
+                return str(candidate).strip()
+    return value
+
+
+def iter_sample_histories(json_dir, targets):
+    """
+    Yields (sample, history records sorted from oldest to newest) for every target with at least one match.
+    targets may mix exact sample IDs / names / Sentrix barcode_positions and wildcard patterns;
+    each pattern is expanded to the samples it matches, each of them getting its own history.
+
+    The index is synced once (every new or modified JSON file is read once), then ONE query streams
+    the records of all targets, grouped by target: memory holds the records of one sample at a time.
+    """
+    db = open_index(json_dir)
+    try:
+        sync_index(db, json_dir)
+
+        # Exact targets keep the spelling given by the user; expanded patterns use the sheets' spelling
+        samples = {}
+        for target in targets:
+            target = str(target).strip()
+            value = normalize_identity(target)
+            if value and not is_pattern(target):
+                samples.setdefault(value, target)
+        expanded = set(expand_patterns(db, [t for t in targets if is_pattern(str(t))])) - samples.keys()
+
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS targets (value TEXT, identity TEXT)")
+        db.execute("DELETE FROM targets")
+        db.executemany("INSERT INTO targets VALUES (?, ?)",
+                       [(value, f"{prefix}:{value}") for value in itertools.chain(samples, expanded)
+                        for prefix in ('id', 'name', 'sentrix')])
+
+        rows = db.execute("""SELECT t.value, r.record
+                             FROM targets t
+                             JOIN identities i ON i.identity = t.identity
+                             JOIN records r ON r.record_id = i.record_id
+                             GROUP BY t.value, r.record_id
+                             ORDER BY t.value, r.date_key, r.record_id""")
+        for value, group in itertools.groupby(rows, key=lambda row: row[0]):
+            records = [json.loads(row[1]) for row in group]
+            yield samples.get(value) or _display_name(records, value), records
+    finally:
+        db.close()
+
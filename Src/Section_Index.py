@@ -0,0 +1,173 @@
+import io
+import re
+import mmap
+import Timing_Trace
+
+# --- 1. SECTION INDEX ---
+# Semi-structured Illumina CSVs ([Header], [Manifests], [Reads], [Settings], [Data], ...)
+# are memory-mapped, never read into Python objects line by line. The '[Section]' markers are
+# found with a byte search and their offsets recorded, so that each extractor can ask for a
+# slice without re-opening or re-scanning the file. Only the sections actually requested are
+# decoded (get_section_text) or handed to pandas as zero-copy binary streams (open_section).
+
+# A '[' at the start of a line (same line breaks as bytes.splitlines: \r\n, \r or \n)
+_MARKER_PATTERN = re.compile(rb'(?:\A|(?<=[\r\n]))\[')
+_LINE_END_PATTERN = re.compile(rb'\r\n|\r|\n')
+
+
+def _map_file(file_Input_path):
+    """Memory-maps a file read-only (empty files cannot be mapped and give b'')."""
+    with open(file_Input_path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b''
+
+
+def build_section_index(file_Input_path):
+    """
+    Maps a CSV file once and records the byte offsets of every bracketed section.
+
+    Returns a dictionary:
+        'file_path'    --> the indexed file
+        'raw'          --> the file content (read-only mmap, or b'' for an empty file)
+        'preamble_end' --> byte offset of the first '[' marker (end of the top-level lines)
+        'sections'     --> list of {'marker', 'start', 'end'} in file order, where
+                           'marker' is the stripped marker line (e.g. '[Header],,,,'),
+                           'start'/'end' are the byte offsets of the section body.
+    """
+    with Timing_Trace.span('read'):
+        raw = _map_file(file_Input_path)
+
+    sections = []
+    preamble_end = len(raw)
+
+    for match in _MARKER_PATTERN.finditer(raw):
+        offset = match.start()
+        line_end = _LINE_END_PATTERN.search(raw, offset)
+        line_end = line_end.end() if line_end else len(raw)
+        if sections:
+            sections[-1]['end'] = offset
+        else:
+            preamble_end = offset
+        sections.append({
+            'marker': raw[offset:line_end].decode('utf-8').strip(),
+            'start': line_end,
+            'end': len(raw)
+        })
+
+    return {
+        'file_path': file_Input_path,
+        'raw': raw,
+        'preamble_end': preamble_end,
+        'sections': sections
+    }
+
+
+def _decode(section_index, start, end):
+    """Decodes a byte slice of the indexed file, normalising line endings like text-mode open()."""
+    text = str(memoryview(section_index['raw'])[start:end], 'utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+class _SliceReader(io.RawIOBase):
+    """Read-only binary file over a memoryview: pandas reads the mapped pages without a copy of the section."""
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = min(max(base + offset, 0), len(self._view))
+        return self._position
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self._view) - self._position)
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+
+# --- 2. SECTION ACCESS ---
+
+def find_section(section_index, section_name):
+    """
+    Returns the first section entry whose marker line starts with section_name
+    (e.g. '[Header]', '[Data]'), or None if the section is not present.
+    """
+    for section in section_index['sections']:
+        if section['marker'].startswith(section_name):
+            return section
+    return None
+
+
+def get_section_text(section_index, section_name):
+    """
+    Returns the body of a section (the lines between its marker and the next marker)
+    as a string, or None if the section is not present.
+    """
+    section = find_section(section_index, section_name)
+    if section is None:
+        return None
+    return section_text(section_index, section)
+
+
+def section_text(section_index, section):
+    """Returns the body of a section entry (see find_section) as a string."""
+    return _decode(section_index, section['start'], section['end'])
+
+
+def first_line_text(section_index, section):
+    """Returns the first non-blank line of a section entry, or None if the section is empty. Only that line is decoded."""
+    raw = section_index['raw']
+    position = section['start']
+    while position < section['end']:
+        line_end = _LINE_END_PATTERN.search(raw, position, section['end'])
+        line = raw[position:line_end.start() if line_end else section['end']]
+        if line.strip():
+            return line.decode('utf-8')
+        if line_end is None:
+            break
+        position = line_end.end()
+    return None
+
+
+def open_section(section_index, section):
+    """
+    Returns a binary file object over the body of a section entry (see find_section), for
+    pd.read_csv. The bytes are read from the mapped file as pandas consumes them, without a copy.
+    """
+    view = memoryview(section_index['raw'])[section['start']:section['end']]
+    return io.BufferedReader(_SliceReader(view))
+
+
+def get_section_stream(section_index, section_name):
+    """Returns a binary file object over the body of a section (see open_section), or None if it is not present."""
+    section = find_section(section_index, section_name)
+    if section is None:
+        return None
+    return open_section(section_index, section)
+
+
+def get_preamble_text(section_index):
+    """Returns the top-level lines located before the first '[' marker."""
+    return _decode(section_index, 0, section_index['preamble_end'])
+
+
+def iter_sections(section_index):
+    """Yields (marker, body_text) for every section, in file order."""
+    for section in section_index['sections']:
+        yield section['marker'], section_text(section_index, section)
+
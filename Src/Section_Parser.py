@@ -0,0 +1,148 @@
+import re
+import csv
+import Section_Index
+
+# --- 1. SETTINGS ---
+# Lightweight csv-module parsing of the small key/value sections (summaries, [Header] blocks):
+# building a DataFrame per section costs far more than the section itself (FM-AutoTilt reports
+# have 14 of them). pandas stays in charge of the wide tables.
+# Only text values are handled here: a column pd.read_csv keeps as strings because one of its values
+# is not a number, with NaN for the default NA strings. A column pandas would type (all numbers, or
+# booleans) is left to pd.read_csv, so numbers are always parsed by the installed pandas.
+# Every function returns None when the section is not one of the simple layouts reproduced here:
+# the caller then falls back to pandas.
+
+# pd.read_csv default na_values
+NA_VALUES = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                       '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+_NUMBER_PATTERN = re.compile(r'\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*\Z')
+# Values pandas may convert even next to text (infinities, booleans): such columns are left to pandas
+_SPECIAL_VALUES = frozenset(['inf', '+inf', '-inf', 'infinity', '+infinity', '-infinity', 'true', 'false'])
+
+NAN = float('nan')
+
+
+def read_rows(text, skipinitialspace=False):
+    """Splits a section body into rows of fields; blank lines are skipped (like pd.read_csv)."""
+    lines = [line for line in text.split('\n') if line.strip()]
+    return list(csv.reader(lines, skipinitialspace=skipinitialspace))
+
+
+# --- 2. COLUMN TYPING ---
+
+def convert_column(raw_values):
+    """
+    Reads one text column like pd.read_csv. raw_values are field strings, None for missing fields.
+    Returns ('object', values) (NaN for missing / NA fields), ('empty', [NaN, ...]) when every field
+    is missing, or None when pandas must type the column (only numbers, booleans, infinities).
+    """
+    present = [value for value in raw_values if value is not None and value not in NA_VALUES]
+    if not present:
+        return 'empty', [NAN] * len(raw_values)
+    if all(_NUMBER_PATTERN.match(value) for value in present):
+        return None
+    if any(value.strip().lower() in _SPECIAL_VALUES for value in present):
+        return None
+    return 'object', [NAN if value is None or value in NA_VALUES else value for value in raw_values]
+
+
+def _columns(rows, width):
+    """Transposes rows (padded with None up to width) into columns."""
+    return [[row[i] if i < len(row) else None for row in rows] for i in range(width)]
+
+
+# --- 3. SECTION LAYOUTS ---
+
+def parse_summary_section(text):
+    """
+    Parses a headerless section (pd.read_csv(..., header=None)).
+    Returns:
+        ('summary', [(label, value), ...]) for a 2-column section, labels as str(label).strip()
+        ('table', None) for any other regular section (to be parsed by pandas with its header row)
+        None when pandas must decide (empty section, rows wider than the first one, typed values)
+    """
+    rows = read_rows(text)
+    if not rows:
+        return None
+    width = len(rows[0])
+    if any(len(row) > width for row in rows):
+        return None
+    if width != 2:
+        return 'table', None
+
+    labels, values = (convert_column(column) for column in _columns(rows, 2))
+    # Text labels: the rows are objects, iterrows() keeps every value as is
+    if labels is None or values is None or labels[0] != 'object':
+        return None
+    return 'summary', [(str(label).strip(), value) for label, value in zip(labels[1], values[1])]
+
+
+def parse_header_pairs(text, skipinitialspace=False, drop_empty_columns=False, names=None):
+    """
+    Parses a [Header] block read with its first row as column names (pd.read_csv(...)), and returns
+    the (key, value) pairs of its first two columns, NaN where missing; drop_empty_columns first
+    drops the all-NaN columns (.dropna(axis=1, how='all')). With names, the block is read like
+    pd.read_csv(..., header=None, names=names): every row is data, len(names) columns wide.
+    Returns None when pandas must decide (rows wider than the header, non-text keys, typed values).
+    """
+    rows = read_rows(text, skipinitialspace=skipinitialspace)
+    if not rows:
+        return None
+    if names is None:
+        width, data_rows = len(rows[0]), rows[1:]
+    else:
+        width, data_rows = len(names), rows
+    if any(len(row) > width for row in data_rows):
+        return None
+
+    columns = []
+    for column in _columns(data_rows, width):
+        typed = convert_column(column)
+        if typed is None:
+            return None
+        if drop_empty_columns and typed[0] == 'empty':
+            continue
+        columns.append(typed)
+
+    if len(columns) < 2 or not data_rows:
+        return None
+    # Text keys: the rows are objects, iterrows() keeps every value as is
+    if columns[0][0] != 'object':
+        return None
+    return list(zip(columns[0][1], columns[1][1]))
+
+
+# --- 4. SECTION INDEX INTEGRATION ---
+
+def parse_section(section_index, section):
+    """
+    Parses one headerless section of a section index (Section_Index.build_section_index),
+    the way the FM reports are read. The layout is decided from the first row:
+        ('summary', [(label, value), ...]) for a 2-column section, parsed with the csv module
+        ('table', [row dict, ...])          for a wider table, parsed once by pandas (first row = header)
+        ('empty', None)                     for a section without rows
+    Empty or malformed sections raise like pd.read_csv.
+    """
+    first_line = Section_Index.first_line_text(section_index, section)
+    if first_line is not None:
+        if len(next(csv.reader([first_line]))) != 2:
+            return 'table', _read_table(section_index, section)
+        layout = parse_summary_section(Section_Index.section_text(section_index, section))
+        if layout is not None:
+            return layout
+
+    # Whatever the csv module does not reproduce: pandas decides, as before
+    import pandas as pd
+    df_check = pd.read_csv(Section_Index.open_section(section_index, section), header=None)
+    if df_check.empty:
+        return 'empty', None
+    if df_check.shape[1] == 2:
+        return 'summary', [(str(row[0]).strip(), row[1]) for _, row in df_check.iterrows()]
+    return 'table', _read_table(section_index, section)
+
+
+def _read_table(section_index, section):
+    """Reads a table section with pandas (first row = header) as a list of row dictionaries."""
+    import pandas as pd
+    return pd.read_csv(Section_Index.open_section(section_index, section)).to_dict(orient='records')
@@ -0,0 +1,319 @@
+import argparse
+import os
+import csv
+import sqlite3
+import hashlib
+from array import array
+from collections import Counter
+import File_Type_Detector
+import Section_Index
+import Section_Parser
+import Parse_Cache
+import Dir_Inventory
+import Output_Writer
+
+# --- 1. SETTINGS ---
+# Sample fingerprints of the [Data] section of the sample sheets (BeadStudio, Illumina), to find
+# the merged sheets stored next to their parts (..._PT01-08.csv next to PT01-04, PT05-08 and the
+# single plates) and the exact copies of a sheet.
+# A row is identified by its sample: Sample_ID (or Sample_Name), Sentrix barcode (SentrixBarcode_A /
+# Sentrix_ID) and position (SentrixPosition_A / Sentrix_Position), and for sequencing sheets its lane
+# and index sequences (a sheet re-issued with corrected indexes is not a copy). A merged sheet that
+# leaves an annotation column (Sample_Group, Sample_Plate, ...) empty still matches its parts.
+# Rows without any of these columns are identified by all their (column, value) pairs.
+# A fingerprint is the sorted array('Q') of the distinct 64-bit sample hashes of a sheet, kept with
+# the hashes of its full rows (column order, padding and blank cells do not matter), which tell
+# exact copies from sheets holding the same samples with other annotations.
+# Fingerprints are kept in <cache dir>/sheet_fingerprints.sqlite and recomputed only when a file's
+# size or mtime changes.
+#
+# Relations (sheets taken from the smallest to the largest, walk order breaking ties):
+#   duplicate    --> same samples and same rows as a sheet seen before                (redundant)
+#   same_samples --> same samples, other row contents (e.g. a re-issue with a corrected Sample_Group);
+#                    kept, unless --link-same-samples treats it as a duplicate
+#   superset     --> every sample is in smaller sheets that are kept (a merge of its parts)  (redundant)
+#   contains     --> holds every sample of smaller kept sheets, plus samples of its own
+#   overlaps     --> shares samples with kept sheets, without containing them
+# The redundant sheets are not extracted with --link-redundant-sheets: their JSON record only links
+# to the sheets holding their samples, so every sample appears once in the histories.
+
+FINGERPRINT_DB_NAME = 'sheet_fingerprints.sqlite'
+RELATIONS_CSV_NAME = 'sheet_relations.csv'
+SHEET_MODULES = ('Extractor_BeadStudio', 'Extractor_IlluminaSampleSheet')
+REDUNDANT_RELATIONS = ('duplicate', 'superset')
+# Bump whenever the hashes computed for a sheet change (invalidates the stored fingerprints)
+FINGERPRINT_VERSION = 2
+# Columns identifying the sample of a row; the first column present in each group is used
+SAMPLE_COLUMNS = (('Sample_ID', 'Sample_Name'), ('SentrixBarcode_A', 'Sentrix_ID'), ('SentrixPosition_A', 'Sentrix_Position'),
+                  ('Lane',), ('index',), ('index2',))
+
+_settings = {'link_same_samples': False}
+
+_connection = {'pid': None, 'db': None, 'path': None}
+
+
+def configure(link_same_samples=False):
+    """link_same_samples=True: a sheet with the same samples as another is a duplicate even if its rows differ."""
+    _settings['link_same_samples'] = link_same_samples
+
+
+def add_fingerprint_arguments(parser):
+    """Adds the --link-redundant-sheets / --link-same-samples options to an argparse parser."""
+    parser.add_argument("--link-redundant-sheets", action="store_true",
+                        help="Do not extract sample sheets whose samples duplicate other sheets or merge them; "
+                             f"write a link record instead (relations listed in {RELATIONS_CSV_NAME})")
+    parser.add_argument("--link-same-samples", action="store_true",
+                        help="Also link a sheet as a duplicate when it has the same samples as another but other row contents")
+
+
+def configure_from_args(args):
+    """Applies the options added by add_fingerprint_arguments()."""
+    configure(link_same_samples=args.link_same_samples)
+
+
+# --- 2. FINGERPRINTS ---
+
+def _hash(parts):
+    """64-bit hash of a list of strings."""
+    return int.from_bytes(hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def row_hash(columns, fields):
+    """64-bit hash of one data row, from its non-empty (column, value) pairs; None for an empty row."""
+    pairs = sorted(f"{column}={value.strip()}" for column, value in zip(columns, fields) if value.strip())
+    return _hash(pairs) if pairs else None
+
+
+def sample_positions(columns):
+    """Positions of the sample columns (see SAMPLE_COLUMNS) in a header row, None for a missing group."""
+    positions = []
+    for group in SAMPLE_COLUMNS:
+        present = [columns.index(column) for column in group if column in columns]
+        positions.append(present[0] if present else None)
+    return positions
+
+
+def sample_hash(positions, columns, fields):
+    """
+    64-bit hash of the sample of one data row (sample ID / name, Sentrix barcode and position, lane
+    and indexes, case-insensitive); the row_hash() when the sheet has no sample column. None for an empty row.
+    """
+    if all(position is None for position in positions):
+        return row_hash(columns, fields)
+    values = [fields[position].strip().lower() if position is not None and position < len(fields) else ''
+              for position in positions]
+    return _hash(values) if any(values) else None
+
+
+def fingerprint_section(text):
+    """
+    Returns the sorted distinct sample hashes and the sorted distinct full row hashes (two array('Q'))
+    of a [Data] section body (header row first).
+    """
+    rows = Section_Parser.read_rows(text)
+    if len(rows) < 2:
+        return array('Q'), array('Q')
+    columns = [column.strip() for column in rows[0]]
+    positions = sample_positions(columns)
+    samples = {sample_hash(positions, columns, fields) for fields in rows[1:]}
+    full_rows = {row_hash(columns, fields) for fields in rows[1:]}
+    samples.discard(None)
+    full_rows.discard(None)
+    return array('Q', sorted(samples)), array('Q', sorted(full_rows))
+
+
+def _get_db():
+    """Opens (once per process, next to the parse cache) the fingerprint database."""
+    path = os.path.join(Parse_Cache.get_settings()[2], FINGERPRINT_DB_NAME)
+    if _connection['db'] is not None and _connection['pid'] == os.getpid() and _connection['path'] == path:
+        return _connection['db']
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS sheet_fingerprints (
+                      path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, version INTEGER, module_name TEXT,
+                      sample_hashes BLOB, row_hashes BLOB)""")
+    db.commit()
+    _connection.update(pid=os.getpid(), db=db, path=path)
+    return db
+
+
+def get_fingerprint(file_path):
+    """
+    Returns (module_name, sample hashes, row hashes) of a CSV file: the hashes of its [Data] rows for
+    a sample sheet, None for any other file type. Served from the fingerprint database when the file is unchanged.
+    """
+    db = _get_db()
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    row = db.execute("SELECT size, mtime_ns, version, module_name, sample_hashes, row_hashes FROM sheet_fingerprints "
+                     "WHERE path = ?", (path,)).fetchone()
+    if row and row[:3] == (stat.st_size, stat.st_mtime_ns, FINGERPRINT_VERSION):
+        if row[4] is None:
+            return row[3], None, None
+        return row[3], array('Q', row[4]), array('Q', row[5])
+
+    verdict = File_Type_Detector.detect_file_type(path)
+    module_name = verdict['module_name'] if verdict else None
+    samples = full_rows = None
+    if module_name in SHEET_MODULES:
+        section_index = Section_Index.build_section_index(path)
+        text = Section_Index.get_section_text(section_index, '[Data]')
+        samples, full_rows = fingerprint_section(text) if text is not None else (array('Q'), array('Q'))
+
+    db.execute("INSERT OR REPLACE INTO sheet_fingerprints VALUES (?, ?, ?, ?, ?, ?, ?)",
+               (path, stat.st_size, stat.st_mtime_ns, FINGERPRINT_VERSION, module_name,
+                samples.tobytes() if samples is not None else None, full_rows.tobytes() if full_rows is not None else None))
+    return module_name, samples, full_rows
+
+
+def fingerprint_paths(paths):
+    """
+    Returns {path: (sample hashes, row hashes)} of the sample sheets among paths (in their order);
+    unreadable files are left out.
+    """
+    fingerprints = {}
+    try:
+        for path in paths:
+            try:
+                module_name, samples, full_rows = get_fingerprint(path)
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️  Cannot fingerprint {path}: {e}")
+                continue
+            if samples is not None and len(samples):
+                fingerprints[path] = (samples, full_rows)
+    finally:
+        _get_db().commit()
+    return fingerprints
+
+
+# --- 3. RELATIONS ---
+
+def find_relations(fingerprints, link_same_samples=None):
+    """
+    Relates the sheets of {path: (sample hashes, row hashes)} (in walk order). Returns one dictionary
+    per related sheet, in walk order: {'file_path', 'relation', 'related' [paths, walk order], 'rows',
+    'shared_rows', 'identical_rows'} (rows count samples; identical_rows: same full rows, for duplicates).
+    link_same_samples defaults to the configured setting.
+    """
+    if link_same_samples is None:
+        link_same_samples = _settings['link_same_samples']
+    walk_index = {path: i for i, path in enumerate(fingerprints)}
+    sizes = {path: len(samples) for path, (samples, _) in fingerprints.items()}
+    owners = {}  # sample hash --> kept sheets holding it
+    relations = []
+
+    for path in sorted(fingerprints, key=lambda p: (sizes[p], walk_index[p])):
+        hashes = fingerprints[path][0].tolist()
+        shared = Counter(owner for h in hashes for owner in owners.get(h, ()))
+
+        duplicates = [other for other, count in shared.items() if count == sizes[path] == sizes[other]]
+        if duplicates:
+            original = min(duplicates, key=walk_index.get)
+            identical = fingerprints[path][1] == fingerprints[original][1]
+            relation = 'duplicate' if identical or link_same_samples else 'same_samples'
+            relations.append({'file_path': path, 'relation': relation, 'related': [original],
+                              'rows': sizes[path], 'shared_rows': sizes[path], 'identical_rows': identical})
+            if relation == 'duplicate':
+                continue
+        else:
+            subsets = sorted((other for other, count in shared.items() if count == sizes[other]), key=walk_index.get)
+            if subsets:
+                subset_set = set(subsets)
+                covered = sum(1 for h in hashes if not subset_set.isdisjoint(owners.get(h, ())))
+                relation = 'superset' if covered == sizes[path] else 'contains'
+                relations.append({'file_path': path, 'relation': relation, 'related': subsets,
+                                  'rows': sizes[path], 'shared_rows': covered, 'identical_rows': None})
+                if relation == 'superset':
+                    continue
+            elif shared:
+                relations.append({'file_path': path, 'relation': 'overlaps', 'related': sorted(shared, key=walk_index.get),
+                                  'rows': sizes[path], 'shared_rows': sum(1 for h in hashes if h in owners),
+                                  'identical_rows': None})
+
+        # Kept: later (larger) sheets are compared with it
+        for h in hashes:
+            owners.setdefault(h, []).append(path)
+
+    relations.sort(key=lambda relation: walk_index[relation['file_path']])
+    return relations
+
+
+def write_relations_csv(relations, output_dir):
+    """Writes the relations to <output_dir>/sheet_relations.csv. Returns its path."""
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path = os.path.join(output_dir, RELATIONS_CSV_NAME)
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['File path', 'Relation', 'Rows', 'Shared rows', 'Identical rows', 'Related files'])
+        for relation in relations:
+            identical = relation['identical_rows']
+            writer.writerow([relation['file_path'], relation['relation'], relation['rows'], relation['shared_rows'],
+                             '' if identical is None else identical, ';'.join(relation['related'])])
+    return csv_path
+
+
+def write_link_record(relation, output_dir):
+    """
+    Writes the JSON record of a redundant sheet: no samples, only the sheets holding them.
+    Returns the path of the JSON file.
+    """
+    file_name = os.path.basename(relation['file_path'])
+    record = {
+        'file_name': file_name,
+        'file_path': relation['file_path'],
+        'redundant_sheet': {
+            'relation': relation['relation'],
+            'rows': relation['rows'],
+            'identical_rows': relation['identical_rows'],
+            'related_files': relation['related'],
+            'related_json_files': [Output_Writer.json_file_name(os.path.basename(path)) for path in relation['related']]
+        }
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    return Output_Writer.write_record(record, output_dir, file_name)
+
+
+def link_redundant_sheets(paths, output_dir):
+    """
+    Fingerprints the sample sheets among paths, writes sheet_relations.csv and a link record for
+    every redundant sheet (duplicate or superset). Returns the set of redundant paths, not to be extracted.
+    """
+    relations = find_relations(fingerprint_paths(paths))
+    write_relations_csv(relations, output_dir)
+
+    redundant = set()
+    for relation in relations:
+        if relation['relation'] not in REDUNDANT_RELATIONS:
+            continue
+        write_link_record(relation, output_dir)
+        redundant.add(relation['file_path'])
+        related_names = ', '.join(os.path.basename(path) for path in relation['related'])
+        print(f"🔗 {os.path.basename(relation['file_path'])}: {relation['relation']} of {related_names} (not extracted)")
+    return redundant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List duplicate and merged sample sheets (same [Data] samples) under a directory")
+    parser.add_argument("input_dir", help="Root directory to search recursively")
+    parser.add_argument("output_dir", help=f"Where to save {RELATIONS_CSV_NAME}")
+    Parse_Cache.add_cache_arguments(parser)
+    Dir_Inventory.add_inventory_arguments(parser)
+    parser.add_argument("--link-same-samples", action="store_true",
+                        help="Also report a sheet as a duplicate when it has the same samples as another but other row contents")
+    args = parser.parse_args()
+    configure(link_same_samples=args.link_same_samples)
+    Parse_Cache.configure_from_args(args)
+    Dir_Inventory.configure_from_args(args)
+
+    relations = find_relations(fingerprint_paths(Dir_Inventory.iter_csv_paths(args.input_dir)))
+    for relation in relations:
+        related_names = ', '.join(os.path.basename(path) for path in relation['related'])
+        print(f"{os.path.basename(relation['file_path'])}: {relation['relation']} of {related_names} "
+              f"({relation['shared_rows']}/{relation['rows']} samples)")
+    print(f"Saved {len(relations)} relation(s) to: {write_relations_csv(relations, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
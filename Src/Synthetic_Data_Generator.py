@@ -0,0 +1,371 @@
+import argparse
+import os
+import json
+import random
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# --- 1. SETTINGS ---
+# Synthesises the five CSV types read by the extractors, laid out like the LTS tree
+# (orfeo/LTS/LAGE/illumina_run/AREA/...), so the batch entry points and the ORID crawler
+# can be benchmarked at any scale. The same seed always produces the same files.
+# A manifest.json at the root lists the generated files per extractor module.
+
+INSTRUMENT = 'A00618'
+MANIFEST_FILE_NAME = 'manifest.json'
+
+THERMAL_SENSOR_COLUMNS = [
+    'FlowCell{fc}BottomBackTemperature[C]', 'FlowCell{fc}BottomMidTemperature[C]', 'FlowCell{fc}BottomFrontTemperature[C]',
+    'FlowCell{fc}TargetTemperature[C]', 'ImagingCameraCcd1Temperature[C]', 'ImagingCameraCcd2Temperature[C]',
+    'ImagingCameraPcbTemperature[C]', 'FtmCameraTemperature[C]', 'FtmLaserTemperature[C]', 'FtmChassisTemperature[C]',
+    'LGMChassisTemperature[C]', 'LGMGreenLaserHeadTemperature[C]', 'LGMGreenLaserPsuTemperature[C]',
+    'LGMRedLaserHeadTemperature[C]', 'LGMRedLaserPsuTemperature[C]', 'OpticalImmersedCompressorOutletTemperature[C]',
+    'OpticalImmersedReservoirTemperature[C]', 'OpticalLoopPumpCurrent[mA]', 'OpticalLoopCompressorCurrent[Amps]',
+    'OpticalCompressorFanAirInTemperature[C]', 'OpticalLoopCompressorFanSpeed[rpm]', 'OpticsAirLeftInletFanSpeed[rpm]',
+    'OpticsAirRightInletFanSpeed[rpm]', 'FlowCell{fc}ReagentChillerChamberFrontTemperature[C]',
+    'FlowCell{fc}ReagentChillerChamberRearTemperature[C]', 'FlowCell{fc}ReagentChillerTecColdSideTemperature[C]',
+    'EboxEnclosureFanAirInTemperature[C]', 'EboxEnclosureInletFanSpeed[rpm]', 'FluidicsEnclosureFanAirInTemperature[C]',
+    'FluidicsEnclosureInletFanSpeed[rpm]', 'FCHLoopPumpCurrent[mA]', 'FCHLoopFan1Speed[rpm]', 'FCHLoopFan2Speed[rpm]',
+    'FCHLoopFan3Speed[rpm]', 'FCHImmersedReservoirTemperature[C]', 'FCHRadiatorFanInTemperature[C]',
+    'RCALoopPumpCurrent[mA]', 'RCALoopFan1Speed[rpm]', 'RCALoopFan2Speed[rpm]', 'RCALoopFan3Speed[rpm]',
+    'FlowCellARcaCoolantLoopImmersedInletTemperature[C]', 'FlowCellBRcaCoolantLoopImmersedInletTemperature[C]',
+    'FlowCellARcaCoolantLoopImmersedOutletTemperature[C]', 'FlowCellBRcaCoolantLoopImmersedOutletTemperature[C]',
+    'RCAImmersedReservoirTemperature[C]', 'RCARadiatorFanInTemperature[C]', 'LeftSmaFanSpeed[rpm]', 'RightSmaFanSpeed[rpm]'
+]
+
+FOCUS_INPUT_COLUMNS = [
+    'Z Position [um]', 'Valid', 'Spot Separation', 'Brenner Score', 'Within Peak', 'Left Spot Centroid',
+    'Left Spot Peak Intensity', 'Left Spot Pct Saturation', 'Right Spot Centroid', 'Right Spot Peak Intensity',
+    'Right Spot Pct Saturation'
+]
+
+STACK_COLUMNS = [
+    'Z Position[um]', 'Valid', 'Spot Separation[px]', 'Left Centroid[px]', 'Right Centroid[px]', 'Left Avg Intensity',
+    'Right Avg Intensity', 'Left Saturation[pct]', 'Right Saturation[pct]', 'Calculated Position[um]'
+]
+
+
+def _random_date(rng):
+    """Returns a random (year, month, day) between 2021 and 2025."""
+    return rng.randint(2021, 2025), rng.randint(1, 12), rng.randint(1, 28)
+
+
+def _random_index(rng, length=10):
+    return ''.join(rng.choice('ACGT') for _ in range(length))
+
+
+# --- 2. FILE WRITERS ---
+
+def write_beadstudio_sheet(file_path, orid, date, n_samples, rng):
+    """Writes a BeadStudio Sample Sheet with n_samples rows (8 positions per Sentrix chip)."""
+    year, month, day = date
+    project = f"{orid}-Synth-{rng.randint(1, 99):02d}"
+    lines = [
+        "[Header],,,,,,",
+        "INVESTIGATOR NAME,BeadStudio User,,,,,",
+        f"PROJECT NAME,{project},,,,,",
+        f"EXPERIMENT NAME,{project},,,,,",
+        f"DATE,{year}{month:02d}{day:02d},,,,,",
+        "[Manifests],,,,,,",
+        "A,MethylationEPIC_v-1-0_B4,,,,,",
+        "[Data],,,,,,",
+        "Sample_Name,Sample_Plate,Sample_Well,Sample_Group,Pool_ID,Sentrix_ID,Sentrix_Position"
+    ]
+    barcode = rng.randint(200000000000, 209999999999)
+    for i in range(n_samples):
+        if i and i % 8 == 0:
+            barcode += rng.randint(1, 9)
+        lines.append(f"S{i:05d}{rng.choice('ABCD')},,,{barcode},0,{barcode},R{i % 8 + 1:02d}C01")
+
+    with open(file_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_illumina_samplesheet(file_path, orid, date, n_samples, rng):
+    """Writes an Illumina (IEM v5) Sample Sheet with n_samples rows in its [Data] section."""
+    year, month, day = date
+    lines = [
+        "[Header],,,,,,,,,,",
+        "IEMFileVersion,5,,,,,,,,,",
+        f"Experiment Name,{year}{month:02d}{day:02d}_{orid}-WG-Pool{rng.randint(1, 20):02d},,,,,,,,,",
+        f"Date,{year}{month:02d}{day:02d},,,,,,,,,",
+        "Workflow,GenerateFASTQ,,,,,,,,,",
+        "Application,FASTQ Only,,,,,,,,,",
+        "Instrument Type,NovaSeq,,,,,,,,,",
+        "Assay,Custom,,,,,,,,,",
+        "Index Adapters,Custom,,,,,,,,,",
+        "Chemistry,Amplicon,,,,,,,,,",
+        "[Reads],,,,,,,,,,",
+        "151,,,,,,,,,,",
+        "151,,,,,,,,,,",
+        "[Settings],,,,,,,,,,",
+        "ReverseComplement,0,,,,,,,,,",
+        "Adapter,AGATCGGAAGAGCACACGTCTGAACTCCAGTCA+CTGTCTCTTATACACATCT,,,,,,,,,",
+        "AdapterRead2,AGATCGGAAGAGCGTCGTGTAGGGAAAGAGTGT+CTGTCTCTTATACACATCT,,,,,,,,,",
+        "[Data],,,,,,,,,,",
+        "Sample_ID,Sample_Name,Sample_Plate,Sample_Well,Index_Plate_Well,I7_Index_ID,index,I5_Index_ID,index2,Sample_Project,Description"
+    ]
+    for i in range(n_samples):
+        plate, well = divmod(i, 96)
+        well_name = f"{'ABCDEFGH'[well % 8]}{well // 8 + 1:02d}"
+        sample = f"{plate + 1}-{well_name}"
+        lines.append(f"{sample},{sample},,,,96-UDI-A-{well_name},{_random_index(rng)},96-UDI-A-{well_name},"
+                     f"{_random_index(rng)},{orid},")
+
+    with open(file_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_thermal_report(file_path, side, start, n_rows, seed):
+    """Writes a Thermal Report of n_rows one-minute samples (Time, Current Cycle and 54 sensor columns)."""
+    fc = side[-1]
+    columns = ['Time', 'Current Cycle']
+    columns += [f"FCH.Thermal.{side}.Zone{z}.TopRTDRawTemperature[C]" for z in (1, 2, 3)]
+    columns += [f"FCH.Thermal.{side}.Zone{z}.TopRTDCalibratedTemperature[C]" for z in (1, 2, 3)]
+    columns += [c.format(fc=fc) for c in THERMAL_SENSOR_COLUMNS]
+
+    np_rng = np.random.default_rng(seed)
+    n_sensors = len(columns) - 2
+    baseline = np_rng.uniform(20, 40, n_sensors)
+    values = baseline + np.cumsum(np_rng.normal(0, 0.05, (n_rows, n_sensors)), axis=0)
+
+    df = pd.DataFrame(values, columns=columns[2:])
+    df.insert(0, 'Current Cycle', np.arange(n_rows) // 60)
+    df.insert(0, 'Time', pd.date_range(start, periods=n_rows, freq='min').strftime('%Y-%m-%d_%H-%M-%S'))
+
+    with open(file_path, 'w') as f:
+        f.write(f"{side}\n\n")
+        df.to_csv(f, index=False, float_format='%.3f')
+
+
+def _focus_model_lines(rng):
+    return [
+        f"Best Focus Separation,{rng.uniform(790, 810):.3f}",
+        f"Slope,{rng.uniform(-0.06, -0.05):.3f}",
+        f"Offset,{rng.uniform(400, 430):.3f}",
+        f"Best Z Position [um],{rng.uniform(360, 380):.3f}",
+        f"Best Focus Spot Intensity,{rng.randint(60, 120)}"
+    ]
+
+
+def write_fm_generation_report(file_path, timestamp, n_points, rng):
+    """Writes an FM-Generation Report with n_points rows in each FocusModel Input section."""
+    lines = [
+        f"Instrument Name,{INSTRUMENT}",
+        f"Date,{timestamp}",
+        "Surface,Bottom",
+        "FTM LaserMode,CW",
+        "FTM Laser Operating Power (mW),0.500",
+        "FTM Laser Pulse Duration (us),NA",
+        "FTM Exposure Time (us),250.000",
+        "FTM Laser Energy (mJ),0.000",
+        "Green Laser Power (mW),600",
+        "Red Laser Power (mW),500",
+        "Imaging Mode,TDI",
+        "TDI Exposure (ms),NA",
+        "Scan Velocity (mm/s),12.000",
+        ""
+    ]
+    for channel in ('Green', 'Red'):
+        lines.append(f"[FocusModel Input {channel}]")
+        lines.append(",".join(FOCUS_INPUT_COLUMNS))
+        z = 362.0
+        for i in range(n_points):
+            z += rng.uniform(0.15, 0.25)
+            left = 533.0 + i * 1.7
+            lines.append(f"{z:.3f}, True, {902.0 - i * 3.4:.3f}, {rng.uniform(4, 15):.3f},FALSE,{left},"
+                         f"{rng.randint(40, 80)},0,{1436.0 - i * 1.5},{rng.randint(80, 130)},0")
+        lines.append("")
+        lines.append(f"[FocusModel {channel}]")
+        lines.extend(_focus_model_lines(rng))
+        lines.append("")
+    lines.append("[FocusModel Overall]")
+    lines.extend(_focus_model_lines(rng))
+    lines.append("")
+    lines.append(f"Chromatism [um],{rng.uniform(0, 0.1)}")
+
+    with open(file_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_fm_autotilt_report(file_path, n_points, rng):
+    """Writes an FM-AutoTilt Report: four through-focus stacks of n_points rows, then the tilt sections."""
+    positions = [(197.25, 78.0), (206.25, 78.0), (206.25, 158.0), (197.25, 158.0)]
+    lines = []
+    for x, y in positions:
+        where = f"at X = {x:.3f}mm Y = {y:.3f}mm using settings for Wet Flow Cell"
+        lines.append(f"[FTM Through-Focus Stack {where}]")
+        lines.append(",".join(STACK_COLUMNS))
+        for i in range(n_points):
+            z = 800.0 - i * 5.0
+            if i < n_points // 6:
+                lines.append(f"{z:.1f}, True, {rng.uniform(900, 1800):.3f}, {rng.uniform(50, 500):.1f}, "
+                             f"{rng.uniform(1400, 1950):.1f}, {rng.randint(40, 255)}, {rng.randint(0, 200)}, 0, 0, "
+                             f"{z + rng.uniform(-20, 10):.1f}")
+            else:
+                lines.append(f"{z:.1f}, False, 0.000, 1048576.0, 1048576.0, 0, 0, 1048575, 1048575, 0.0")
+        lines.append("")
+        lines.append(f"[Results {where}]")
+        lines.append("Focus Model best Z,Slope [um],Surface S1 [um],Surface S2 [um],Surface S3 [um],Search Top [um],Search Bottom [um]")
+        lines.append(f"{rng.uniform(1400, 1430)},-0.058,{rng.uniform(570, 580):.3f},{rng.uniform(390, 400):.3f},"
+                     f"{rng.uniform(320, 325):.3f},800.0,200.0")
+        lines.append("")
+
+    lines.append("[Surface Positions]")
+    lines.append("X [mm],Y [mm],Z [um]")
+    lines.extend(f"{x:.3f}, {y:.3f},{rng.uniform(390, 400):.3f}" for x, y in positions)
+    lines.append("")
+    for section in ('Level Tilt Positions', 'Add X Offset To Tilt Motors To Match Camera Plane'):
+        lines.append(f"[{section}]")
+        lines.append("Tilt Motor,Start Tilt [mm],Delta Move [mm],End Tilt [mm]")
+        for motor in (1, 2, 3):
+            start = rng.uniform(5.2, 5.6)
+            delta = rng.uniform(-0.06, 0.06)
+            lines.append(f"{motor},{start:.3f}, {delta:.3f},{start + delta:.3f}")
+        lines.append("")
+    lines.append("[Verify Step Surface Positions]")
+    lines.append("X [mm],Y [um],Z [um]")
+    lines.extend(f"{x:.3f},{y:.3f},{rng.uniform(398, 402):.3f}" for x, y in positions)
+    lines.append("")
+    lines.append("[Results]")
+    lines.append(f"Residual Tilt [um per mm],{rng.uniform(0, 1):.3f}")
+    lines.append("Allowed Tilt[um per mm],1.500")
+    lines.append("Result,PASS")
+
+    with open(file_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# --- 3. DATASET LAYOUT ---
+
+def generate_dataset(output_dir, beadstudio=20, illumina=10, thermal=4, fm_generation=4, fm_autotilt=4,
+                     samples_per_sheet=96, thermal_rows=2400, focus_points=74, stack_points=122,
+                     orids=5, filler_files=0, seed=0):
+    """
+    Writes a synthetic LTS tree under output_dir and returns its manifest:
+        {'seed', 'orids', 'files': {module_name: [relative paths]}, 'total_bytes'}
+
+    - BeadStudio sheets go to illumina_run/AREA/iScan/<date>_<ORID>_SYNTH_EPIC/CSVs/
+    - Illumina sheets and the NovaSeq reports (Thermal, FM-Generation, FM-AutoTilt) go to
+      illumina_run/AREA/NovaSeq6000/<year>/<run folder>/
+    filler_files adds that many non-CSV files (e.g. .idat placeholders) per directory,
+    to benchmark the crawlers on realistic directory sizes.
+    """
+    rng = random.Random(seed)
+    orid_names = [f"ORID{rng.randint(1, 9999):04d}" for _ in range(orids)]
+    area = os.path.join(output_dir, 'orfeo', 'LTS', 'LAGE', 'illumina_run', 'AREA')
+    files = {
+        'Extractor_BeadStudio': [],
+        'Extractor_IlluminaSampleSheet': [],
+        'Extractor_Thermal_Report': [],
+        'Extractor_FMGeneration': [],
+        'Extractor_FMAutoTilt': []
+    }
+    directories = set()
+
+    def new_path(module_name, directory, file_name):
+        os.makedirs(directory, exist_ok=True)
+        directories.add(directory)
+        path = os.path.join(directory, file_name)
+        files[module_name].append(os.path.relpath(path, output_dir))
+        return path
+
+    for i in range(beadstudio):
+        orid = orid_names[i % orids]
+        year, month, day = date = _random_date(rng)
+        project_dir = os.path.join(area, 'iScan', f"{year}{month:02d}{day:02d}_{orid}_SYNTH_EPIC", 'CSVs')
+        path = new_path('Extractor_BeadStudio', project_dir, f"{year}{month:02d}{day:02d}_{orid}_Synth_EPIC_PT{i:05d}.csv")
+        write_beadstudio_sheet(path, orid, date, samples_per_sheet, rng)
+
+    # One NovaSeq run folder per Illumina sheet (at least one, to host the instrument reports)
+    run_dirs = []
+    for i in range(max(illumina, 1)):
+        year, month, day = _random_date(rng)
+        run_dirs.append((os.path.join(area, 'NovaSeq6000', str(year),
+                                      f"{year % 100:02d}{month:02d}{day:02d}_{INSTRUMENT}_{i:04d}_AH{rng.randint(10000, 99999)}DSX{rng.randint(1, 9)}"),
+                         (year, month, day)))
+
+    for i in range(illumina):
+        orid = orid_names[i % orids]
+        run_dir, (year, month, day) = run_dirs[i]
+        path = new_path('Extractor_IlluminaSampleSheet', run_dir, f"{year}{month:02d}{day:02d}_{orid}_Pool{i:05d}.csv")
+        write_illumina_samplesheet(path, orid, (year, month, day), samples_per_sheet, rng)
+
+    def run_timestamp(i):
+        """Start time of the i-th instrument report, on the day of its run folder."""
+        run_dir, (year, month, day) = run_dirs[i % len(run_dirs)]
+        start = datetime(year, month, day, rng.randint(0, 23), rng.randint(0, 59), i % 60)
+        return run_dir, start
+
+    for i in range(thermal):
+        run_dir, start = run_timestamp(i)
+        side = 'SideA' if i % 2 == 0 else 'SideB'
+        path = new_path('Extractor_Thermal_Report', run_dir, f"{INSTRUMENT}_{side}_{start:%Y-%m-%d_%H-%M-%S}_ThermalReport.csv")
+        write_thermal_report(path, side, start, thermal_rows, seed + i)
+
+    for i in range(fm_generation):
+        run_dir, start = run_timestamp(i)
+        timestamp = f"{start:%Y-%m-%d_%H-%M-%S}"
+        path = new_path('Extractor_FMGeneration', run_dir, f"{INSTRUMENT}_{timestamp}_FM-GenerationReport.csv")
+        write_fm_generation_report(path, timestamp, focus_points, rng)
+
+    for i in range(fm_autotilt):
+        run_dir, start = run_timestamp(i)
+        path = new_path('Extractor_FMAutoTilt', run_dir, f"{INSTRUMENT}_{start:%Y-%m-%d_%H-%M-%S}_FM-AutoTilt_Report.csv")
+        write_fm_autotilt_report(path, stack_points, rng)
+
+    for directory in sorted(directories):
+        for j in range(filler_files):
+            with open(os.path.join(directory, f"filler_{j:05d}_Grn.idat"), 'wb') as f:
+                f.write(b'IDAT')
+
+    manifest = {
+        'seed': seed,
+        'orids': orid_names,
+        'files': files,
+        'total_bytes': sum(os.path.getsize(os.path.join(output_dir, p)) for paths in files.values() for p in paths)
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(dataset_dir):
+    """Reads the manifest written by generate_dataset()."""
+    with open(os.path.join(dataset_dir, MANIFEST_FILE_NAME), 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic LTS tree of BeadStudio, Illumina, Thermal, FM-Generation and FM-AutoTilt CSVs")
+    parser.add_argument("output_dir", help="Root directory of the generated tree")
+    parser.add_argument("--beadstudio", type=int, default=20, help="Number of BeadStudio Sample Sheets")
+    parser.add_argument("--illumina", type=int, default=10, help="Number of Illumina Sample Sheets")
+    parser.add_argument("--thermal", type=int, default=4, help="Number of Thermal Reports")
+    parser.add_argument("--fm-generation", type=int, default=4, help="Number of FM-Generation Reports")
+    parser.add_argument("--fm-autotilt", type=int, default=4, help="Number of FM-AutoTilt Reports")
+    parser.add_argument("--samples-per-sheet", type=int, default=96, help="Sample rows per sample sheet (e.g. 10000)")
+    parser.add_argument("--thermal-rows", type=int, default=2400, help="Data rows per Thermal Report (e.g. 100000)")
+    parser.add_argument("--focus-points", type=int, default=74, help="Rows per FocusModel Input section")
+    parser.add_argument("--stack-points", type=int, default=122, help="Rows per FM-AutoTilt through-focus stack")
+    parser.add_argument("--orids", type=int, default=5, help="Number of distinct ORIDs")
+    parser.add_argument("--filler-files", type=int, default=0, help="Non-CSV files added to every directory")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    args = parser.parse_args()
+    manifest = generate_dataset(args.output_dir, beadstudio=args.beadstudio, illumina=args.illumina,
+                                thermal=args.thermal, fm_generation=args.fm_generation, fm_autotilt=args.fm_autotilt,
+                                samples_per_sheet=args.samples_per_sheet, thermal_rows=args.thermal_rows,
+                                focus_points=args.focus_points, stack_points=args.stack_points,
+                                orids=args.orids, filler_files=args.filler_files, seed=args.seed)
+
+    total_files = sum(len(paths) for paths in manifest['files'].values())
+    print(f"Generated {total_files} CSV files ({manifest['total_bytes'] / 1e6:.1f} MB) in {args.output_dir}")
+    for module_name, paths in manifest['files'].items():
+        print(f"   {module_name}: {len(paths)}")
+    print(f"   ORIDs: {', '.join(manifest['orids'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+# --- 1. SETTINGS ---
+# Append-only store of the full time series of every Thermal Report, for drift investigations that
+# span hundreds of reports without reopening the source CSVs:
+#   <store>/instrument=<id>/side=<side>/month=<YYYY-MM>/<report name>.parquet
+# Every report is ingested once, streamed in chunks, into one Parquet part per month it covers
+# (Time as a timestamp column, every sensor column as float64); parts are written to a temporary
+# name and renamed. <store>/history_manifest.sqlite records the ingested reports (keyed by file
+# name, the report names hold their start time, with the size and mtime of the ingested file), so
+# a report seen again unchanged (re-extraction, parse cache hit, same file in two folders) is not
+# ingested twice. A report that changed since (extracted while the instrument was still writing it)
+# or a larger copy of it found elsewhere is ingested again: its parts are replaced.
+# A range query only opens the parts of the requested instrument / side / months and reads only the
+# requested columns, with the time filter pushed down to the Parquet row groups.
+# Enabled with --thermal-history STORE_DIR (ingestion happens when the Thermal Report outputs are saved).
+
+MANIFEST_FILE_NAME = 'history_manifest.sqlite'
+TIME_COLUMN = 'Time'
+TIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
+INGEST_CHUNK_ROWS = 10000
+
+_settings = {'store_dir': None}
+
+_connection = {'pid': None, 'db': None, 'path': None}
+
+
+def configure(store_dir=None):
+    """Sets the history store directory (None disables ingestion)."""
+    _settings['store_dir'] = store_dir
+
+
+def get_settings():
+    """Returns the current settings as a tuple, to configure pool workers the same way."""
+    return (_settings['store_dir'],)
+
+
+def store_dir():
+    """The configured history store directory, or None when ingestion is disabled."""
+    return _settings['store_dir']
+
+
+def add_history_arguments(parser):
+    """Adds the --thermal-history option to an argparse parser."""
+    parser.add_argument("--thermal-history", metavar="STORE_DIR", default=None,
+                        help="Also append the full time series of every Thermal Report to this partitioned Parquet store")
+
+
+def configure_from_args(args):
+    """Applies the option added by add_history_arguments()."""
+    configure(store_dir=args.thermal_history)
+
+
+# --- 2. MANIFEST ---
+
+def _get_db(history_dir):
+    """Opens (once per process) the manifest of a history store."""
+    path = os.path.join(os.path.abspath(history_dir), MANIFEST_FILE_NAME)
+    if _connection['db'] is not None and _connection['pid'] == os.getpid() and _connection['path'] == path:
+        return _connection['db']
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=60)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""CREATE TABLE IF NOT EXISTS reports (
+                      file_name TEXT PRIMARY KEY, file_path TEXT, size INTEGER, mtime_ns INTEGER,
+                      instrument TEXT, side TEXT, first_time TEXT, last_time TEXT, rows INTEGER, parts TEXT)""")
+    db.commit()
+    _connection.update(pid=os.getpid(), db=db, path=path)
+    return db
+
+
+def ingested_report(history_dir, file_name):
+    """The manifest row of the report named file_name as a dictionary, or None if it is not in the store."""
+    cursor = _get_db(history_dir).execute("SELECT * FROM reports WHERE file_name = ?", (file_name,))
+    row = cursor.fetchone()
+    return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+
+def is_ingested(history_dir, file_name, file_path=None):
+    """
+    True if the report named file_name is in the store and up to date: same size and mtime when
+    file_path is the ingested file, not larger when it is another copy of the report.
+    Without file_path, True as soon as the report is in the store.
+    """
+    ingested = ingested_report(history_dir, file_name)
+    if ingested is None or file_path is None:
+        return ingested is not None
+    stat = os.stat(file_path)
+    if os.path.abspath(file_path) == ingested['file_path']:
+        return (stat.st_size, stat.st_mtime_ns) == (ingested['size'], ingested['mtime_ns'])
+    return stat.st_size <= ingested['size']
+
+
+def partition_dir(history_dir, instrument, side, month):
+    """Directory of one partition (month as 'YYYY-MM')."""
+    return os.path.join(history_dir, f"instrument={instrument}", f"side={side}", f"month={month}")
+
+
+# --- 3. INGESTION ---
+
+def ingest_report(file_info, history_dir=None):
+    """
+    Appends the time series of one Thermal Report extraction result (see Extractor_Thermal_Report)
+    to the store, or replaces it if the report changed since it was ingested (see is_ingested).
+    Returns the number of rows ingested, 0 if the report was already up to date.
+    """
+    history_dir = history_dir or store_dir()
+    file_name = file_info['file_name']
+    if is_ingested(history_dir, file_name, file_info['file_path']):
+        return 0
+    previous = ingested_report(history_dir, file_name)
+
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import Extractor_Thermal_Report
+
+    instrument = file_info.get('instrument_id') or 'N/A'
+    side = file_info.get('run_side') or 'N/A'
+    stem = os.path.splitext(file_name)[0]
+    stat = os.stat(file_info['file_path'])
+
+    writers = {}  # month --> (ParquetWriter, temporary path, final path)
+    schema = None
+    row_count = 0
+    first_time = last_time = None
+    try:
+        for chunk in pd.read_csv(file_info['file_path'], skiprows=2, chunksize=INGEST_CHUNK_ROWS):
+            times = pd.to_datetime(chunk.iloc[:, 0].astype(str), format=TIME_FORMAT, errors='coerce')
+            frame = Extractor_Thermal_Report.sensor_values(chunk).astype('float64')
+            frame.insert(0, TIME_COLUMN, times)
+            frame = frame[times.notna().to_numpy()]
+            if frame.empty:
+                continue
+            if schema is None:
+                schema = pa.Table.from_pandas(frame, preserve_index=False).schema.remove_metadata()
+
+            first_time = first_time if first_time is not None else frame[TIME_COLUMN].iloc[0]
+            last_time = frame[TIME_COLUMN].iloc[-1]
+            row_count += len(frame)
+
+            # A report crossing a month boundary goes to both partitions
+            months = frame[TIME_COLUMN].to_numpy().astype('datetime64[M]')
+            for month, rows in frame.groupby(months, sort=False):
+                month = str(month)[:7]
+                if month not in writers:
+                    directory = partition_dir(history_dir, instrument, side, month)
+                    os.makedirs(directory, exist_ok=True)
+                    final_path = os.path.join(directory, f"{stem}.parquet")
+                    # Unique temporary name: pool workers may ingest same-named reports at once
+                    fd, temp_path = tempfile.mkstemp(prefix=f".{stem}.", suffix='.parquet.tmp', dir=directory)
+                    os.close(fd)
+                    try:
+                        writers[month] = (pq.ParquetWriter(temp_path, schema), temp_path, final_path)
+                    except BaseException:
+                        os.remove(temp_path)
+                        raise
+                writers[month][0].write_table(pa.Table.from_pandas(rows, schema=schema, preserve_index=False))
+    except BaseException:
+        for writer, temp_path, _ in writers.values():
+            writer.close()
+            os.remove(temp_path)
+        raise
+
+    for writer, temp_path, final_path in writers.values():
+        writer.close()
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, final_path)
+
+    # A re-ingested report no longer covering a month must not leave its old part there
+    if previous:
+        for month in (previous['parts'] or '').split(';'):
+            old_path = os.path.join(partition_dir(history_dir, previous['instrument'], previous['side'], month),
+                                    f"{stem}.parquet")
+            if month and old_path not in {final_path for _, _, final_path in writers.values()}:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+
+    db = _get_db(history_dir)
+    with db:
+        db.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                   (file_name, os.path.abspath(file_info['file_path']), stat.st_size, stat.st_mtime_ns, instrument, side,
+                    first_time.strftime(TIME_FORMAT) if first_time is not None else None,
+                    last_time.strftime(TIME_FORMAT) if last_time is not None else None,
+                    row_count, ';'.join(sorted(writers))))
+    return row_count
+
+
+# --- 4. RANGE QUERIES ---
+
+def parse_bound(text, end=False):
+    """
+    Parses a query bound: 'YYYY-MM', 'YYYY-MM-DD' or a full report timestamp.
+    An end bound covers the whole month / day it names. Returns a datetime (end bounds exclusive).
+    """
+    for fmt, unit in ((TIME_FORMAT, 'second'), ('%Y-%m-%d', 'day'), ('%Y-%m', 'month')):
+        try:
+            bound = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if not end:
+            return bound
+        import pandas as pd
+        step = {'second': pd.Timedelta(seconds=1), 'day': pd.Timedelta(days=1), 'month': pd.DateOffset(months=1)}[unit]
+        return (pd.Timestamp(bound) + step).to_pydatetime()
+    raise ValueError(f"Unknown date '{text}' (expected YYYY-MM, YYYY-MM-DD or YYYY-MM-DD_HH-MM-SS)")
+
+
+def _match_column(requested, available):
+    """Column of a part matching a requested name; the unit suffix ('[C]') may be left out."""
+    if requested in available:
+        return requested
+    for name in available:
+        if name.split('[', 1)[0] == requested:
+            return name
+    return None
+
+
+def query(history_dir, instrument, side, columns, start=None, end=None):
+    """
+    Returns a DataFrame of the Time column, the requested sensor columns and the source 'Report',
+    sorted by time, for one instrument and side between start (inclusive) and end (exclusive) datetimes.
+    Columns missing from a report are NaN for its rows.
+    """
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    side_dir = os.path.dirname(partition_dir(history_dir, instrument, side, ''))
+    first_month = start.strftime('%Y-%m') if start else None
+    last_month = (end - pd.Timedelta(microseconds=1)).strftime('%Y-%m') if end else None
+
+    filters = []
+    if start:
+        filters.append((TIME_COLUMN, '>=', pd.Timestamp(start)))
+    if end:
+        filters.append((TIME_COLUMN, '<', pd.Timestamp(end)))
+
+    frames = []
+    month_dirs = sorted(os.listdir(side_dir)) if os.path.isdir(side_dir) else []
+    for month_dir in month_dirs:
+        month = month_dir.split('=', 1)[-1]
+        if (first_month and month < first_month) or (last_month and month > last_month):
+            continue
+        for part_name in sorted(os.listdir(os.path.join(side_dir, month_dir))):
+            if not part_name.endswith('.parquet'):
+                continue
+            part_path = os.path.join(side_dir, month_dir, part_name)
+            available = pq.read_schema(part_path).names
+            matched = {column: _match_column(column, available) for column in columns}
+            read_columns = [TIME_COLUMN] + [name for name in dict.fromkeys(matched.values()) if name]
+            table = pq.read_table(part_path, columns=read_columns, filters=filters or None)
+            if not table.num_rows:
+                continue
+            frame = table.to_pandas()
+            frame = pd.DataFrame({TIME_COLUMN: frame[TIME_COLUMN],
+                                  **{column: frame[name] if name else float('nan') for column, name in matched.items()}})
+            frame['Report'] = os.path.splitext(part_name)[0]
+            frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=[TIME_COLUMN] + list(columns) + ['Report'])
+    return pd.concat(frames, ignore_index=True).sort_values(TIME_COLUMN, kind='stable', ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the thermal history store (see --thermal-history)")
+    parser.add_argument("store_dir", help="History store directory")
+    parser.add_argument("--instrument", required=True, help="Instrument ID (e.g. A00618)")
+    parser.add_argument("--side", required=True, help="Run side (e.g. SideB)")
+    parser.add_argument("--column", action="append", required=True,
+                        help="Sensor column (e.g. FlowCellBTargetTemperature, unit suffix optional); may be repeated")
+    parser.add_argument("--start", help="First month / day / timestamp (YYYY-MM, YYYY-MM-DD or YYYY-MM-DD_HH-MM-SS)")
+    parser.add_argument("--end", help="Last month / day / timestamp, included (same formats)")
+    parser.add_argument("--output", help="Save the rows to this CSV file instead of printing them")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store_dir):
+        print(f"❌ Error: {args.store_dir} is not a directory.")
+        return
+
+    rows = query(args.store_dir, args.instrument, args.side, args.column,
+                 start=parse_bound(args.start) if args.start else None,
+                 end=parse_bound(args.end, end=True) if args.end else None)
+    if args.output:
+        rows.to_csv(args.output, index=False)
+        print(f"Saved {len(rows)} row(s) to: {args.output}")
+    else:
+        print(rows.to_string(index=False))
+        print(f"{len(rows)} row(s) from {rows['Report'].nunique()} report(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import functools
+import contextlib
+from datetime import datetime
+
+# --- 1. SETTINGS ---
+# Optional per-file timing trace (--trace FILE). Every processed file appends ONE JSON line:
+#     {'timestamp', 'pid', 'entry_point', 'file', 'file_size', 'file_type', 'outcome',
+#      'cache', 'total_seconds', 'spans': [{'name', 'start', 'seconds', ...}, ...]}
+# Span names: detect, read, parse (one per section, with 'section'), analyse, downsample, history, serialize, compress, write
+# (with 'table' for Parquet files), index, cache_lookup and cache_store.
+# 'start' is the offset in seconds from the start of the file record.
+# Tracing is off by default; span() and annotate() are then no-ops.
+
+_settings = {'trace_file': None}
+
+# The record of the file being processed in this process (files are processed one at a time per process)
+_current = {'record': None, 'start': None}
+
+
+def configure(trace_file=None):
+    """Sets the JSONL trace file for this process (None disables tracing)."""
+    _settings['trace_file'] = os.path.abspath(trace_file) if trace_file else None
+
+
+def get_settings():
+    """Returns the current settings as positional arguments for configure() (used to set up worker processes)."""
+    return (_settings['trace_file'],)
+
+
+def is_enabled():
+    """True when a trace file is configured."""
+    return _settings['trace_file'] is not None
+
+
+def add_trace_arguments(parser):
+    """Adds the --trace option to an argparse parser."""
+    parser.add_argument("--trace", dest="trace_file", default=None,
+                        help="Append per-file timing spans (detect, read, parse per section, serialize, write) to this JSONL file")
+
+
+def configure_from_args(args):
+    """Applies the options added by add_trace_arguments()."""
+    configure(trace_file=args.trace_file)
+
+
+# --- 2. RECORDS AND SPANS ---
+
+def _append(record):
+    """Appends one record to the trace file with a single write (safe with several worker processes)."""
+    line = (json.dumps(record, default=str) + '\n').encode('utf-8')
+    fd = os.open(_settings['trace_file'], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def file_trace(file_path, entry_point):
+    """
+    Opens the trace record of one file; the record is written when the block exits.
+    Nested calls (process_single_path --> one_single_file) share the outermost record.
+    An exception leaving the block marks the record as 'error' and is re-raised.
+    """
+    if not is_enabled() or _current['record'] is not None:
+        yield
+        return
+
+    try:
+        file_size = os.path.getsize(file_path)
+    except OSError:
+        file_size = None
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+        'pid': os.getpid(),
+        'entry_point': entry_point,
+        'file': os.path.abspath(file_path),
+        'file_size': file_size,
+        'file_type': None,
+        'outcome': None,
+        'cache': None,
+        'total_seconds': None,
+        'spans': []
+    }
+    _current['record'] = record
+    _current['start'] = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record['outcome'] = 'error'
+        record['error'] = str(e)
+        raise
+    finally:
+        record['total_seconds'] = round(time.perf_counter() - _current['start'], 6)
+        record['outcome'] = record['outcome'] or 'ok'
+        _current['record'] = None
+        _current['start'] = None
+        try:
+            _append(record)
+        except OSError as e:
+            print(f"Could not write the timing trace of {os.path.basename(file_path)}: {e}")
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Times the enclosed block as one span of the current file record (no-op without a record)."""
+    record = _current['record']
+    if record is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        record['spans'].append({
+            'name': name,
+            **attributes,
+            'start': round(start - _current['start'], 6),
+            'seconds': round(end - start, 6)
+        })
+
+
+def annotate(**fields):
+    """Sets fields (file_type, outcome, cache, error, ...) on the current file record, if any."""
+    if _current['record'] is not None:
+        _current['record'].update(fields)
+
+
+# --- 3. EXTRACTOR INTEGRATION ---
+
+def traced_extractor(one_single_file):
+    """
+    Decorator for an extractor's one_single_file(input_dir_path, output_dir_path, csv_file_name):
+    opens the file record when the extractor is called directly (per-type batch loops, Main.py)
+    and sets its file_type from the extraction results. Applied above Parse_Cache.cached_extractor,
+    so cache hits are traced as well.
+    """
+    @functools.wraps(one_single_file)
+    def wrapper(input_dir_path, output_dir_path, csv_file_name):
+        file_Input_path = os.path.join(input_dir_path, csv_file_name)
+        with file_trace(file_Input_path, one_single_file.__module__):
+            results = one_single_file(input_dir_path, output_dir_path, csv_file_name)
+            if results:
+                annotate(file_type=results[0].get('file_type'))
+            return results
+
+    return wrapper
@@ -0,0 +1,328 @@
+import argparse
+import os
+import time
+import signal
+import sqlite3
+import threading
+from datetime import datetime
+import Parse_Cache
+import Output_Writer
+import Timing_Trace
+import Catalog
+import Dir_Inventory
+import Thermal_History
+import File_Type_Detector
+import Main_Auto_Processor
+
+# File system notifications (inotify on Linux) when watchdog is installed; polling otherwise
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# --- 1. SETTINGS ---
+# Long-running watch mode: new or modified CSVs under the watched roots are extracted as soon as
+# they stop changing (same size and mtime for --settle seconds), through the same pipeline as
+# Main_Auto_Processor --batch (same outputs, parse cache, catalog).
+# The (size, mtime) of every extracted file is kept in <output_dir>/watch_state.sqlite, so a
+# restart only picks up what changed while the watcher was down. Files whose extraction failed
+# (or whose type was not recognised, e.g. a header still being written) are kept apart with their
+# number of attempts: they are retried on the next passes, up to --max-attempts, and again
+# whenever they change.
+# With notifications, only the directories that changed are re-scanned between full scans.
+# Network file systems (LTS) do not deliver notifications for changes made by other hosts:
+# use --poll there, or rely on the periodic full scan (--full-scan).
+
+STATE_FILE_NAME = 'watch_state.sqlite'
+DEFAULT_INTERVAL = 10
+DEFAULT_SETTLE = 20
+DEFAULT_FULL_SCAN = 600
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def log(message):
+    """Prints a timestamped watcher message."""
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+# --- 2. STATE ---
+
+def open_state(output_dir):
+    """Opens (and creates if needed) the watcher state of an output directory."""
+    os.makedirs(output_dir, exist_ok=True)
+    db = sqlite3.connect(os.path.join(output_dir, STATE_FILE_NAME), timeout=60)
+    db.execute("""CREATE TABLE IF NOT EXISTS processed (
+                      file_path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, outcome TEXT, processed_at TEXT)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS failures (
+                      file_path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, attempts INTEGER, error TEXT,
+                      failed_at TEXT)""")
+    db.commit()
+    return db
+
+
+def load_processed(db):
+    """Returns {file_path: (size, mtime_ns)} of every extracted file."""
+    return {path: (size, mtime_ns) for path, size, mtime_ns in
+            db.execute("SELECT file_path, size, mtime_ns FROM processed WHERE outcome = 'ok'")}
+
+
+def load_failures(db):
+    """Returns {file_path: ((size, mtime_ns), attempts)} of the files whose extraction failed."""
+    return {path: ((size, mtime_ns), attempts) for path, size, mtime_ns, attempts in
+            db.execute("SELECT file_path, size, mtime_ns, attempts FROM failures")}
+
+
+def record_processed(db, entries):
+    """Stores (file_path, (size, mtime_ns), outcome) entries of extracted files (and forgets their failures)."""
+    now = datetime.now().isoformat(timespec='seconds')
+    with db:
+        db.executemany("INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?)",
+                       [(path, stat[0], stat[1], outcome, now) for path, stat, outcome in entries])
+        db.executemany("DELETE FROM failures WHERE file_path = ?", [(path,) for path, _, _ in entries])
+
+
+def record_failures(db, entries):
+    """Stores (file_path, (size, mtime_ns), attempts, error) entries of files whose extraction failed."""
+    now = datetime.now().isoformat(timespec='seconds')
+    with db:
+        db.executemany("INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?)",
+                       [(path, stat[0], stat[1], attempts, error, now) for path, stat, attempts, error in entries])
+
+
+# --- 3. CHANGE DETECTION ---
+
+def scan_csv_files(dir_paths, exclude_dir=None):
+    """
+    Returns {file_path: (size, mtime_ns)} of every CSV under the given directories (recursively),
+    except those under exclude_dir (the output directory may live inside a watched root).
+    """
+    observed = {}
+    exclude_prefix = os.path.join(os.path.abspath(exclude_dir), '') if exclude_dir else None
+    for dir_path in dir_paths:
+        for path in Main_Auto_Processor.iter_csv_paths(dir_path):
+            path = os.path.abspath(path)
+            if exclude_prefix and path.startswith(exclude_prefix):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed since the listing
+            observed[path] = (stat.st_size, stat.st_mtime_ns)
+    return observed
+
+
+def find_ready_files(observed, processed, pending, now, settle, failures=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Debounces the observed files. A file is ready when it differs from its processed state and
+    its size and mtime have not changed for settle seconds (taking its mtime into account, so a
+    backlog of old files is ready on first sight). pending maps the files still being written
+    to ((size, mtime_ns), stable_since) and is updated in place.
+    A file that failed (see load_failures) and did not change since is ready again while it has
+    had fewer than max_attempts attempts.
+    Returns the sorted list of (file_path, (size, mtime_ns)) ready to be processed.
+    """
+    ready = []
+    failures = failures or {}
+    for path, stat in observed.items():
+        if processed.get(path) == stat:
+            pending.pop(path, None)
+            continue
+
+        failure = failures.get(path)
+        if failure is not None and failure[0] == stat:
+            pending.pop(path, None)
+            if failure[1] < max_attempts:
+                ready.append((path, stat))
+            continue
+
+        previous = pending.get(path)
+        if previous is None or previous[0] != stat:
+            stable_since = min(now, stat[1] / 1e9)
+            pending[path] = (stat, stable_since)
+        else:
+            stable_since = previous[1]
+
+        if now - stable_since >= settle:
+            ready.append((path, stat))
+            del pending[path]
+    return sorted(ready)
+
+
+class _ChangeCollector(FileSystemEventHandler):
+    """Collects the directories touched by CSV file events (watchdog handler, called from its thread)."""
+
+    def __init__(self):
+        self.changed_dirs = set()
+        self.lock = threading.Lock()
+        self.wake_up = threading.Event()
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            # New run folder: scan it entirely
+            changed = getattr(event, 'dest_path', '') or event.src_path
+        else:
+            path = getattr(event, 'dest_path', '') or event.src_path
+            if not path.lower().endswith('.csv'):
+                return
+            changed = os.path.dirname(path)
+        with self.lock:
+            self.changed_dirs.add(changed)
+        self.wake_up.set()
+
+    def take(self):
+        """Returns and clears the changed directories."""
+        with self.lock:
+            changed, self.changed_dirs = self.changed_dirs, set()
+        self.wake_up.clear()
+        return changed
+
+
+# --- 4. THE WATCH LOOP ---
+
+def process_ready(db, ready, output_dir, workers=1, update_catalog=True, failures=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Extracts the ready files and updates the catalog. The extracted files are recorded as processed,
+    the others as failures with their number of attempts (failures, see load_failures, is updated in place).
+    Returns the list of (file_path, (size, mtime_ns)) extracted.
+    """
+    failures = {} if failures is None else failures
+    results = Main_Auto_Processor.process_paths([path for path, _ in ready], output_dir, workers=workers)
+    all_results = [file_info for res in results if res for file_info in res]
+
+    extracted = [(path, stat) for (path, stat), res in zip(ready, results) if res]
+    failed = []
+    for (path, stat), res in zip(ready, results):
+        if res:
+            failures.pop(path, None)
+            continue
+        previous = failures.get(path)
+        attempts = previous[1] + 1 if previous is not None and previous[0] == stat else 1
+        error = 'unknown_type' if File_Type_Detector.detect_file_type(path) is None else 'error'
+        failures[path] = (stat, attempts)
+        failed.append((path, stat, attempts, error))
+        if attempts >= max_attempts:
+            log(f"⚠️  Giving up on {path} after {attempts} attempt(s) ({error}); retried when it changes")
+
+    record_processed(db, [(path, stat, 'ok') for path, stat in extracted])
+    record_failures(db, failed)
+    if all_results and update_catalog:
+        Catalog.update_catalog(output_dir, all_results)
+        Catalog.export_csv(output_dir)
+    log(f"✅ {len(extracted)} file(s) extracted, {len(failed)} skipped / failed (up to {max_attempts} attempts each)")
+    return extracted
+
+
+def watch(roots, output_dir, interval=DEFAULT_INTERVAL, settle=DEFAULT_SETTLE, full_scan=DEFAULT_FULL_SCAN,
+          workers=1, poll=False, once=False, update_catalog=True, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Watches the roots and extracts new or modified CSVs into output_dir until interrupted.
+    once=True performs a single scan (files still being written, or to retry, are left for the next run).
+    """
+    roots = [os.path.abspath(root) for root in roots]
+    db = open_state(output_dir)
+    processed = load_processed(db)
+    failures = load_failures(db)
+    pending = {}
+
+    collector = None
+    observer = None
+    if not poll and not once and Observer is not None:
+        collector = _ChangeCollector()
+        observer = Observer()
+        for root in roots:
+            observer.schedule(collector, root, recursive=True)
+        observer.start()
+    mode = f'notifications + full scan every {full_scan}s' if observer else f'polling every {interval}s'
+    log(f"👀 Watching {len(roots)} root(s) ({mode}), {len(processed)} file(s) already processed")
+
+    last_full_scan = None
+    try:
+        while True:
+            now = time.time()
+            if observer is None or last_full_scan is None or now - last_full_scan >= full_scan:
+                observed = scan_csv_files(roots, exclude_dir=output_dir)
+                last_full_scan = now
+            else:
+                # Changed directories, plus the files still settling or to retry (they may not send another event)
+                observed = scan_csv_files(collector.take(), exclude_dir=output_dir)
+                for path in list(pending) + [path for path, (_, attempts) in failures.items() if attempts < max_attempts]:
+                    try:
+                        stat = os.stat(path)
+                        observed[path] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        pending.pop(path, None)
+
+            ready = find_ready_files(observed, processed, pending, time.time(), settle, failures, max_attempts)
+            if ready:
+                log(f"📥 {len(ready)} new / modified / retried file(s) ready, {len(pending)} still being written")
+                extracted = process_ready(db, ready, output_dir, workers=workers, update_catalog=update_catalog,
+                                          failures=failures, max_attempts=max_attempts)
+                processed.update(dict(extracted))
+
+            if once:
+                break
+            if collector is not None:
+                # Wake up early on events; the short sleep coalesces the bursts of events of a file being written
+                collector.wake_up.wait(interval)
+                time.sleep(min(interval, 1))
+            else:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        log("🛑 Watcher stopped")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        db.close()
+
+
+def _stop_on_sigterm(signum, frame):
+    """SIGTERM handler: stops the watch loop like Ctrl+C."""
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch directories and extract new or modified CSV files as they land")
+    parser.add_argument("roots", nargs='+', help="Root directories to watch")
+    parser.add_argument("output_dir", help="Where to save results (also holds the watcher state)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help=f"Seconds between checks (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help=f"Seconds a file must stay unchanged before it is extracted (default: {DEFAULT_SETTLE})")
+    parser.add_argument("--full-scan", type=float, default=DEFAULT_FULL_SCAN,
+                        help=f"Seconds between full re-scans when notifications are used (default: {DEFAULT_FULL_SCAN})")
+    parser.add_argument("--poll", action="store_true", help="Do not use file system notifications (network file systems)")
+    parser.add_argument("--once", action="store_true", help="Scan once, extract what is ready and exit")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (default: 1)")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f"Extraction attempts of a file that keeps failing, until it changes (default: {DEFAULT_MAX_ATTEMPTS})")
+    Parse_Cache.add_cache_arguments(parser)
+    Output_Writer.add_output_arguments(parser)
+    Timing_Trace.add_trace_arguments(parser)
+    Catalog.add_catalog_arguments(parser)
+    Dir_Inventory.add_inventory_arguments(parser)
+    Thermal_History.add_history_arguments(parser)
+
+    args = parser.parse_args()
+    Parse_Cache.configure_from_args(args)
+    Output_Writer.configure_from_args(args)
+    Timing_Trace.configure_from_args(args)
+    Dir_Inventory.configure_from_args(args)
+    Thermal_History.configure_from_args(args)
+
+    for root in args.roots:
+        if not os.path.isdir(root):
+            print(f"❌ Error: {root} is not a valid directory.")
+            return
+
+    # Stop cleanly when run as a service (systemctl stop / kill)
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+
+    watch(args.roots, args.output_dir, interval=args.interval, settle=args.settle, full_scan=args.full_scan,
+          workers=args.workers, poll=args.poll, once=args.once, update_catalog=not args.no_catalog,
+          max_attempts=args.max_attempts)
+
+
+if __name__ == "__main__":
+    main()
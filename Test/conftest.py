@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+# The modules live flat in Src/ and import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Src'))
+
+import Output_Writer  # noqa: E402
+import Parse_Cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    """Default output settings and a private cache directory for every test."""
+    monkeypatch.setenv('LAGE_CACHE_DIR', str(tmp_path / 'cache'))
+    Output_Writer.configure()
+    Parse_Cache.configure(cache_dir=str(tmp_path / 'cache'))
+    yield
+    Output_Writer.configure()
@@ -0,0 +1,97 @@
+import os
+import time
+
+import pytest
+
+import Async_Pipeline
+import Output_Writer
+
+SHEET = ('[Header],,\nINVESTIGATOR NAME,BeadStudio User,\nPROJECT NAME,{project},\nDATE,20251030,\n'
+         '[Manifests],,\nA,GDA-8v1-0_D1,\n[Data],,\nSample_ID,SentrixBarcode_A,SentrixPosition_A\n{sample},2096,R01C01\n')
+
+
+def _sheet(path, project, sample='S1'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(SHEET.format(project=project, sample=sample))
+    return str(path)
+
+
+def _slow_listing(monkeypatch, slow_dir, delay, log):
+    scan_directory = Async_Pipeline.scan_directory
+
+    def scan(dir_path):
+        if os.path.basename(dir_path) == slow_dir:
+            time.sleep(delay)
+        listing = scan_directory(dir_path)
+        log.append(('listed', os.path.basename(dir_path), time.monotonic()))
+        return listing
+    monkeypatch.setattr(Async_Pipeline, 'scan_directory', scan)
+
+
+def test_results_in_walk_order(tmp_path, monkeypatch):
+    root = tmp_path / 'in'
+    paths = [_sheet(root / 'top.csv', 'P0'), _sheet(root / 'a' / 'one.csv', 'P1'), _sheet(root / 'b' / 'two.csv', 'P2')]
+    _slow_listing(monkeypatch, 'a', 0.3, [])
+
+    results, linked = Async_Pipeline.process_directory(str(root), str(tmp_path / 'out'), workers=2)
+    assert linked == set()
+    assert [result[0]['file_path'] for result in results] == paths
+
+
+def test_files_are_processed_while_the_tree_is_listed(tmp_path, monkeypatch):
+    root = tmp_path / 'in'
+    _sheet(root / 'fast' / 'one.csv', 'P1')
+    _sheet(root / 'slow' / 'two.csv', 'P2')
+    log = []
+    _slow_listing(monkeypatch, 'slow', 1.0, log)
+    read_ahead = Async_Pipeline.read_ahead
+
+    def read(file_path):
+        log.append(('read', os.path.basename(file_path), time.monotonic()))
+        return read_ahead(file_path)
+    monkeypatch.setattr(Async_Pipeline, 'read_ahead', read)
+
+    Async_Pipeline.process_directory(str(root), str(tmp_path / 'out'))
+    events = {(kind, name): when for kind, name, when in log}
+    assert events[('read', 'one.csv')] < events[('listed', 'slow')]
+
+
+def test_same_output_name_keeps_the_last_file_in_walk_order(tmp_path, monkeypatch):
+    root = tmp_path / 'in'
+    first = _sheet(root / 'a' / 'sheet.csv', 'FIRST', 'S1')
+    last = _sheet(root / 'b' / 'sheet.csv', 'LAST', 'S2')
+    # 'b' is listed (and its sheet scheduled) before 'a'
+    _slow_listing(monkeypatch, 'a', 0.5, [])
+
+    output_dir = tmp_path / 'out'
+    results, _ = Async_Pipeline.process_directory(str(root), str(output_dir), workers=2)
+    assert [result[0]['file_path'] for result in results] == [first, last]
+    record = Output_Writer.read_json(str(output_dir / 'sheet.json'))
+    assert record['file_path'] == last
+    assert [sample['Sample_ID'] for sample in record['samples']] == ['S2']
+
+
+def test_scheduled_files_finish_when_the_listing_fails(tmp_path, monkeypatch):
+    root = tmp_path / 'in'
+    sheet = _sheet(root / 'top.csv', 'P0')
+    (root / 'broken').mkdir()
+    scan_directory = Async_Pipeline.scan_directory
+
+    def scan(dir_path):
+        if os.path.basename(dir_path) == 'broken':
+            raise PermissionError(f'cannot list {dir_path}')
+        return scan_directory(dir_path)
+    monkeypatch.setattr(Async_Pipeline, 'scan_directory', scan)
+    written = []
+    write_outputs = Async_Pipeline.write_outputs
+
+    def write(writes, results):
+        write_outputs(writes, results)
+        written.append(results[0]['file_path'])
+    monkeypatch.setattr(Async_Pipeline, 'write_outputs', write)
+
+    with pytest.raises(PermissionError):
+        Async_Pipeline.process_directory(str(root), str(tmp_path / 'out'))
+    # top.csv was scheduled before the error: processed and written, not abandoned
+    assert written == [sheet]
+    assert Output_Writer.read_json(str(tmp_path / 'out' / 'top.json'))['file_path'] == sheet
@@ -0,0 +1,83 @@
+import os
+import csv
+import shutil
+
+import pytest
+
+import Catalog
+import Parse_Cache
+import Main_Auto_Processor
+
+REPORT_NAME = 'A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv'
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NovaSeq6000_CSVs', REPORT_NAME)
+
+
+@pytest.fixture
+def extraction(tmp_path):
+    """The extraction result of a copy of the thermal report."""
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    shutil.copy(REPORT_PATH, input_dir / REPORT_NAME)
+    return Main_Auto_Processor.process_single_path(str(input_dir / REPORT_NAME), str(tmp_path / 'out'))
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Counts the files hashed from their content."""
+    hashed = []
+    hash_file = Parse_Cache.hash_file
+
+    def counting(file_path):
+        hashed.append(os.path.basename(file_path))
+        return hash_file(file_path)
+
+    monkeypatch.setattr(Parse_Cache, 'hash_file', counting)
+    return hashed
+
+
+def test_unchanged_and_touched_files_keep_their_row(tmp_path, extraction, hashes):
+    out = str(tmp_path / 'out')
+    assert Catalog.update_catalog(out, extraction) == {'added': 1, 'updated': 0, 'unchanged': 0, 'missing': 0}
+    # Hashed once by the extraction, the catalog reuses it
+    assert hashes == []
+
+    assert Catalog.update_catalog(out, extraction)['unchanged'] == 1
+
+    # Touched (re-synced) with the same content: the row and its date stay
+    source = extraction[0]['file_path']
+    os.utime(source, ns=(10 ** 18, 10 ** 18))
+    assert Catalog.update_catalog(out, extraction)['unchanged'] == 1
+    assert hashes == [REPORT_NAME]
+    assert Catalog.update_catalog(out, extraction)['unchanged'] == 1
+    assert hashes == [REPORT_NAME]
+
+
+def test_modified_file_and_new_extractor_version_update_the_row(tmp_path, extraction, monkeypatch):
+    out = str(tmp_path / 'out')
+    Catalog.update_catalog(out, extraction)
+
+    with open(extraction[0]['file_path'], 'a') as f:
+        f.write('\n')
+    assert Catalog.update_catalog(out, extraction)['updated'] == 1
+
+    module = Catalog.extractor_of(extraction[0])
+    monkeypatch.setattr(module, 'EXTRACTOR_VERSION', f'{module.EXTRACTOR_VERSION}-next')
+    assert Catalog.update_catalog(out, extraction)['updated'] == 1
+    assert Catalog.update_catalog(out, extraction)['unchanged'] == 1
+
+
+def test_export_and_prune(tmp_path, extraction):
+    out = str(tmp_path / 'out')
+    Catalog.update_catalog(out, extraction)
+    csv_path, count = Catalog.export_csv(out)
+    assert count == 1
+    with open(csv_path, newline='') as f:
+        row = next(csv.DictReader(f))
+    assert row['File path'] == os.path.abspath(extraction[0]['file_path'])
+    assert row['Content hash'] == Parse_Cache.hash_file(extraction[0]['file_path'])
+    assert row['JSON file'] == REPORT_NAME.replace('.csv', '.json')
+
+    os.remove(extraction[0]['file_path'])
+    assert Catalog.update_catalog(out, extraction)['missing'] == 1
+    assert Catalog.prune_catalog(out) == 1
+    assert Catalog.export_csv(out)[1] == 0
@@ -0,0 +1,129 @@
+import os
+import time
+
+import pytest
+
+import Dir_Inventory
+
+
+@pytest.fixture(autouse=True)
+def default_inventory():
+    Dir_Inventory.configure()
+    yield
+    Dir_Inventory.configure()
+
+
+def _make_tree(root):
+    for relative in ('2023/run1/a.csv', '2023/run1/b.CSV', '2023/run2/c.csv', '2024/run3/d.csv', 'top.csv',
+                     '2024/run3/notes.txt', '20230/e.csv'):
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('x\n')
+
+
+def _age(root, seconds=60):
+    """Moves every directory mtime into the past, so its listing is trusted (see RACY_SECONDS)."""
+    past = time.time() - seconds
+    for dir_path, _, _ in os.walk(root):
+        os.utime(dir_path, (past, past))
+
+
+def _walk(root):
+    """CSV paths in the order of a sorted os.walk."""
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        paths.extend(os.path.join(dir_path, name) for name in sorted(file_names) if name.lower().endswith('.csv'))
+    return paths
+
+
+def _crawl(root):
+    """Returns (CSV paths, directories reused, directories listed) of one crawl."""
+    before = Dir_Inventory.get_stats()
+    paths = list(Dir_Inventory.iter_csv_paths(str(root)))
+    after = Dir_Inventory.get_stats()
+    return paths, after['reused'] - before['reused'], after['listed'] - before['listed']
+
+
+def test_unchanged_tree_is_served_from_the_inventory(tmp_path):
+    root = tmp_path / 'lts'
+    _make_tree(root)
+    _age(root)
+
+    paths, reused, listed = _crawl(root)
+    assert paths == _walk(str(root))
+    assert (reused, listed) == (0, 7)
+
+    paths, reused, listed = _crawl(root)
+    assert paths == _walk(str(root))
+    assert (reused, listed) == (7, 0)
+
+
+def test_recent_listings_are_not_trusted(tmp_path):
+    root = tmp_path / 'lts'
+    _make_tree(root)
+
+    _crawl(root)
+    # Every directory changed less than RACY_SECONDS before it was listed
+    assert _crawl(root)[1:] == (0, 7)
+
+
+def test_added_file_invalidates_its_directory_only(tmp_path):
+    root = tmp_path / 'lts'
+    _make_tree(root)
+    _age(root)
+    _crawl(root)
+
+    (root / '2024' / 'run3' / 'f.csv').write_text('x\n')
+    paths, reused, listed = _crawl(root)
+    assert paths == _walk(str(root))
+    assert str(root / '2024' / 'run3' / 'f.csv') in paths
+    assert (reused, listed) == (6, 1)
+
+
+def test_removed_directory_is_dropped_with_its_subtree(tmp_path):
+    root = tmp_path / 'lts'
+    _make_tree(root)
+    _age(root)
+    _crawl(root)
+
+    for name in ('a.csv', 'b.CSV'):
+        os.remove(root / '2023' / 'run1' / name)
+    os.rmdir(root / '2023' / 'run1')
+    paths, reused, listed = _crawl(root)
+    assert paths == _walk(str(root))
+    assert not any('run1' in path for path in paths)
+    # Only the parent is listed again; the sibling 20230 sharing its name prefix stays in the inventory
+    assert listed == 1
+    assert str(root / '20230' / 'e.csv') in paths
+
+    rows = Dir_Inventory._load_subtree(os.path.abspath(root))
+    assert os.path.abspath(root / '2023' / 'run1') not in rows
+    assert os.path.abspath(root / '20230') in rows
+
+
+def test_renamed_directory_is_listed_under_its_new_name(tmp_path):
+    root = tmp_path / 'lts'
+    _make_tree(root)
+    _age(root)
+    _crawl(root)
+
+    os.rename(root / '2024' / 'run3', root / '2024' / 'run4')
+    paths, _, _ = _crawl(root)
+    assert paths == _walk(str(root))
+    assert str(root / '2024' / 'run4' / 'd.csv') in paths
+
+
+def test_refresh_and_disabled_list_every_directory(tmp_path):
+    root = tmp_path / 'lts'
+    _make_tree(root)
+    _age(root)
+    _crawl(root)
+
+    Dir_Inventory.configure(refresh=True)
+    assert _crawl(root)[1:] == (0, 7)
+
+    Dir_Inventory.configure(enabled=False)
+    paths, reused, listed = _crawl(root)
+    assert paths == _walk(str(root))
+    assert (reused, listed) == (0, 0)
@@ -0,0 +1,36 @@
+import os
+import pytest
+import Output_Writer
+import Extractor_FMAutoTilt
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NovaSeq6000_CSVs')
+REPORT_NAME = 'A00618_2024-01-19_12-03-56_FM-AutoTilt_Report.csv'
+
+
+@pytest.mark.parametrize('output_format', Output_Writer.OUTPUT_FORMATS)
+def test_records_can_be_reanalysed(tmp_path, output_format):
+    Output_Writer.configure(output_format=output_format)
+    file_info = Extractor_FMAutoTilt.one_single_file(REPORT_DIR, str(tmp_path), REPORT_NAME)[0]
+
+    json_path = os.path.join(tmp_path, Output_Writer.json_file_name(REPORT_NAME))
+    table = Extractor_FMAutoTilt.through_focus_from_record(json_path)
+    assert len(table) == 4
+    assert table == file_info[Extractor_FMAutoTilt.THROUGH_FOCUS_KEY]
+    assert {row['Settings'] for row in table} == {'dry flow cell'}
+
+
+def _stack(peak_z):
+    return [{'Z Position[um]': z, 'Valid': 'True', 'Left Avg Intensity': 255 - abs(z - peak_z),
+             'Right Avg Intensity': 255 - abs(z - peak_z)} for z in range(400, 601, 5)]
+
+
+def test_dry_and_wet_stacks_at_one_position_are_told_apart():
+    sections = {
+        'ftm_through-focus_stack_at_x__197.250mm_y__78.000mm_using_settings_for_dry_flow_cell': _stack(520),
+        'ftm_through-focus_stack_at_x__197.250mm_y__78.000mm_using_settings_for_wet_flow_cell': _stack(480),
+        'ftm_through-focus_stack_at_x__206.250mm_y__78.000mm': _stack(500),
+        'results_at_x__197.250mm_y__78.000mm_using_settings_for_dry_flow_cell': [{'Surface S1': 520}],
+    }
+    table = Extractor_FMAutoTilt.through_focus_table(sections)
+    assert [(row['X [mm]'], row['Settings'], row['Peak Z [um]']) for row in table] == [
+        (197.25, 'dry flow cell', 520.0), (197.25, 'wet flow cell', 480.0), (206.25, None, 500.0)]
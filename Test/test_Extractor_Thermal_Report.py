@@ -0,0 +1,144 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import Output_Writer
+import Extractor_Thermal_Report
+
+REPORT_NAME = 'A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv'
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NovaSeq6000_CSVs', REPORT_NAME)
+
+
+@pytest.fixture
+def report_dir(tmp_path):
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    shutil.copy(REPORT_PATH, input_dir / REPORT_NAME)
+    return input_dir
+
+
+@pytest.fixture
+def regenerations(monkeypatch):
+    """Counts the side files rebuilt from the CSV."""
+    counts = {'time_series': 0, 'downsampled': 0}
+    write_csv_as_parquet = Output_Writer.write_csv_as_parquet
+    downsample_time_series = Extractor_Thermal_Report.downsample_time_series
+
+    def counting_parquet(*args, **kwargs):
+        counts['time_series'] += 1
+        return write_csv_as_parquet(*args, **kwargs)
+
+    def counting_downsample(*args, **kwargs):
+        counts['downsampled'] += 1
+        return downsample_time_series(*args, **kwargs)
+
+    monkeypatch.setattr(Output_Writer, 'write_csv_as_parquet', counting_parquet)
+    monkeypatch.setattr(Extractor_Thermal_Report, 'downsample_time_series', counting_downsample)
+    return counts
+
+
+def _extract(report_dir, output_dir):
+    Extractor_Thermal_Report.one_single_file(str(report_dir), str(output_dir), REPORT_NAME)
+    return Output_Writer.read_json(os.path.join(output_dir, Output_Writer.json_file_name(REPORT_NAME)))
+
+
+def test_cache_hit_keeps_a_fresh_time_series(report_dir, tmp_path, regenerations):
+    Output_Writer.configure(output_format='parquet')
+    first = _extract(report_dir, tmp_path / 'out')
+    assert regenerations['time_series'] == 1
+
+    second = _extract(report_dir, tmp_path / 'out')
+    assert regenerations['time_series'] == 1
+    assert second == first
+    assert second['time_series']['rows'] == second['number_of_data_points']
+
+    # A report touched after the time series was written (same content: still a cache hit)
+    source = report_dir / REPORT_NAME
+    later = os.stat(tmp_path / 'out' / Output_Writer.table_file_name(REPORT_NAME, 'time_series')).st_mtime_ns + 10 ** 9
+    os.utime(source, ns=(later, later))
+    _extract(report_dir, tmp_path / 'out')
+    assert regenerations['time_series'] == 2
+
+
+def test_broken_side_file_is_rebuilt(report_dir, tmp_path, regenerations):
+    Output_Writer.configure(output_format='parquet')
+    _extract(report_dir, tmp_path / 'out')
+    parquet_path = tmp_path / 'out' / Output_Writer.table_file_name(REPORT_NAME, 'time_series')
+    parquet_path.write_bytes(b'truncated')
+
+    record = _extract(report_dir, tmp_path / 'out')
+    assert regenerations['time_series'] == 2
+    assert Output_Writer.parquet_row_count(str(parquet_path)) == record['number_of_data_points']
+
+
+def test_cache_hit_keeps_a_fresh_downsampled_series(report_dir, tmp_path, regenerations):
+    Output_Writer.configure(output_format='parquet', downsample_points=50)
+    first = _extract(report_dir, tmp_path / 'out')
+    second = _extract(report_dir, tmp_path / 'out')
+    assert regenerations == {'time_series': 1, 'downsampled': 1}
+    assert second == first
+    assert second['downsampled_series']['points'] == 50
+
+    # Another number of points: only the downsampled series is rebuilt
+    Output_Writer.configure(output_format='parquet', downsample_points=20)
+    assert _extract(report_dir, tmp_path / 'out')['downsampled_series']['points'] == 20
+    assert regenerations == {'time_series': 1, 'downsampled': 2}
+
+
+def test_json_downsampled_series_is_reused(report_dir, tmp_path, regenerations):
+    Output_Writer.configure(downsample_points=30)
+    first = _extract(report_dir, tmp_path / 'out')
+    assert _extract(report_dir, tmp_path / 'out') == first
+    assert regenerations == {'time_series': 0, 'downsampled': 1}
+
+    downsampled_path = tmp_path / 'out' / Output_Writer.downsampled_file_name(REPORT_NAME)
+    downsampled_path.write_text('{"points": 30}')
+    _extract(report_dir, tmp_path / 'out')
+    assert regenerations['downsampled'] == 2
+    assert Output_Writer.read_json(str(downsampled_path))['source_rows'] == first['number_of_data_points']
+
+
+def _pandas_statistics(file_path):
+    """Baseline: the whole report in one DataFrame."""
+    frame = pd.read_csv(file_path, skiprows=2)
+    values = frame.iloc[:, 1:].apply(pd.to_numeric, errors='coerce')
+    return frame, {column: {'count': int(values[column].count()), 'min': values[column].min(), 'max': values[column].max(),
+                            'mean': values[column].mean(), 'stddev': values[column].std()} for column in values.columns}
+
+
+def _assert_matches_pandas(file_path, chunk_rows):
+    frame, expected = _pandas_statistics(file_path)
+    statistics = Extractor_Thermal_Report.extract_streaming_statistics(file_path, chunk_rows=chunk_rows)
+    assert statistics['number_of_data_points'] == len(frame)
+    assert statistics['first_timestamp'] == str(frame.iloc[0, 0])
+    assert statistics['last_timestamp'] == str(frame.iloc[-1, 0])
+    assert list(statistics['column_statistics']) == list(expected)
+    for column, values in statistics['column_statistics'].items():
+        for name, value in values.items():
+            if pd.isna(expected[column][name]):
+                assert value is None, (column, name)
+            else:
+                assert value == pytest.approx(expected[column][name], rel=1e-9, abs=1e-9), (column, name)
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 1000, Extractor_Thermal_Report.STATS_CHUNK_ROWS])
+def test_streaming_statistics_match_pandas(chunk_rows):
+    _assert_matches_pandas(REPORT_PATH, chunk_rows)
+
+
+def test_streaming_statistics_with_missing_and_text_values(tmp_path):
+    path = tmp_path / 'SideA_ThermalReport.csv'
+    rows = ['SideA', '', 'Time,Current Cycle,Zone1,Zone2,Empty']
+    for i in range(25):
+        zone1 = 'NA' if i % 4 == 0 else f'{20 + i * 0.37:.3f}'
+        zone2 = 'Error' if i == 11 else f'{-5 + i * i * 0.01:.2f}'
+        rows.append(f'2024-01-19_12-{i:02d}-00,{i // 10},{zone1},{zone2},')
+    path.write_text('\n'.join(rows) + '\n')
+
+    for chunk_rows in (1, 4, 10, 100):
+        _assert_matches_pandas(str(path), chunk_rows)
+    statistics = Extractor_Thermal_Report.extract_streaming_statistics(str(path), chunk_rows=4)
+    assert statistics['column_statistics']['Zone1']['count'] == 18
+    assert statistics['column_statistics']['Empty'] == {'count': 0, 'min': None, 'max': None, 'mean': None, 'stddev': None}
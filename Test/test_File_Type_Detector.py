@@ -0,0 +1,75 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import File_Type_Detector
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+NOVASEQ_DIR = os.path.join(ROOT, 'NovaSeq6000_CSVs')
+
+
+@pytest.mark.parametrize('relative_path, module_name, file_type', [
+    ('NovaSeq6000_CSVs/A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv', 'Extractor_Thermal_Report', 'Thermal Report'),
+    ('NovaSeq6000_CSVs/A00618_2024-01-19_16-08-06_FM-GenerationReport.csv', 'Extractor_FMGeneration', 'FM-Generation Report'),
+    ('NovaSeq6000_CSVs/A00618_2024-01-19_12-03-56_FM-AutoTilt_Report.csv', 'Extractor_FMAutoTilt', 'FM-AutoTilt Report'),
+    ('Beadstudio_CSVs/20251022_ORID0086C-01_Cattinara_GWAS_PT01-02.csv', 'Extractor_BeadStudio', 'BeadStudio'),
+    ('orfeo/LTS/LAGE/illumina_run/AREA/NovaSeq6000/2023/230921_A00618_0323_AHK32KDSX2/20230912_ORID0036_Pool03.csv',
+     'Extractor_IlluminaSampleSheet', 'Illumina Sample Sheet'),
+])
+def test_sample_files_are_recognised(relative_path, module_name, file_type):
+    verdict = File_Type_Detector.detect_file_type(os.path.join(ROOT, relative_path))
+    assert verdict['module_name'] == module_name
+    assert verdict['file_type'] == file_type
+    assert verdict['confidence'] == 1.0
+    assert verdict['reason']
+
+
+def test_every_extractor_declares_one_signature():
+    module_names = [signature['module_name'] for signature in File_Type_Detector.SIGNATURES]
+    assert sorted(module_names) == sorted(set(module_names))
+    for module_name in module_names:
+        assert os.path.exists(os.path.join(ROOT, 'Src', f'{module_name}.py'))
+
+
+def test_lower_confidence_and_unknown_files(tmp_path):
+    beadstudio_like = tmp_path / 'notes.csv'
+    beadstudio_like.write_text('Exported from BeadStudio\n[Header]\n')
+    verdict = File_Type_Detector.detect_file_type(str(beadstudio_like))
+    assert (verdict['file_type'], verdict['confidence']) == ('BeadStudio', 0.6)
+
+    generation_like = tmp_path / 'generation.csv'
+    generation_like.write_text('Name,Instrument Name\n')
+    assert File_Type_Detector.detect_file_type(str(generation_like))['confidence'] == 0.8
+
+    # Header still being written
+    partial = tmp_path / 'partial.csv'
+    partial.write_text('Side,B\n')
+    assert File_Type_Detector.detect_file_type(str(partial)) is None
+    assert File_Type_Detector.detect_file_type(str(tmp_path / 'missing.csv')) is None
+
+
+def test_the_best_confidence_wins(tmp_path):
+    # BeadStudio mentioned in an Illumina sample sheet that does not start with [Header]
+    sheet = tmp_path / 'sheet.csv'
+    sheet.write_text('\n[Header]\nIEMFileVersion,4\nInvestigator Name,BeadStudio\n')
+    assert File_Type_Detector.detect_file_type(str(sheet))['file_type'] == 'Illumina Sample Sheet'
+
+
+def test_only_the_head_is_read(tmp_path):
+    report = tmp_path / 'report.csv'
+    with open(os.path.join(NOVASEQ_DIR, 'A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv'), 'rb') as f:
+        head = f.read(File_Type_Detector.SIGNATURE_READ_BYTES)
+    report.write_bytes(head + b'\xff' * 10)
+    assert len(File_Type_Detector.read_file_head(str(report))) == len(head.decode('utf-8', errors='replace').splitlines())
+    assert File_Type_Detector.detect_file_type(str(report))['file_type'] == 'Thermal Report'
+
+
+def test_detection_does_not_import_the_extractors(tmp_path):
+    probe = ("import sys, File_Type_Detector\n"
+             f"File_Type_Detector.detect_file_type({os.path.join(NOVASEQ_DIR, 'A00618_2024-01-19_16-08-06_FM-GenerationReport.csv')!r})\n"
+             "print(sorted(m for m in sys.modules if m.startswith('Extractor_') or m == 'pandas'))")
+    completed = subprocess.run([sys.executable, '-c', probe], cwd=os.path.join(ROOT, 'Src'),
+                               capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == '[]'
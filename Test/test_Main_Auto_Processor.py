@@ -0,0 +1,60 @@
+import os
+import json
+import shutil
+
+import pytest
+
+import Output_Writer
+import Parse_Cache
+import Main_Auto_Processor
+
+NOVASEQ_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NovaSeq6000_CSVs')
+THERMAL_NAME = 'A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv'
+WASH_NAME = 'A00618_SideB_2024-01-21_04-19-23_Wash_ThermalReport.csv'
+
+
+@pytest.fixture
+def input_paths(tmp_path):
+    """Every NovaSeq sample, an unknown file, and a second report sharing the name of the first."""
+    paths = []
+    run_dir = tmp_path / 'input' / 'run'
+    run_dir.mkdir(parents=True)
+    for name in sorted(os.listdir(NOVASEQ_DIR)):
+        shutil.copy(os.path.join(NOVASEQ_DIR, name), run_dir / name)
+        paths.append(str(run_dir / name))
+    (run_dir / 'notes.csv').write_text('just,some\nnotes,here\n')
+    paths.insert(2, str(run_dir / 'notes.csv'))
+
+    # Same output name, other content: processed after the first one, as in a sequential run
+    copy_dir = tmp_path / 'input' / 'copy'
+    copy_dir.mkdir()
+    shutil.copy(os.path.join(NOVASEQ_DIR, WASH_NAME), copy_dir / THERMAL_NAME)
+    paths.append(str(copy_dir / THERMAL_NAME))
+    return paths
+
+
+def _outputs(output_dir):
+    return {name: Output_Writer.read_json(os.path.join(output_dir, name))
+            for name in sorted(os.listdir(output_dir)) if name.endswith('.json')}
+
+
+@pytest.mark.parametrize('queue_size', [None, 1])
+def test_workers_match_a_sequential_run(tmp_path, input_paths, queue_size):
+    # Both runs extract every file
+    Parse_Cache.configure(enabled=False)
+    sequential = Main_Auto_Processor.process_paths(input_paths, str(tmp_path / 'sequential'))
+    parallel = Main_Auto_Processor.process_paths(input_paths, str(tmp_path / 'parallel'), workers=3, queue_size=queue_size)
+
+    assert len(parallel) == len(input_paths)
+    assert [result and result[0]['file_path'] for result in parallel] == \
+           [result and result[0]['file_path'] for result in sequential]
+    assert parallel[2] is None
+    # NaN values: compared through their JSON text
+    assert json.dumps(parallel, default=str) == json.dumps(sequential, default=str)
+    assert _outputs(str(tmp_path / 'parallel')) == _outputs(str(tmp_path / 'sequential'))
+
+
+def test_same_output_name_keeps_the_last_file_in_walk_order(tmp_path, input_paths):
+    Main_Auto_Processor.process_paths(input_paths, str(tmp_path / 'out'), workers=2)
+    record = Output_Writer.read_json(os.path.join(tmp_path / 'out', THERMAL_NAME.replace('.csv', '.json')))
+    assert record['file_path'] == input_paths[-1]
@@ -0,0 +1,78 @@
+import os
+import json
+import pytest
+import pyarrow.parquet as pq
+import Output_Writer
+import Extractor_Thermal_Report
+
+
+def _thermal_csv(path, rows=35, bad_row=25):
+    lines = ['Side,SideB', 'Instrument,A00618', 'Time,Current Cycle,FlowCellTemperature[C]']
+    for i in range(rows):
+        value = 'ERR' if i == bad_row else f"{20 + i * 0.5}"
+        lines.append(f"2024-01-19_12-{i // 60:02d}-{i % 60:02d},{i},{value}")
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_non_numeric_cell_in_a_later_chunk_becomes_nan(tmp_path):
+    csv_path = _thermal_csv(tmp_path / 'report.csv')
+    parquet_path = str(tmp_path / 'report.time_series.parquet')
+
+    rows = Output_Writer.write_csv_as_parquet(csv_path, parquet_path, chunk_rows=10, skiprows=2,
+                                              convert_chunk=Extractor_Thermal_Report.numeric_chunk)
+    assert rows == 35
+
+    table = pq.read_table(parquet_path).to_pandas()
+    assert str(table['FlowCellTemperature[C]'].dtype) == 'float64'
+    assert table['FlowCellTemperature[C]'].isna().tolist() == [i == 25 for i in range(35)]
+    assert table['Time'].iloc[0] == '2024-01-19_12-00-00'
+
+
+def test_failed_conversion_leaves_no_partial_file(tmp_path):
+    csv_path = _thermal_csv(tmp_path / 'report.csv')
+    parquet_path = str(tmp_path / 'report.time_series.parquet')
+
+    # Without coercion the 'ERR' chunk cannot be cast to the float schema of the first chunk
+    with pytest.raises(Exception):
+        Output_Writer.write_csv_as_parquet(csv_path, parquet_path, chunk_rows=10, skiprows=2)
+    assert not os.path.exists(parquet_path)
+
+
+RECORD = {'file_name': 'sheet.csv', 'samples': [{'Sample_ID': 'S1', 'Sample_Plate': float('nan'), 'Value': 1.5},
+                                                {'Sample_ID': 'S2', 'Sample_Plate': float('inf'), 'Value': -2}],
+          'metadata': {'date': '20251022', 'range': (0.0, float('-inf'))}}
+
+
+@pytest.mark.parametrize('json_style', Output_Writer.JSON_STYLES)
+def test_every_serialiser_writes_nan_as_null(monkeypatch, json_style):
+    Output_Writer.configure(json_style=json_style)
+    outputs = [Output_Writer.dumps(RECORD)]
+    monkeypatch.setattr(Output_Writer, 'orjson', None)
+    outputs.append(Output_Writer.dumps(RECORD))
+    monkeypatch.setattr(Output_Writer, 'ujson', None)
+    outputs.append(Output_Writer.dumps(RECORD))
+
+    for payload in outputs:
+        assert b'NaN' not in payload and b'Infinity' not in payload
+        assert json.loads(payload, parse_constant=lambda name: pytest.fail(name)) == \
+            {'file_name': 'sheet.csv', 'samples': [{'Sample_ID': 'S1', 'Sample_Plate': None, 'Value': 1.5},
+                                                   {'Sample_ID': 'S2', 'Sample_Plate': None, 'Value': -2}],
+             'metadata': {'date': '20251022', 'range': [0.0, None]}}
+    # orjson and json lay out the documents the same way
+    assert outputs[0] == outputs[2]
+
+
+def test_downsampled_series_without_orjson_is_valid_json(monkeypatch, tmp_path):
+    monkeypatch.setattr(Output_Writer, 'orjson', None)
+    monkeypatch.setattr(Output_Writer, 'ujson', None)
+    # One row per bucket: the bucket of the 'ERR' row has no value (NaN)
+    csv_path = _thermal_csv(tmp_path / 'report.csv', rows=8, bad_row=3)
+    series = Extractor_Thermal_Report.downsample_time_series(csv_path, 8, 8)
+    assert Output_Writer.without_nan(series) != series
+    path = str(tmp_path / 'report.downsampled.json')
+    Extractor_Thermal_Report.write_downsampled_series(series, path)
+    with open(path, 'rb') as f:
+        payload = f.read()
+    document = json.loads(payload, parse_constant=lambda name: pytest.fail(name))
+    assert document['columns']['FlowCellTemperature[C]']['mean'][3] is None
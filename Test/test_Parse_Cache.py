@@ -0,0 +1,108 @@
+import os
+import sys
+import types
+
+import pytest
+
+import Parse_Cache
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    """A fake extractor module counting its parses and its outputs re-created from the cache."""
+    module = types.ModuleType('Fake_Extractor')
+    module.EXTRACTOR_VERSION = '1'
+    module.parsed = []
+    module.saved = []
+
+    def one_single_file(input_dir_path, output_dir_path, csv_file_name):
+        file_path = os.path.join(input_dir_path, csv_file_name)
+        module.parsed.append(csv_file_name)
+        with open(file_path) as f:
+            return [{'file_name': csv_file_name, 'file_path': file_path, 'content': f.read()}]
+
+    def save_outputs(file_info, output_dir_path, csv_file_name):
+        module.saved.append(file_info['file_path'])
+        return os.path.join(output_dir_path, csv_file_name.replace('.csv', '.json'))
+
+    one_single_file.__module__ = module.__name__
+    module.save_outputs = save_outputs
+    module.one_single_file = Parse_Cache.cached_extractor(one_single_file)
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module
+
+
+def _run(module, file_path):
+    return module.one_single_file(os.path.dirname(file_path), os.path.dirname(file_path), os.path.basename(file_path))
+
+
+def test_unchanged_file_is_served_from_the_cache(tmp_path, extractor, monkeypatch):
+    path = tmp_path / 'a.csv'
+    path.write_text('x,1\n')
+    first = _run(extractor, str(path))
+    assert _run(extractor, str(path)) == first
+    assert extractor.parsed == ['a.csv']
+    assert extractor.saved == [str(path)]
+
+    # Unchanged size and mtime: not even re-hashed
+    monkeypatch.setattr(Parse_Cache, 'hash_file', lambda file_path: pytest.fail('re-hashed'))
+    _run(extractor, str(path))
+    assert extractor.parsed == ['a.csv']
+
+
+def test_same_content_elsewhere_is_a_hit_with_its_own_path(tmp_path, extractor):
+    (tmp_path / 'one').mkdir()
+    (tmp_path / 'two').mkdir()
+    (tmp_path / 'one' / 'a.csv').write_text('x,1\n')
+    (tmp_path / 'two' / 'a.csv').write_text('x,1\n')
+    _run(extractor, str(tmp_path / 'one' / 'a.csv'))
+    results = _run(extractor, str(tmp_path / 'two' / 'a.csv'))
+    assert extractor.parsed == ['a.csv']
+    assert results[0]['file_path'] == str(tmp_path / 'two' / 'a.csv')
+
+    # Another file name is another entry (the name carries metadata)
+    (tmp_path / 'two' / 'b.csv').write_text('x,1\n')
+    _run(extractor, str(tmp_path / 'two' / 'b.csv'))
+    assert extractor.parsed == ['a.csv', 'b.csv']
+
+
+def test_changed_content_and_extractor_version_invalidate(tmp_path, extractor):
+    path = tmp_path / 'a.csv'
+    path.write_text('x,1\n')
+    _run(extractor, str(path))
+
+    path.write_text('x,22\n')
+    assert _run(extractor, str(path))[0]['content'] == 'x,22\n'
+    assert extractor.parsed == ['a.csv', 'a.csv']
+
+    extractor.EXTRACTOR_VERSION = '2'
+    _run(extractor, str(path))
+    _run(extractor, str(path))
+    assert extractor.parsed == ['a.csv', 'a.csv', 'a.csv']
+
+
+def test_rebuild_and_disabled_cache_extract_again(tmp_path, extractor):
+    path = tmp_path / 'a.csv'
+    path.write_text('x,1\n')
+    _run(extractor, str(path))
+
+    Parse_Cache.configure(rebuild=True, cache_dir=str(tmp_path / 'cache'))
+    _run(extractor, str(path))
+    Parse_Cache.configure(enabled=False, cache_dir=str(tmp_path / 'cache'))
+    _run(extractor, str(path))
+    assert extractor.parsed == ['a.csv'] * 3
+    assert extractor.saved == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len('[{"value": "%s"}]' % ('x' * 100))
+    Parse_Cache.configure(cache_dir=str(tmp_path / 'cache'), max_size_mb=2.5 * entry_size / (1024 * 1024))
+    for key in ('a', 'b'):
+        Parse_Cache.store(key, [{'value': 'x' * 100}])
+    # 'a' used last: 'b' goes first
+    assert Parse_Cache.lookup('a') is not None
+    Parse_Cache.store('c', [{'value': 'x' * 100}])
+
+    assert Parse_Cache.lookup('b') is None
+    assert Parse_Cache.lookup('a') == [{'value': 'x' * 100}]
+    assert Parse_Cache.lookup('c') is not None
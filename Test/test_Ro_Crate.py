@@ -0,0 +1,109 @@
+import os
+import json
+import shutil
+
+import pytest
+
+import Catalog
+import Output_Writer
+import Parse_Cache
+import Ro_Crate
+import Main_Auto_Processor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SHEET_PATH = os.path.join(ROOT, 'orfeo/LTS/LAGE/illumina_run/AREA/NovaSeq6000/2023/230921_A00618_0323_AHK32KDSX2/20230912_ORID0036_Pool03.csv')
+THERMAL_PATH = os.path.join(ROOT, 'NovaSeq6000_CSVs', 'A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv')
+GENERATION_PATH = os.path.join(ROOT, 'NovaSeq6000_CSVs', 'A00618_2024-01-19_16-08-06_FM-GenerationReport.csv')
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    """Outputs of an ORID0036 sample sheet, a thermal report filed under ORID0099 and an FM-Generation report."""
+    input_dir = tmp_path / 'input'
+    (input_dir / 'ORID0099').mkdir(parents=True)
+    paths = [str(input_dir / os.path.basename(SHEET_PATH)), str(input_dir / 'ORID0099' / os.path.basename(THERMAL_PATH)),
+             str(input_dir / os.path.basename(GENERATION_PATH))]
+    for source, path in zip((SHEET_PATH, THERMAL_PATH, GENERATION_PATH), paths):
+        shutil.copy(source, path)
+
+    Output_Writer.configure(output_format='parquet', downsample_points=20)
+    out = str(tmp_path / 'out')
+    results = Main_Auto_Processor.process_paths(paths, out)
+    Catalog.update_catalog(out, [file_info for result in results for file_info in result])
+    return out
+
+
+def _graph(metadata_path):
+    with open(metadata_path) as f:
+        return {entity['@id']: entity for entity in json.load(f)['@graph']}
+
+
+def test_crate_lists_outputs_and_sources(output_dir):
+    metadata_path, counts = Ro_Crate.write_crate(output_dir)
+    graph = _graph(metadata_path)
+    names = Ro_Crate.list_outputs(output_dir)
+    assert [part['@id'] for part in graph['./']['hasPart']] == [Ro_Crate._file_id(n) for n in names]
+    assert counts['files'] == len(names)
+    assert counts['sources'] == 3
+
+    for n in names:
+        with open(os.path.join(output_dir, n), 'rb') as f:
+            content = f.read()
+        assert graph[Ro_Crate._file_id(n)]['contentSize'] == len(content)
+        assert graph[Ro_Crate._file_id(n)]['sha256'] == Parse_Cache.hash_file(os.path.join(output_dir, n))
+
+    # The thermal record and its side files point to the source CSV
+    thermal_stem = os.path.basename(THERMAL_PATH)[:-len('.csv')]
+    side_files = [n for n in names if n.startswith(thermal_stem)]
+    assert len(side_files) == 3
+    sources = {graph[Ro_Crate._file_id(n)]['isBasedOn']['@id'] for n in side_files}
+    assert len(sources) == 1
+    assert graph[sources.pop()]['sha256'] == Parse_Cache.hash_file(THERMAL_PATH)
+
+
+def test_unchanged_files_reuse_their_checksums(output_dir, monkeypatch):
+    _, first = Ro_Crate.write_crate(output_dir)
+    # The source CSVs were hashed by the parse cache
+    assert first['hashed'] == first['files']
+    assert first['reused'] == first['sources']
+
+    hashed = []
+    hash_file = Parse_Cache.hash_file
+    monkeypatch.setattr(Parse_Cache, 'hash_file', lambda path: hashed.append(path) or hash_file(path))
+    _, second = Ro_Crate.write_crate(output_dir)
+    assert (second['hashed'], second['reused']) == (0, first['files'] + first['sources'])
+    assert hashed == []
+
+    # A new output is the only file hashed
+    summary_path = os.path.join(output_dir, 'changed.csv')
+    with open(summary_path, 'w') as f:
+        f.write('a,b\n')
+    metadata_path, third = Ro_Crate.write_crate(output_dir)
+    assert (third['hashed'], third['files']) == (1, first['files'] + 1)
+    assert _graph(metadata_path)['changed.csv']['sha256'] == hash_file(summary_path)
+
+
+def test_orid_selects_records_by_name_or_source_directory(output_dir):
+    metadata_path, counts = Ro_Crate.write_crate(output_dir, orid='orid0036')
+    graph = _graph(metadata_path)
+    sheet_name = os.path.basename(SHEET_PATH)
+    # The record and its samples table
+    assert [part['@id'] for part in graph['./']['hasPart']] == \
+           [Ro_Crate._file_id(Output_Writer.json_file_name(sheet_name)), Output_Writer.table_file_name(sheet_name, 'samples')]
+    assert graph['./']['name'] == 'ORID0036 metadata extraction outputs'
+    assert counts['sources'] == 1
+
+    # The thermal report has no ORID in its name: found through its source directory, with its side files
+    metadata_path, counts = Ro_Crate.write_crate(output_dir, orid='ORID0099')
+    names = [part['@id'] for part in _graph(metadata_path)['./']['hasPart']]
+    assert len(names) == 3
+    assert all(n.startswith(os.path.basename(THERMAL_PATH)[:-len('.csv')]) for n in names)
+
+    assert Ro_Crate.write_crate(output_dir, orid='ORID9999')[1]['files'] == 0
+
+
+def test_orid_of_names_and_directories():
+    assert Ro_Crate.orid_of('/lts/run/20230912_orid0036_Pool03.csv') == 'ORID0036'
+    assert Ro_Crate.orid_of('/lts/ORID0077/run1/sample3/throughput.csv') == 'ORID0077'
+    assert Ro_Crate.orid_of('/lts/ORID0077/ORID0078_sheet.csv') == 'ORID0078'
+    assert Ro_Crate.orid_of('/lts/run/report.csv') is None
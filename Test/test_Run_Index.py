@@ -0,0 +1,116 @@
+import os
+import json
+
+import Output_Writer
+import Run_Index
+
+
+def _thermal(json_dir, instrument, side, start, end, suffix='ThermalReport'):
+    name = f'{instrument}_{side}_{start}_{suffix}.json'
+    Output_Writer.write_json({'file_name': name.replace('.json', '.csv'), 'file_type': Run_Index.THERMAL_TYPE,
+                              'file_path': f'/lts/{name}', 'instrument_id': instrument, 'run_side': side,
+                              'first_timestamp': start, 'last_timestamp': end, 'metadata': {}},
+                             os.path.join(json_dir, name))
+    return name
+
+
+def _autotilt(json_dir, instrument, timestamp):
+    name = f'{instrument}_{timestamp}_FM-AutoTilt_Report.json'
+    date, time = timestamp.split('_')
+    Output_Writer.write_json({'file_name': name.replace('.json', '.csv'), 'file_type': 'FM-AutoTilt Report',
+                              'metadata': {'date': date, 'time': time, 'instrument_id': instrument}},
+                             os.path.join(json_dir, name))
+    return name
+
+
+def _generation(json_dir, instrument, timestamp):
+    name = f'{instrument}_{timestamp}_FM-GenerationReport.json'
+    Output_Writer.write_json({'file_name': name.replace('.json', '.csv'), 'file_type': 'FM-Generation Report',
+                              'metadata': {'date': timestamp, 'time': None, 'instrument_name': instrument}},
+                             os.path.join(json_dir, name))
+    return name
+
+
+def _layout(runs):
+    return [(run['run_id'], [report['json_file'] for report in run['reports']]) for run in runs]
+
+
+def test_run_and_post_run_wash_form_one_run(tmp_path):
+    run = _thermal(tmp_path, 'A00618', 'SideB', '2024-01-19_12-06-08', '2024-01-21_04-17-21')
+    wash = _thermal(tmp_path, 'A00618', 'SideB', '2024-01-21_04-19-23', '2024-01-21_05-50-20', 'Wash_ThermalReport')
+    later = _thermal(tmp_path, 'A00618', 'SideB', '2024-01-21_07-00-00', '2024-01-21_09-00-00')
+
+    runs = Run_Index.build_runs(str(tmp_path))
+    assert _layout(runs) == [('A00618_SideB_2024-01-19_12-06-08', [run, wash]),
+                             ('A00618_SideB_2024-01-21_07-00-00', [later])]
+    assert runs[0]['end'] == Run_Index.parse_timestamp('2024-01-21_05-50-20')
+
+    # A wider gap merges the later run too
+    assert len(Run_Index.build_runs(str(tmp_path), gap_minutes=120)) == 1
+
+
+def test_calibrations_attach_to_the_runs_of_both_sides(tmp_path):
+    side_a = _thermal(tmp_path, 'A00618', 'SideA', '2024-01-19_12-05-16', '2024-01-19_20-00-00')
+    side_b = _thermal(tmp_path, 'A00618', 'SideB', '2024-01-19_12-06-08', '2024-01-20_04-17-21')
+    tilt = _autotilt(tmp_path, 'A00618', '2024-01-19_12-03-56')
+    # After the SideA run ended, still inside the SideB run
+    generation = _generation(tmp_path, 'A00618', '2024-01-19_22-00-00')
+
+    assert _layout(Run_Index.build_runs(str(tmp_path))) == [
+        ('A00618_SideA_2024-01-19_12-05-16', [tilt, side_a]),
+        ('A00618_SideB_2024-01-19_12-06-08', [tilt, side_b, generation]),
+    ]
+
+
+def test_unattached_calibrations_form_runs_of_their_own(tmp_path):
+    thermal = _thermal(tmp_path, 'A00618', 'SideA', '2024-06-19_12-05-16', '2024-06-19_14-49-31')
+    tilt = _autotilt(tmp_path, 'A00618', '2024-01-19_15-59-34')
+    generation = _generation(tmp_path, 'A00618', '2024-01-19_16-08-06')
+    # Another instrument at the time of the thermal report
+    other = _autotilt(tmp_path, 'A01234', '2024-06-19_12-00-00')
+
+    assert _layout(Run_Index.build_runs(str(tmp_path))) == [
+        ('A00618_N/A_2024-01-19_15-59-34', [tilt, generation]),
+        ('A00618_SideA_2024-06-19_12-05-16', [thermal]),
+        ('A01234_N/A_2024-06-19_12-00-00', [other]),
+    ]
+
+
+def test_index_follows_modified_and_deleted_files(tmp_path):
+    first = _thermal(tmp_path, 'A00618', 'SideA', '2024-01-19_12-00-00', '2024-01-19_14-00-00')
+    second = _thermal(tmp_path, 'A00618', 'SideA', '2024-01-19_18-00-00', '2024-01-19_20-00-00')
+    Output_Writer.write_json({'file_name': 'A00618_2024-01-19_12-00-00_Other.csv', 'file_type': 'Other'},
+                             os.path.join(tmp_path, 'A00618_2024-01-19_12-00-00_Other.json'))
+    assert len(Run_Index.build_runs(str(tmp_path))) == 2
+
+    # The first report now runs until the second one starts
+    path = os.path.join(tmp_path, first)
+    with open(path) as f:
+        record = json.load(f)
+    record['last_timestamp'] = '2024-01-19_17-50-00'
+    Output_Writer.write_json(record, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert _layout(Run_Index.build_runs(str(tmp_path))) == [('A00618_SideA_2024-01-19_12-00-00', [first, second])]
+
+    os.remove(path)
+    assert _layout(Run_Index.build_runs(str(tmp_path))) == [('A00618_SideA_2024-01-19_18-00-00', [second])]
+
+
+def test_saved_outputs_and_report_lookup(tmp_path):
+    thermal = _thermal(tmp_path, 'A00618', 'SideA', '2024-01-19_12-05-16', '2024-01-19_20-00-00')
+    tilt = _autotilt(tmp_path, 'A00618', '2024-01-19_12-03-56')
+
+    # The run keeps the thermal window; the calibration just before it is listed first
+    csv_path, count = Run_Index.update_run_index(str(tmp_path))
+    assert count == 1
+    with open(csv_path) as f:
+        assert f.read().splitlines()[1] == \
+            f'A00618_SideA_2024-01-19_12-05-16,A00618,SideA,2024-01-19_12-05-16,2024-01-19_20-00-00,1,1,{tilt};{thermal}'
+    records = Output_Writer.read_json(os.path.join(tmp_path, Run_Index.RUNS_JSON_NAME))
+    assert [report['json_file'] for report in records[0]['reports']] == [tilt, thermal]
+
+    runs = Run_Index.build_runs(str(tmp_path))
+    assert [run['run_id'] for run in Run_Index.find_runs(runs, thermal.replace('.json', '.csv'))] == \
+           ['A00618_SideA_2024-01-19_12-05-16']
+    assert Run_Index.find_runs(runs, 'A00618_SideA_2025-01-01_00-00-00_ThermalReport.csv') == []
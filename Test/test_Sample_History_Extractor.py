@@ -0,0 +1,42 @@
+import os
+import json
+
+import Output_Writer
+import Sample_History_Extractor
+
+
+def _legacy_record(json_dir):
+    """A record written before NaN became null (bare NaN in the file)."""
+    record = {'file_name': 'sheet.csv', 'file_type': 'BeadStudio', 'metadata': {'date': '20251022'},
+              'samples': [{'Sample_ID': 'DF0130', 'Sample_Group': float('nan'), 'SentrixBarcode_A': 209673720136,
+                           'SentrixPosition_A': 'R01C01'}]}
+    os.makedirs(json_dir, exist_ok=True)
+    with open(os.path.join(json_dir, 'sheet.json'), 'w') as f:
+        json.dump(record, f)
+
+
+def _strict_load(payload):
+    def reject(constant):
+        raise ValueError(f"non-standard JSON constant {constant}")
+    return json.loads(payload, parse_constant=reject)
+
+
+def test_history_is_strict_json(tmp_path):
+    _legacy_record(tmp_path / 'json')
+    Sample_History_Extractor.get_sample_history(str(tmp_path / 'json'), 'DF0130', str(tmp_path / 'out'))
+    with open(tmp_path / 'out' / 'History_DF0130.json') as f:
+        history = _strict_load(f.read())
+    assert history[0]['sample_details']['Sample_Group'] is None
+
+
+def test_histories_follow_the_output_settings(tmp_path):
+    _legacy_record(tmp_path / 'json')
+    Output_Writer.configure(json_style='compact', compression='gzip')
+    found = Sample_History_Extractor.get_sample_histories(str(tmp_path / 'json'), ['DF*'], str(tmp_path / 'out'))
+    assert found == {'DF0130': 1}
+
+    path = tmp_path / 'out' / 'History_DF0130.json.gz'
+    with open(path, 'rb') as f:
+        payload = Output_Writer.decompress(f.read(), str(path))
+    assert b'\n' not in payload
+    assert _strict_load(payload)[0]['sample_details']['Sample_ID'] == 'DF0130'
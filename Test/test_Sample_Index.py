@@ -0,0 +1,57 @@
+import os
+import Output_Writer
+import Sample_Index
+
+SAMPLES = [
+    {'Sample_ID': 'DF0130', 'Sample_Plate': 'P1', 'SentrixBarcode_A': 209673720136, 'SentrixPosition_A': 'R01C01'},
+    {'Sample_ID': 'DF0131', 'Sample_Plate': None, 'SentrixBarcode_A': 209673720136, 'SentrixPosition_A': 'R02C01'},
+]
+
+
+def _write_sheet(output_dir, output_format):
+    Output_Writer.configure(output_format=output_format)
+    file_info = {'file_name': 'sheet.csv', 'file_type': 'BeadStudio', 'metadata': {'date': '20251022'},
+                 'manifest_id': 'GDA-8v1-0_D1', 'samples': SAMPLES}
+    return Output_Writer.write_record(file_info, str(output_dir), 'sheet.csv')
+
+
+def _history(json_dir, target):
+    return [record['sample_details'] for record in Sample_Index.query_sample_history(str(json_dir), target)]
+
+
+def test_parquet_records_are_indexed(tmp_path):
+    json_path = _write_sheet(tmp_path, 'parquet')
+    assert Output_Writer.read_json(json_path)['samples']['parquet_file'] == 'sheet.samples.parquet'
+
+    details = _history(tmp_path, 'DF0131')
+    assert [d['Sample_ID'] for d in details] == ['DF0131']
+    assert _history(tmp_path, '209673720136_r01c01')[0]['Sample_ID'] == 'DF0130'
+
+
+def test_parquet_and_json_records_give_the_same_identities(tmp_path):
+    _write_sheet(tmp_path / 'json', 'json')
+    _write_sheet(tmp_path / 'parquet', 'parquet')
+    for target in ('DF0130', 'DF0131', '209673720136_R02C01'):
+        from_json = _history(tmp_path / 'json', target)
+        from_parquet = _history(tmp_path / 'parquet', target)
+        assert [d['Sample_ID'] for d in from_json] == [d['Sample_ID'] for d in from_parquet]
+        assert [Sample_Index.sample_identities(d) for d in from_json] == \
+               [Sample_Index.sample_identities(d) for d in from_parquet]
+
+
+def test_modified_parquet_record_is_reindexed(tmp_path):
+    json_path = _write_sheet(tmp_path, 'parquet')
+    assert _history(tmp_path, 'DF0130')
+
+    # A later sync reads the JSON again (new mtime) and must follow the Parquet reference again
+    stat = os.stat(json_path)
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert len(_history(tmp_path, 'DF0130')) == 1
+
+
+def test_unreadable_samples_are_skipped(tmp_path):
+    json_path = _write_sheet(tmp_path, 'parquet')
+    os.remove(os.path.join(tmp_path, Output_Writer.read_json(json_path)['samples']['parquet_file']))
+    assert _history(tmp_path, 'DF0130') == []
+    assert Sample_Index.sample_rows(str(tmp_path), {'rows': 3}) == []
+    assert Sample_Index.sample_rows(str(tmp_path), 'not a table') == []
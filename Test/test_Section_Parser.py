@@ -0,0 +1,123 @@
+import math
+import random
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+import Section_Parser
+
+
+def _pandas_column(raw_values):
+    """Reads raw_values with pd.read_csv: one 'key,value' line each, a bare 'key' line for a missing field."""
+    lines = [f'k{i}' if value is None else f'k{i},{value}' for i, value in enumerate(raw_values)]
+    return pd.read_csv(StringIO('\n'.join(lines)), header=None)[1].tolist()
+
+
+def _same(a, b):
+    """Equal values, NaN equal to NaN."""
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isnan(a) and math.isnan(b) or a == b
+    return type(a) is type(b) and a == b
+
+
+def _assert_parity(raw_values):
+    kind, values = Section_Parser.convert_column(raw_values)
+    assert kind in ('object', 'empty')
+    pandas_values = _pandas_column(raw_values)
+    assert len(values) == len(pandas_values)
+    for ours, theirs in zip(values, pandas_values):
+        assert _same(ours, theirs), (raw_values, ours, theirs)
+
+
+@pytest.mark.parametrize('raw_values', [
+    ['abc', 'N/A', 'def', 'nan'],
+    ['x', None, 'z'],
+    ['1', 'abc', '2.5', '1e5', '-0', '007'],
+    ['Illumina', '4', ' 12 ', '3.0'],
+    ['10/22/2025', '2025-10-22', 'GDA-8v1-0_D1.bpm'],
+    ['NA', 'null', 'NaN', '#N/A'],
+    ['-nan', '1.#IND', 'None', '<NA>', 'n/a', '#NA', 'NULL', '-NaN', '1.#QNAN', '-1.#QNAN', '-1.#IND', '#N/A N/A'],
+    ['text', 'None', '2'],
+    ['Trueish', 'yes', 'no'],
+])
+def test_text_columns_match_read_csv(raw_values):
+    _assert_parity(raw_values)
+
+
+def test_random_mixed_columns_match_read_csv():
+    rng = random.Random(20251022)
+    formats = ('{!r}', '{:.25e}', '{:.17g}', '{:.3f}')
+    for _ in range(50):
+        raw_values = [rng.choice(formats).format(rng.uniform(-1, 1) * 10 ** rng.randint(-300, 300)) for _ in range(40)]
+        # One text value keeps the whole column as strings
+        text_position, missing_position = rng.sample(range(1, 40), 2)
+        raw_values[text_position] = rng.choice(['FS10000123', 'SideA', 'v1.2', '1.2.3'])
+        raw_values[missing_position] = rng.choice(['NA', None, ''])
+        _assert_parity(raw_values)
+
+
+@pytest.mark.parametrize('raw_values', [
+    ['1', '2', '-3'],
+    ['1', None, '3'],
+    ['1.5', 'NA', '1e400'],
+    ['True', 'false'],
+    ['True', 'NA', 'text'],
+    ['inf', 'text'],
+    ['abc', '-Infinity'],
+])
+def test_typed_columns_are_left_to_pandas(raw_values):
+    assert Section_Parser.convert_column(raw_values) is None
+
+
+def test_all_missing_column_is_empty():
+    assert Section_Parser.convert_column([None, 'NA', ''])[0] == 'empty'
+
+
+def _pandas_summary(text):
+    frame = pd.read_csv(StringIO(text), header=None)
+    return [(str(row[0]).strip(), row[1]) for _, row in frame.iterrows()]
+
+
+def test_summary_section_matches_iterrows():
+    text = 'Instrument,FS10000123\nTemperature,36.5\nCycles,151\nComment,NA\nSide,A\n\n'
+    layout, pairs = Section_Parser.parse_summary_section(text)
+    assert layout == 'summary'
+    expected = _pandas_summary(text)
+    assert len(pairs) == len(expected)
+    for (label, value), (pandas_label, pandas_value) in zip(pairs, expected):
+        assert label == pandas_label
+        assert _same(value, pandas_value)
+
+
+def test_numeric_summaries_are_left_to_pandas():
+    assert Section_Parser.parse_summary_section('Temperature,36.5\nCycles,151\n') is None
+    assert Section_Parser.parse_summary_section('1,a\n2,b\n') is None
+
+
+def test_header_pairs_match_read_csv():
+    text = 'Investigator Name,BeadStudio User,,\nProject Name,ORID0036,,\nDate,10/22/2025,,\nIEMFileVersion,4,,\n'
+    frame = pd.read_csv(StringIO(text)).dropna(axis=1, how='all')
+    expected = [(row.iloc[0], row.iloc[1]) for _, row in frame.iterrows()]
+    pairs = Section_Parser.parse_header_pairs(text, drop_empty_columns=True)
+    assert len(pairs) == len(expected)
+    for pair, pandas_pair in zip(pairs, expected):
+        assert all(_same(ours, theirs) for ours, theirs in zip(pair, pandas_pair))
+
+
+def test_wider_rows_are_left_to_pandas():
+    assert Section_Parser.parse_summary_section('a,x\nb,y,z\n') is None
+    assert Section_Parser.parse_summary_section('a,1,2\nb,2,3\n') == ('table', None)
+
+
+def test_headerless_pairs_match_read_csv_with_names():
+    text = 'Instrument Name,A00618\nDate,2024-01-19_16-08-06\nFTM Laser Operating Power (mW),0.500\nTDI Exposure (ms),NA\nSurface\n'
+    frame = pd.read_csv(StringIO(text), header=None, names=['Key', 'Value'])
+    expected = [(row['Key'], row['Value']) for _, row in frame.iterrows()]
+    pairs = Section_Parser.parse_header_pairs(text, names=['Key', 'Value'])
+    assert len(pairs) == len(expected)
+    for pair, pandas_pair in zip(pairs, expected):
+        assert all(_same(ours, theirs) for ours, theirs in zip(pair, pandas_pair))
+
+    # Rows wider than the names are left to pandas
+    assert Section_Parser.parse_header_pairs('a,b,c\n', names=['Key', 'Value']) is None
@@ -0,0 +1,98 @@
+import os
+import glob
+import Sheet_Fingerprint
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BEADSTUDIO_DIR = os.path.join(REPO_DIR, 'Beadstudio_CSVs')
+NEUROMED_DIR = os.path.join(REPO_DIR, 'orfeo', 'LTS', 'LAGE', 'illumina_run', 'AREA', 'iScan',
+                            '20250219_ORID0036_NEUROMED_EPIC', 'CSVs')
+
+HEADER = '[Header],,\nINVESTIGATOR NAME,BeadStudio User,\nDATE,20251030,\n[Data],,\n'
+
+
+def _relations(paths, **kwargs):
+    relations = Sheet_Fingerprint.find_relations(Sheet_Fingerprint.fingerprint_paths(paths), **kwargs)
+    return {os.path.basename(r['file_path']): (r['relation'], sorted(os.path.basename(p) for p in r['related']))
+            for r in relations}
+
+
+def test_cattinara_merge_with_empty_sample_group_is_a_superset():
+    paths = sorted(glob.glob(os.path.join(BEADSTUDIO_DIR, '*Cattinara*.csv')))
+    relations = _relations(paths)
+    assert relations == {'20251022_ORID0086C-01_Cattinara_GWAS_PT01-02.csv': (
+        'superset', ['20251022_ORID0086C-01_Cattinara_GWAS_PT01.csv', '20251027_ORID0086C-01_Cattinara_GWAS_PT02.csv'])}
+
+
+def test_orid0036_merged_plates_are_supersets():
+    paths = sorted(glob.glob(os.path.join(NEUROMED_DIR, '*.csv')))
+    relations = _relations(paths)
+    plates = [f for f in map(os.path.basename, paths) if f.rsplit('_', 1)[-1] in
+              {f'PT0{i}.csv' for i in range(1, 9)}]
+    assert relations['20250407_ORID0036_Neuromed_EPIC_PT01-04.csv'] == (
+        'superset', [p for p in plates if p.endswith(('PT01.csv', 'PT02.csv', 'PT03.csv', 'PT04.csv'))])
+    assert relations['20250408_ORID0036_Neuromed_EPIC_PT05-08.csv'][0] == 'superset'
+    assert relations['20250408_ORID0036_Neuromed_EPIC_PT01-08.csv'] == ('superset', sorted(plates))
+    # The plates themselves, and the later PT09, are kept
+    assert not [name for name in relations if name in plates or 'PT09' in name]
+
+
+def test_orid0036_redundant_sheets_are_linked(tmp_path):
+    paths = sorted(glob.glob(os.path.join(NEUROMED_DIR, '*.csv')))
+    redundant = Sheet_Fingerprint.link_redundant_sheets(paths, str(tmp_path))
+    assert sorted(os.path.basename(path) for path in redundant) == [
+        '20250407_ORID0036_Neuromed_EPIC_PT01-04.csv', '20250408_ORID0036_Neuromed_EPIC_PT01-08.csv',
+        '20250408_ORID0036_Neuromed_EPIC_PT05-08.csv']
+    assert os.path.exists(tmp_path / Sheet_Fingerprint.RELATIONS_CSV_NAME)
+    assert os.path.exists(tmp_path / '20250408_ORID0036_Neuromed_EPIC_PT01-08.json')
+
+
+def _sheet(path, rows, columns='Sample_ID,Sample_Group,SentrixBarcode_A,SentrixPosition_A'):
+    path.write_text(HEADER + columns + '\n' + '\n'.join(rows) + '\n')
+    return str(path)
+
+
+def test_only_identical_rows_are_duplicates(tmp_path):
+    original = _sheet(tmp_path / 'a.csv', ['S1,G,2096,R01C01', 'S2,G,2096,R02C01'])
+    copy = _sheet(tmp_path / 'b.csv', ['S2,G,2096,R02C01', 'S1,G,2096,R01C01'])
+    reannotated = _sheet(tmp_path / 'c.csv', ['S1,H,2096,R01C01', 's2 ,H,2096,R02C01'])
+
+    fingerprints = Sheet_Fingerprint.fingerprint_paths([original, copy, reannotated])
+    relations = {os.path.basename(r['file_path']): r for r in Sheet_Fingerprint.find_relations(fingerprints)}
+    assert relations['b.csv']['relation'] == 'duplicate' and relations['b.csv']['identical_rows'] is True
+    assert relations['c.csv']['relation'] == 'same_samples' and relations['c.csv']['identical_rows'] is False
+
+    # The corrected re-issue is extracted
+    redundant = Sheet_Fingerprint.link_redundant_sheets([original, copy, reannotated], str(tmp_path / 'out'))
+    assert redundant == {copy}
+
+    relations = {os.path.basename(r['file_path']): r['relation']
+                 for r in Sheet_Fingerprint.find_relations(fingerprints, link_same_samples=True)}
+    assert relations == {'b.csv': 'duplicate', 'c.csv': 'duplicate'}
+
+
+def test_same_sample_on_another_position_is_another_row(tmp_path):
+    first = _sheet(tmp_path / 'a.csv', ['S1,G,2096,R01C01'])
+    rerun = _sheet(tmp_path / 'b.csv', ['S1,G,2096,R02C01'])
+    assert _relations([first, rerun]) == {}
+
+
+def test_reissued_indexes_are_not_a_copy(tmp_path):
+    columns = 'Sample_ID,Sample_Name,index,index2,Sample_Project'
+    first = _sheet(tmp_path / 'a.csv', ['5-C06,5-C06,GAACATGCAA,TCTGACCTTC,ORID0036'], columns)
+    corrected = _sheet(tmp_path / 'b.csv', ['5-C06,5-C06,GAACATGCAA,GAAGGTCAGA,Pool03'], columns)
+    assert _relations([first, corrected]) == {}
+
+
+def test_sheet_without_sample_columns_uses_full_rows(tmp_path):
+    first = _sheet(tmp_path / 'a.csv', ['x,1', 'y,2'], 'Name,Value')
+    copy = _sheet(tmp_path / 'b.csv', ['2,y', '1,x'], 'Value,Name')
+    assert _relations([first, copy]) == {'b.csv': ('duplicate', ['a.csv'])}
+
+
+def test_fingerprints_are_reused_until_the_file_changes(tmp_path):
+    path = _sheet(tmp_path / 'a.csv', ['S1,G,2096,R01C01'])
+    _, samples, _ = Sheet_Fingerprint.get_fingerprint(path)
+    assert Sheet_Fingerprint.get_fingerprint(path)[1] == samples
+
+    _sheet(tmp_path / 'a.csv', ['S1,G,2096,R01C01', 'S2,G,2096,R02C01'])
+    assert len(Sheet_Fingerprint.get_fingerprint(path)[1]) == 2
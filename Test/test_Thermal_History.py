@@ -0,0 +1,91 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import Thermal_History
+
+
+def _report(path, start_day, rows):
+    """A Thermal Report of hourly rows from 2024-01-<start_day> (crossing into February if long enough)."""
+    lines = ['Side,SideB', 'Instrument,A00618', 'Time,Current Cycle,FlowCellTemperature[C]']
+    start = datetime(2024, 1, start_day)
+    for i in range(rows):
+        lines.append(f"{(start + timedelta(hours=i)).strftime('%Y-%m-%d_%H-%M-%S')},{i},{20 + i}")
+    path.write_text('\n'.join(lines) + '\n')
+    return {'file_name': path.name, 'file_path': str(path), 'instrument_id': 'A00618', 'run_side': 'SideB'}
+
+
+def _temperatures(store):
+    rows = Thermal_History.query(str(store), 'A00618', 'SideB', ['FlowCellTemperature'])
+    return rows['FlowCellTemperature'].tolist()
+
+
+def _parts(store):
+    return sorted(os.path.relpath(os.path.join(d, f), store) for d, _, files in os.walk(store)
+                  for f in files if not f.endswith(('.sqlite', '-wal', '-shm')))
+
+
+def test_unchanged_report_is_ingested_once(tmp_path):
+    store = tmp_path / 'store'
+    file_info = _report(tmp_path / 'A00618_SideB_2024-01-30.csv', 30, 10)
+    assert Thermal_History.ingest_report(file_info, str(store)) == 10
+    assert Thermal_History.ingest_report(file_info, str(store)) == 0
+    assert _temperatures(store) == [20.0 + i for i in range(10)]
+
+
+def test_grown_report_is_ingested_again(tmp_path):
+    store = tmp_path / 'store'
+    path = tmp_path / 'A00618_SideB_2024-01-30.csv'
+    Thermal_History.ingest_report(_report(path, 30, 10), str(store))
+
+    # Still being written when first extracted: the finished report replaces the truncated history
+    file_info = _report(path, 30, 60)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert Thermal_History.ingest_report(file_info, str(store)) == 60
+    assert _temperatures(store) == [20.0 + i for i in range(60)]
+    assert _parts(store) == ['instrument=A00618/side=SideB/month=2024-01/A00618_SideB_2024-01-30.parquet',
+                             'instrument=A00618/side=SideB/month=2024-02/A00618_SideB_2024-01-30.parquet']
+    assert Thermal_History.ingested_report(str(store), path.name)['rows'] == 60
+
+
+def test_reingested_report_drops_months_it_no_longer_covers(tmp_path):
+    store = tmp_path / 'store'
+    path = tmp_path / 'A00618_SideB_2024-01-30.csv'
+    Thermal_History.ingest_report(_report(path, 30, 60), str(store))
+    Thermal_History.ingest_report(_report(path, 30, 10), str(store))
+    assert _parts(store) == ['instrument=A00618/side=SideB/month=2024-01/A00618_SideB_2024-01-30.parquet']
+
+
+def test_copies_of_a_report(tmp_path):
+    store = tmp_path / 'store'
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    name = 'A00618_SideB_2024-01-30.csv'
+    Thermal_History.ingest_report(_report(tmp_path / 'a' / name, 30, 20), str(store))
+
+    # A smaller (older) copy elsewhere is not ingested; a larger one replaces the history
+    assert Thermal_History.ingest_report(_report(tmp_path / 'b' / name, 30, 10), str(store)) == 0
+    assert Thermal_History.ingest_report(_report(tmp_path / 'b' / name, 30, 30), str(store)) == 30
+    assert len(_temperatures(store)) == 30
+
+
+def test_concurrent_ingestion_of_same_named_reports(tmp_path):
+    store = tmp_path / 'store'
+    name = 'A00618_SideB_2024-01-10.csv'
+    infos = []
+    for folder in ('a', 'b', 'c', 'd'):
+        (tmp_path / folder).mkdir()
+        infos.append(_report(tmp_path / folder / name, 10, 48))
+
+    # Pool workers (one manifest connection per process) ingesting same-named reports at once
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context('fork')) as pool:
+        list(pool.map(Thermal_History.ingest_report, infos, [str(store)] * len(infos)))
+    assert _parts(store) == ['instrument=A00618/side=SideB/month=2024-01/A00618_SideB_2024-01-10.parquet']
+    assert _temperatures(store) == [20.0 + i for i in range(48)]
+
+
+def test_parse_bound():
+    assert Thermal_History.parse_bound('2024-01') == datetime(2024, 1, 1)
+    assert Thermal_History.parse_bound('2024-01', end=True) == datetime(2024, 2, 1)
+    assert Thermal_History.parse_bound('2024-01-31', end=True) == datetime(2024, 2, 1)
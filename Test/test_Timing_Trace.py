@@ -0,0 +1,82 @@
+import os
+import json
+import shutil
+
+import pytest
+
+import Timing_Trace
+import Main_Auto_Processor
+
+REPORT_NAME = 'A00618_2024-01-19_16-08-06_FM-GenerationReport.csv'
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NovaSeq6000_CSVs', REPORT_NAME)
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    Timing_Trace.configure(trace_file=str(path))
+    yield path
+    Timing_Trace.configure()
+
+
+def _records(trace_file):
+    with open(trace_file) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_one_record_per_file_with_nested_spans(trace_file):
+    with Timing_Trace.file_trace('a.csv', 'Test'):
+        with Timing_Trace.span('read'):
+            # A nested file_trace (process_single_path --> one_single_file) shares the record
+            with Timing_Trace.file_trace('a.csv', 'Inner'):
+                with Timing_Trace.span('parse', section='[Data]'):
+                    pass
+        Timing_Trace.annotate(file_type='Test type')
+
+    (record,) = _records(trace_file)
+    assert record['entry_point'] == 'Test'
+    assert record['file'] == os.path.abspath('a.csv')
+    assert record['file_size'] is None
+    assert (record['file_type'], record['outcome']) == ('Test type', 'ok')
+    # Spans are appended when they end
+    assert [(span['name'], span.get('section')) for span in record['spans']] == [('parse', '[Data]'), ('read', None)]
+    parse, read = record['spans']
+    assert 0 <= read['start'] <= parse['start']
+    assert parse['seconds'] <= read['seconds'] <= record['total_seconds']
+
+
+def test_failed_file_is_recorded_and_raised(trace_file):
+    with pytest.raises(ValueError):
+        with Timing_Trace.file_trace('a.csv', 'Test'):
+            with Timing_Trace.span('parse'):
+                raise ValueError('bad row')
+
+    (record,) = _records(trace_file)
+    assert (record['outcome'], record['error']) == ('error', 'bad row')
+    assert [span['name'] for span in record['spans']] == ['parse']
+
+
+def test_disabled_trace_writes_nothing(tmp_path):
+    with Timing_Trace.file_trace('a.csv', 'Test'):
+        with Timing_Trace.span('read'):
+            Timing_Trace.annotate(outcome='ok')
+    assert os.listdir(tmp_path) == []
+
+
+def test_extraction_stages_and_cache_outcome(tmp_path, trace_file):
+    shutil.copy(REPORT_PATH, tmp_path / REPORT_NAME)
+    for _ in range(2):
+        Main_Auto_Processor.process_single_path(str(tmp_path / REPORT_NAME), str(tmp_path / 'out'))
+    Main_Auto_Processor.process_single_path(str(trace_file), str(tmp_path / 'out'))
+
+    miss, hit, unknown = _records(trace_file)
+    for record in (miss, hit):
+        assert record['entry_point'] == 'Main_Auto_Processor'
+        assert record['file_size'] == os.path.getsize(REPORT_PATH)
+        assert (record['file_type'], record['outcome']) == ('FM-Generation Report', 'ok')
+        assert record['spans'][0]['name'] == 'detect'
+    assert miss['cache'] == 'miss'
+    assert {'cache_lookup', 'read', 'parse', 'write', 'cache_store'} <= {span['name'] for span in miss['spans']}
+    assert hit['cache'] == 'hit'
+    assert 'parse' not in {span['name'] for span in hit['spans']}
+    assert unknown['outcome'] == 'unknown_type'
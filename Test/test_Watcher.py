@@ -0,0 +1,120 @@
+import os
+import shutil
+
+import pytest
+
+import Main_Auto_Processor
+import Watcher
+
+REPORT_NAME = 'A00618_SideB_2024-01-19_12-06-08_ThermalReport.csv'
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NovaSeq6000_CSVs', REPORT_NAME)
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    """Records the paths handed to the extraction, pass by pass."""
+    passes = []
+    process_paths = Main_Auto_Processor.process_paths
+
+    def recording(paths, output_dir, workers=1):
+        passes.append([os.path.basename(path) for path in paths])
+        return process_paths(paths, output_dir, workers=workers)
+
+    monkeypatch.setattr(Main_Auto_Processor, 'process_paths', recording)
+    return passes
+
+
+def _watch_once(root, output_dir, **kwargs):
+    Watcher.watch([str(root)], str(output_dir), settle=0, once=True, update_catalog=False, **kwargs)
+
+
+# --- DEBOUNCE ---
+
+def test_file_being_written_waits_until_it_settles():
+    pending = {}
+    stat = (100, int(1000 * 1e9))
+    assert Watcher.find_ready_files({'a.csv': stat}, {}, pending, now=1000, settle=20) == []
+    assert 'a.csv' in pending
+    assert Watcher.find_ready_files({'a.csv': stat}, {}, pending, now=1019, settle=20) == []
+
+    # It grew: the settle time starts again
+    grown = (200, int(1019 * 1e9))
+    assert Watcher.find_ready_files({'a.csv': grown}, {}, pending, now=1030, settle=20) == []
+    assert Watcher.find_ready_files({'a.csv': grown}, {}, pending, now=1039, settle=20) == [('a.csv', grown)]
+    assert pending == {}
+
+
+def test_backlog_is_ready_on_first_sight_and_processed_files_are_skipped():
+    old = (100, int(500 * 1e9))
+    observed = {'b.csv': old, 'a.csv': old, 'done.csv': old}
+    ready = Watcher.find_ready_files(observed, {'done.csv': old}, {}, now=1000, settle=20)
+    assert ready == [('a.csv', old), ('b.csv', old)]
+
+
+def test_failed_files_are_retried_up_to_max_attempts():
+    old = (100, int(500 * 1e9))
+    failures = {'a.csv': (old, 1), 'b.csv': (old, 3)}
+    ready = Watcher.find_ready_files({'a.csv': old, 'b.csv': old}, {}, {}, now=1000, settle=20,
+                                     failures=failures, max_attempts=3)
+    assert ready == [('a.csv', old)]
+
+    # A changed file starts over, through the settle time
+    changed = (150, int(990 * 1e9))
+    pending = {}
+    assert Watcher.find_ready_files({'b.csv': changed}, {}, pending, now=1000, settle=20, failures=failures) == []
+    assert Watcher.find_ready_files({'b.csv': changed}, {}, pending, now=1010, settle=20,
+                                    failures=failures) == [('b.csv', changed)]
+
+
+# --- STATE ---
+
+def test_extracted_files_are_not_extracted_again(tmp_path, extracted):
+    root = tmp_path / 'runs'
+    root.mkdir()
+    shutil.copy(REPORT_PATH, root / REPORT_NAME)
+
+    _watch_once(root, tmp_path / 'out')
+    assert extracted == [[REPORT_NAME]]
+    assert os.path.exists(tmp_path / 'out' / REPORT_NAME.replace('.csv', '.json'))
+
+    # A restart reads the state: nothing to do
+    _watch_once(root, tmp_path / 'out')
+    assert extracted == [[REPORT_NAME]]
+
+    # Modified: extracted again
+    with open(root / REPORT_NAME, 'a') as f:
+        f.write('\n')
+    _watch_once(root, tmp_path / 'out')
+    assert extracted == [[REPORT_NAME], [REPORT_NAME]]
+
+
+def test_failed_files_are_recorded_apart_and_retried(tmp_path, extracted):
+    root = tmp_path / 'runs'
+    root.mkdir()
+    shutil.copy(REPORT_PATH, root / REPORT_NAME)
+    # Header still being written: no type recognised yet
+    (root / 'partial.csv').write_text('Time,\n')
+
+    for _ in range(4):
+        _watch_once(root, tmp_path / 'out', max_attempts=3)
+    assert extracted == [[REPORT_NAME, 'partial.csv'], ['partial.csv'], ['partial.csv']]
+
+    db = Watcher.open_state(str(tmp_path / 'out'))
+    try:
+        assert list(Watcher.load_processed(db)) == [str(root / REPORT_NAME)]
+        failures = db.execute("SELECT file_path, attempts, error FROM failures").fetchall()
+        assert failures == [(str(root / 'partial.csv'), 3, 'unknown_type')]
+    finally:
+        db.close()
+
+    # Completed: retried at once, and extracted
+    shutil.copy(REPORT_PATH, root / 'partial.csv')
+    os.utime(root / 'partial.csv', (1e9, 1e9))
+    _watch_once(root, tmp_path / 'out', max_attempts=3)
+    assert extracted[-1] == ['partial.csv']
+    db = Watcher.open_state(str(tmp_path / 'out'))
+    try:
+        assert db.execute("SELECT COUNT(*) FROM failures").fetchone() == (0,)
+        assert len(Watcher.load_processed(db)) == 2
+    finally:
+        db.close()